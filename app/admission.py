@@ -0,0 +1,183 @@
+"""
+Admission control: bounded concurrency per route class and per-client rate limits.
+
+Requests beyond a class's concurrency limit wait in a bounded queue for at
+most `admission_queue_timeout` seconds; when the queue is full or the wait
+times out they get an immediate 503 with Retry-After instead of piling up
+behind the threadpool and the DB pool. Clients over their token bucket get
+429 with Retry-After.
+
+Rate limits key on who is calling as far as the server can tell: the admin
+principal when the request carries the admin token, otherwise the peer
+address (run uvicorn with --proxy-headers behind a trusted proxy so that is
+the real client). X-Client-Id, which any caller can set, only splits a
+peer's traffic into per-session buckets, and the peer as a whole has a
+bucket of its own.
+"""
+import asyncio
+import json
+import math
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs
+from .config import settings
+from .metrics import Counter, Gauge, Histogram
+from .security import is_admin_token
+
+in_flight = Gauge("admission_in_flight", "Requests currently admitted", ["route_class"])
+queued = Gauge("admission_queued", "Requests waiting for admission", ["route_class"])
+rejected = Counter("admission_rejected_total", "Requests refused by admission control", ["route_class", "reason"])
+queue_wait = Histogram("admission_queue_wait_seconds", "Time spent waiting for admission", ["route_class"])
+
+# Never limited: probes, metrics, docs and long-lived event streams. POST /batch is
+# not limited itself because each of its operations is admitted separately; holding
+# a slot for the batch while its operations wait for more could deadlock.
+_EXEMPT_PREFIXES = ("/health", "/metrics", "/events", "/batch", "/docs", "/redoc", "/openapi.json")
+
+class ConcurrencyLimiter:
+    def __init__(self, route_class: str, limit: int, queue_size: int):
+        self.route_class = route_class
+        self.semaphore = asyncio.Semaphore(limit)
+        self.queue_size = queue_size
+        self.waiting = 0
+
+    async def acquire(self) -> Optional[str]:
+        """Return None when admitted, otherwise the rejection reason"""
+        if not self.semaphore.locked():
+            await self.semaphore.acquire()
+            return None
+        if self.waiting >= self.queue_size:
+            return "queue_full"
+
+        self.waiting += 1
+        queued.inc(route_class=self.route_class)
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(self.semaphore.acquire(), timeout=settings.admission_queue_timeout)
+            return None
+        except asyncio.TimeoutError:
+            return "queue_timeout"
+        finally:
+            self.waiting -= 1
+            queued.dec(route_class=self.route_class)
+            queue_wait.observe(time.perf_counter() - started, route_class=self.route_class)
+
+    def release(self):
+        self.semaphore.release()
+
+class TokenBuckets:
+    """Per-client token buckets, keeping at most `max_clients` recently seen clients"""
+
+    def __init__(self, rate: float, burst: int, max_clients: int = 10000):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    def take(self, client: str) -> float:
+        """Consume one token; return 0 when allowed, otherwise seconds until a token is available"""
+        now = time.monotonic()
+        tokens, updated = self._buckets.pop(client, (float(self.burst), now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / self.rate
+        self._buckets[client] = (tokens, now)
+        if len(self._buckets) > self.max_clients:
+            self._buckets.popitem(last=False)
+        return wait
+
+def route_class(method: str, path: str, query_string: bytes = b"") -> str:
+    if method in ("GET", "HEAD"):
+        if any(path.startswith(prefix) for prefix in settings.admission_export_paths) and _is_snapshot(query_string):
+            return "exports"
+        return "reads"
+    return "writes"
+
+def _is_snapshot(query_string: bytes) -> bool:
+    """A change feed request without `since`, or with a `cursor`, pages through a full snapshot;
+    a `since` poll is a small delta read like any other list"""
+    params = parse_qs(query_string.decode("latin-1"))
+    return "cursor" in params or "since" not in params
+
+def principal(scope) -> str:
+    """Who is calling: the admin principal, or else the peer address"""
+    headers = dict(scope["headers"])
+    if is_admin_token(headers.get(b"x-admin-token", b"").decode("latin-1")):
+        return "admin"
+    return scope["client"][0] if scope.get("client") else "unknown"
+
+def client_key(scope) -> str:
+    """The principal, sub-keyed by X-Client-Id (sent per Streamlit session) when present"""
+    client_id = dict(scope["headers"]).get(b"x-client-id")
+    key = principal(scope)
+    if client_id:
+        key += "/" + client_id.decode("latin-1")[:64]
+    return key
+
+class AdmissionMiddleware:
+    def __init__(self, app):
+        self.app = app
+        self.limiters: Dict[str, ConcurrencyLimiter] = {
+            "reads": ConcurrencyLimiter("reads", settings.admission_read_limit, settings.admission_read_queue),
+            "writes": ConcurrencyLimiter("writes", settings.admission_write_limit, settings.admission_write_queue),
+            "exports": ConcurrencyLimiter("exports", settings.admission_export_limit, settings.admission_export_queue),
+        }
+        self.buckets = TokenBuckets(settings.rate_limit_per_second, settings.rate_limit_burst) if settings.rate_limit_per_second > 0 else None
+        self.peer_buckets = (
+            TokenBuckets(settings.rate_limit_per_peer_per_second, settings.rate_limit_peer_burst)
+            if settings.rate_limit_per_peer_per_second > 0 else None
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(_EXEMPT_PREFIXES):
+            await self.app(scope, receive, send)
+            return
+
+        cls = route_class(scope["method"], scope["path"], scope.get("query_string", b""))
+
+        wait = self._rate_limit_wait(scope)
+        if wait > 0:
+            rejected.inc(route_class=cls, reason="rate_limited")
+            await _reject(send, 429, "Rate limit exceeded", math.ceil(wait))
+            return
+
+        limiter = self.limiters[cls]
+        reason = await limiter.acquire()
+        if reason is not None:
+            rejected.inc(route_class=cls, reason=reason)
+            await _reject(send, 503, "Server busy, retry later", settings.admission_retry_after)
+            return
+
+        in_flight.inc(route_class=cls)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            in_flight.dec(route_class=cls)
+            limiter.release()
+
+    def _rate_limit_wait(self, scope) -> float:
+        """0 when the client and its peer both have a token, otherwise seconds to wait"""
+        if self.peer_buckets is not None:
+            wait = self.peer_buckets.take(principal(scope))
+            if wait > 0:
+                return wait
+        if self.buckets is not None:
+            return self.buckets.take(client_key(scope))
+        return 0.0
+
+async def _reject(send, status: int, detail: str, retry_after: int):
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(retry_after).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,122 @@
+import time
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+from fastapi import HTTPException
+from sqlalchemy import delete, event, func, insert, literal, select, text
+from sqlalchemy.orm import Session
+from . import jobs
+from .config import settings
+from .database import SessionLocal
+from .models import Deletion, Project, Task, User
+from .pagination import decode_cursor, encode_cursor
+
+# Entity names used in tombstones and change feed URLs
+ENTITIES = {User: "users", Project: "projects", Task: "tasks"}
+
+def _record_deletion(mapper, connection, target):
+    connection.execute(insert(Deletion).values(entity=ENTITIES[mapper.class_], entity_id=target.id))
+
+for _model in ENTITIES:
+    event.listen(_model, "after_delete", _record_deletion)
+
+def record_deletions(db: Session, model, *criteria):
+    """Write tombstones for rows removed by a set-based DELETE or ON DELETE CASCADE"""
+    db.execute(
+        insert(Deletion).from_select(
+            ["entity", "entity_id"],
+            select(literal(ENTITIES[model]), model.id).where(*criteria),
+        )
+    )
+
+def _watermark(db: Session) -> int:
+    """Lowest change number a write not yet visible to this session can still get"""
+    if db.get_bind().dialect.name == "postgresql":
+        return db.scalar(text("SELECT txid_snapshot_xmin(txid_current_snapshot())"))
+    return db.scalar(text("SELECT value + 1 FROM change_sequence"))
+
+def _encode_token(watermark: int, issued_at: float) -> str:
+    return f"{watermark}:{int(issued_at)}"
+
+def parse_since(since: Optional[str]) -> Optional[Tuple[int, float]]:
+    """The watermark and issue time in a change token; None for no token or a
+    wall-clock token from before the feeds were commit-ordered (a reset)"""
+    if since is None:
+        return None
+    try:
+        watermark, issued_at = since.split(":")
+        return int(watermark), float(issued_at)
+    except ValueError:
+        pass
+    try:
+        datetime.fromisoformat(since)
+        return None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid change token")
+
+def changes_since(db: Session, model, since: Optional[str], cursor: Optional[str] = None):
+    """Rows of `model` created or updated after the token, plus ids deleted after it.
+
+    Tokens hold a commit-ordered watermark (see app/migrations.py), taken before
+    the rows are read, so no write is skipped however long its transaction ran;
+    writes that commit while the feed is read may be sent again next time, which
+    is harmless because clients upsert by id.
+
+    Without a token, or with one older than the tombstone retention, the feed is
+    a snapshot of every row with `reset` set, sent in pages of
+    `change_feed_page_size` by id. Each page but the last carries `next_cursor`
+    to fetch the next one with; every page carries the token to poll with once
+    the snapshot is complete.
+    """
+    if cursor is not None:
+        key = decode_cursor(cursor)
+        if len(key) != 2:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        return _snapshot_page(db, model, key[0], key[1], reset=False)
+
+    now = time.time()
+    next_since = _encode_token(_watermark(db), now)
+    token = parse_since(since)
+    if token is None or token[1] < now - settings.change_tombstone_retention_days * 86400:
+        return _snapshot_page(db, model, None, next_since, reset=True)
+
+    watermark = token[0]
+    items = db.query(model).filter(model.change_seq >= watermark).order_by(model.change_seq, model.id).all()
+    deleted = db.scalars(
+        select(Deletion.entity_id)
+        .where(Deletion.entity == ENTITIES[model], Deletion.change_seq >= watermark)
+        .order_by(Deletion.change_seq)
+    ).all()
+    return {"items": items, "deleted": list(deleted), "next_since": next_since, "reset": False, "next_cursor": None}
+
+def _snapshot_page(db: Session, model, last_id: Optional[int], next_since: str, reset: bool):
+    query = db.query(model)
+    if last_id is not None:
+        query = query.filter(model.id > last_id)
+    items = query.order_by(model.id).limit(settings.change_feed_page_size).all()
+    next_cursor = None
+    if len(items) == settings.change_feed_page_size:
+        next_cursor = encode_cursor([items[-1].id, next_since])
+    return {"items": items, "deleted": [], "next_since": next_since, "reset": reset, "next_cursor": next_cursor}
+
+@jobs.job_kind("purge_tombstones")
+def purge_tombstones(ctx: jobs.JobContext):
+    """Delete tombstones older than the retention, in batches.
+
+    A token that old is answered with a snapshot instead, so no feed reads them any more.
+    """
+    purged = 0
+    with SessionLocal() as db:
+        cutoff = db.scalar(select(func.now())) - timedelta(days=settings.change_tombstone_retention_days)
+        while True:
+            ids = db.scalars(
+                select(Deletion.id).where(Deletion.deleted_at < cutoff).limit(settings.change_tombstone_purge_batch_size)
+            ).all()
+            if not ids:
+                break
+            db.execute(delete(Deletion).where(Deletion.id.in_(ids)))
+            db.commit()
+            purged += len(ids)
+            ctx.report(purged)
+    return {"purged": purged}
+
+jobs.schedule("purge_tombstones", settings.change_tombstone_purge_interval_seconds)
@@ -0,0 +1,121 @@
+"""
+Single-flight coalescing of identical concurrent GET requests.
+
+The first request for a key (path, normalized query, auth scope) runs
+normally; identical requests arriving while it is in flight wait for it
+and receive a copy of its response, so the query and serialization run
+once. With COALESCE_WINDOW_MS > 0 a successful response is also replayed
+for that long after it completes.
+
+Operations of an atomic batch are never coalesced: they read the batch's
+uncommitted transaction, which other requests must not see and which in
+turn must see the batch's own earlier writes.
+"""
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode
+from .config import settings
+from .database import shared_connection
+from .metrics import Counter
+
+saved = Counter("coalesced_requests_total", "GET requests answered from another request's result (queries saved)", ["source"])
+
+# Paths whose responses are streamed, per-request or side-effecting
+_EXCLUDED_PREFIXES = ("/events", "/health", "/metrics", "/admin", "/docs", "/redoc", "/openapi.json")
+# Headers that describe the leader's request rather than the shared result
+_PRIVATE_HEADERS = {b"traceparent", b"x-profile-id", b"set-cookie"}
+# Headers that change who may see a response, or how fresh it must be
+_SCOPE_HEADERS = (b"authorization", b"x-admin-token", b"cookie", b"x-consistency-token")
+
+_Response = Tuple[int, List[Tuple[bytes, bytes]], bytes]
+
+def request_key(scope) -> str:
+    headers = dict(scope["headers"])
+    query = urlencode(sorted(parse_qsl(scope["query_string"].decode("latin-1"), keep_blank_values=True)))
+    auth = hashlib.sha256(b"\0".join(headers.get(name, b"") for name in _SCOPE_HEADERS)).hexdigest()
+    return f"{scope['path']}?{query}#{auth}"
+
+class CoalescingMiddleware:
+    def __init__(self, app):
+        self.app = app
+        self.in_flight: Dict[str, asyncio.Future] = {}
+        # Oldest first: every entry lives for the same window, so insertion order is expiry order
+        self.recent: "OrderedDict[str, Tuple[float, _Response]]" = OrderedDict()
+
+    async def __call__(self, scope, receive, send):
+        if not self._eligible(scope):
+            await self.app(scope, receive, send)
+            return
+
+        key = request_key(scope)
+
+        cached = self.recent.get(key)
+        if cached is not None:
+            if cached[0] > time.monotonic():
+                saved.inc(source="window")
+                await _replay(cached[1], send)
+                return
+            del self.recent[key]
+
+        leader = self.in_flight.get(key)
+        if leader is not None:
+            response = await asyncio.shield(leader)
+            if response is not None:
+                saved.inc(source="in_flight")
+                await _replay(response, send)
+                return
+            # The leader's response could not be shared; run this one independently
+            await self.app(scope, receive, send)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        self.in_flight[key] = future
+        response = None
+        try:
+            response = await self._run_and_capture(scope, receive, send)
+        finally:
+            del self.in_flight[key]
+            future.set_result(response)
+
+        if response is not None and response[0] == 200 and settings.coalesce_window_ms > 0:
+            self.recent[key] = (time.monotonic() + settings.coalesce_window_ms / 1000, response)
+            self.recent.move_to_end(key)
+            while len(self.recent) > settings.coalesce_max_entries:
+                self.recent.popitem(last=False)
+
+    @staticmethod
+    def _eligible(scope) -> bool:
+        if scope["type"] != "http" or scope["method"] != "GET" or scope["path"].startswith(_EXCLUDED_PREFIXES):
+            return False
+        if shared_connection.get() is not None:
+            return False
+        return b"x-profile" not in dict(scope["headers"])
+
+    async def _run_and_capture(self, scope, receive, send) -> Optional[_Response]:
+        status, headers, chunks, size = 0, [], [], 0
+        shareable = True
+
+        async def capture(message):
+            nonlocal status, headers, size, shareable
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = [(name, value) for name, value in message.get("headers", []) if name.lower() not in _PRIVATE_HEADERS]
+            elif message["type"] == "http.response.body" and shareable:
+                size += len(message.get("body", b""))
+                if size > settings.coalesce_max_body_bytes:
+                    shareable = False
+                    chunks.clear()
+                else:
+                    chunks.append(message.get("body", b""))
+            await send(message)
+
+        await self.app(scope, receive, capture)
+        return (status, headers, b"".join(chunks)) if shareable and status else None
+
+async def _replay(response: _Response, send):
+    status, headers, body = response
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
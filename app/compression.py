@@ -0,0 +1,164 @@
+import zlib
+from typing import Dict, List, Optional, Tuple
+from .config import settings
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+# Streaming responses that must reach the client unbuffered
+_UNCOMPRESSED_TYPES = (b"text/event-stream",)
+
+class _GzipCompressor:
+    encoding = b"gzip"
+
+    def __init__(self):
+        self._compressor = zlib.compressobj(settings.gzip_level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        out = self._compressor.compress(data)
+        return out + self._compressor.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+class _BrotliCompressor:
+    encoding = b"br"
+
+    def __init__(self):
+        self._compressor = brotli.Compressor(quality=settings.brotli_quality)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        out = self._compressor.process(data)
+        return out + (self._compressor.finish() if final else self._compressor.flush())
+
+def _qualities(header: str) -> Dict[str, float]:
+    """Map each coding listed in Accept-Encoding to its q-value"""
+    qualities = {}
+    for item in header.split(","):
+        name, *params = [part.strip() for part in item.split(";")]
+        if not name:
+            continue
+        q = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    q = min(max(float(value), 0.0), 1.0)
+                except ValueError:
+                    q = 0.0
+        qualities[name.lower()] = q
+    return qualities
+
+def choose_compressor(accept_encoding: str):
+    """Pick the coding the client ranks highest, brotli on a tie, or nothing.
+
+    A coding listed with q=0 is refused even when "*" would cover it, and
+    an explicitly preferred "identity" leaves the response uncompressed.
+    """
+    qualities = _qualities(accept_encoding)
+    candidates = ([_BrotliCompressor] if brotli is not None else []) + [_GzipCompressor]
+    chosen, chosen_q = None, 0.0
+    for compressor_class in candidates:
+        q = qualities.get(compressor_class.encoding.decode(), qualities.get("*", 0.0))
+        if q > chosen_q:
+            chosen, chosen_q = compressor_class, q
+    if chosen is not None and qualities.get("identity", 0.0) > chosen_q:
+        return None
+    return chosen
+
+class CompressionMiddleware:
+    """Compress responses above `compression_minimum_size` bytes, including streamed ones.
+
+    Streamed bodies are flushed chunk by chunk so clients still receive data progressively.
+    """
+
+    def __init__(self, app, minimum_size: Optional[int] = None):
+        self.app = app
+        self.minimum_size = settings.compression_minimum_size if minimum_size is None else minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = dict(scope["headers"]).get(b"accept-encoding", b"").decode("latin-1")
+        compressor_class = choose_compressor(accept_encoding)
+        if compressor_class is None:
+            await self.app(scope, receive, send)
+            return
+
+        await _CompressionResponder(self.app, compressor_class, self.minimum_size)(scope, receive, send)
+
+class _CompressionResponder:
+    def __init__(self, app, compressor_class, minimum_size: int):
+        self.app = app
+        self.compressor_class = compressor_class
+        self.minimum_size = minimum_size
+        self.start_message = None
+        self.compressor = None
+        self.passthrough = False
+
+    async def __call__(self, scope, receive, send):
+        self.send = send
+        await self.app(scope, receive, self.send_compressed)
+
+    async def send_compressed(self, message):
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            headers = dict(message.get("headers", []))
+            self.passthrough = (
+                b"content-encoding" in headers
+                or headers.get(b"content-type", b"").startswith(_UNCOMPRESSED_TYPES)
+            )
+            return
+
+        if message["type"] != "http.response.body":
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.start_message is not None:
+            start, self.start_message = self.start_message, None
+            if self.passthrough or (not more_body and len(body) < self.minimum_size):
+                self.passthrough = True
+                await self.send(start)
+                await self.send(message)
+                return
+
+            self.compressor = self.compressor_class()
+            body = self.compressor.compress(body, final=not more_body)
+            start["headers"] = self._headers(start.get("headers", []), None if more_body else len(body))
+            await self.send(start)
+            await self.send({"type": "http.response.body", "body": body, "more_body": more_body})
+            return
+
+        if self.passthrough:
+            await self.send(message)
+            return
+
+        body = self.compressor.compress(body, final=not more_body)
+        await self.send({"type": "http.response.body", "body": body, "more_body": more_body})
+
+    def _headers(self, headers: List[Tuple[bytes, bytes]], content_length: Optional[int]):
+        vary = [value for name, value in headers if name.lower() == b"vary"]
+        headers = [
+            (name, self._etag(value) if name.lower() == b"etag" else value)
+            for name, value in headers
+            if name.lower() not in (b"content-length", b"vary")
+        ]
+        headers.append((b"content-encoding", self.compressor.encoding))
+        headers.append((b"vary", b", ".join(vary + [b"Accept-Encoding"])))
+        if content_length is not None:
+            headers.append((b"content-length", str(content_length).encode()))
+        return headers
+
+    def _etag(self, value: bytes) -> bytes:
+        """Tag the compressed body apart from the identity one ("3" -> "3-gzip").
+
+        A strong ETag promises byte-identical bodies, which the two are not.
+        Weak tags only promise equivalent content and are kept as they are.
+        """
+        if value.startswith(b"W/") or not value.endswith(b'"'):
+            return value
+        return value[:-1] + b"-" + self.compressor.encoding + b'"'
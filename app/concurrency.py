@@ -0,0 +1,41 @@
+"""
+Optimistic concurrency for single-row writes.
+
+Users, projects and tasks carry a `version` that every update increments:
+the ORM does it on flush (`version_id_col`) and `patch_row` in its UPDATE.
+Responses expose the version as a strong ETag. A PUT or PATCH sent with
+If-Match applies only if the row still has that version (the check is
+part of the UPDATE's WHERE clause); otherwise it fails with 412 and the
+client refetches. No row locks are held while a user edits.
+
+A compressed response carries the encoding in its tag ("3-gzip", see
+`compression`), so If-Match accepts it with or without that suffix.
+"""
+from typing import Optional
+from fastapi import Header, HTTPException
+
+def etag(version: int) -> str:
+    return f'"{version}"'
+
+def expected_version(if_match: Optional[str] = Header(None)) -> Optional[int]:
+    """Version the client requires from If-Match, or None when it sent none (or "*")"""
+    if if_match is None or if_match.strip() == "*":
+        return None
+    value = if_match.strip()
+    if value.startswith("W/"):
+        # If-Match compares strongly, so a weak tag never matches
+        raise precondition_failed(None)
+    version, _, encoding = value.strip('"').partition("-")
+    if encoding not in ("", "gzip", "br"):
+        raise HTTPException(status_code=400, detail="Invalid If-Match header")
+    try:
+        return int(version)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid If-Match header")
+
+def precondition_failed(current_version: Optional[int]) -> HTTPException:
+    return HTTPException(
+        status_code=412,
+        detail="Modified since it was read; fetch it again and reapply the change",
+        headers={"ETag": etag(current_version)} if current_version is not None else None,
+    )
@@ -1,9 +1,133 @@
+from typing import List
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
     database_url: str = "postgresql://postgres:postgres@db/postgres"
+    db_pool_size: int = 10
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 10.0
+
+    # Read replicas for GET handlers, e.g. DATABASE_REPLICA_URLS='["postgresql://...@replica/postgres"]'
+    database_replica_urls: List[str] = []
+    replica_health_interval: float = 5.0
+    replica_max_lag_seconds: float = 5.0
+
+    # Production server (app/gunicorn_conf.py); web_concurrency 0 means one worker per CPU
+    host: str = "0.0.0.0"
+    port: int = 8000
+    web_concurrency: int = 0
+    preload_app: bool = True
+    graceful_timeout: int = 30
+    worker_timeout: int = 60
+
+    # Token required by the /admin endpoints (empty disables them)
+    admin_token: str = ""
+
+    # Slow query log
+    slow_query_threshold_ms: float = 500.0
+    slow_query_explain_sample_rate: float = 0.0
+    # Appended to by every worker process; rotate it externally (logrotate). Empty (the
+    # default, so scripts and tools importing the app write no file) disables it; the
+    # deployments set it
+    slow_query_log_file: str = ""
+    slow_query_buffer_size: int = 200
+
+    # Sampling profiler (X-Profile header per request, optional continuous mode)
+    profile_sample_interval_ms: float = 1.0
+    profile_store_size: int = 20
+    profile_continuous_interval_ms: float = 0.0
+
+    # Change feeds (/{entity}/changes); a full snapshot is sent this many rows at a time
+    change_feed_page_size: int = 1000
+    # Older tokens get a snapshot; older tombstones are purged every
+    # change_tombstone_purge_interval_seconds (0 disables it)
+    change_tombstone_retention_days: int = 7
+    change_tombstone_purge_batch_size: int = 5000
+    change_tombstone_purge_interval_seconds: float = 3600.0
+
+    # Background jobs: "local" runs worker threads in each API process,
+    # "external" leaves them to `python -m app.worker`
+    job_backend: str = "local"
+    job_workers: int = 2
+    job_poll_interval: float = 1.0
+    job_stale_seconds: int = 300
+
+    # Project deletes above the threshold run as a batched background job
+    cascade_delete_batch_threshold: int = 10000
+    cascade_delete_batch_size: int = 1000
+
+    # Completed tasks untouched for archive_after_days move to tasks_archive;
+    # the mover is enqueued every archive_interval_seconds (0 disables it)
+    archive_after_days: int = 30
+    archive_batch_size: int = 1000
+    archive_interval_seconds: float = 3600.0
+
+    # Recount of the project task counters (also `python -m app.counters`); 0 disables it
+    counter_reconcile_interval_seconds: float = 900.0
+
+    # Scanner recording newly overdue tasks in task_reminders; 0 disables it
+    reminder_scan_interval_seconds: float = 60.0
+    reminder_scan_batch_size: int = 500
+
+    # Live change events (/events)
+    events_channel: str = "task_api_changes"
+    events_queue_size: int = 100
+    events_heartbeat_seconds: float = 15.0
+    events_retry_ms: int = 3000
+    events_max_ids: int = 500
+
+    # Probes: /health/live and /health/ready. Readiness also waits for warm-up, which opens
+    # warmup_connections per engine (0 means db_pool_size) and primes the statement cache
+    readiness_db_timeout_seconds: float = 2.0
+    readiness_min_pool_headroom: int = 2
+    readiness_max_loop_lag_seconds: float = 0.5
+    loop_lag_interval_seconds: float = 0.5
+    warmup_connections: int = 0
+    warmup_retry_seconds: float = 2.0
+
+    # Admission control: concurrent requests and wait queue per route class.
+    # Keep the sum of the limits within the DB pool (db_pool_size + db_max_overflow).
+    admission_read_limit: int = 12
+    admission_read_queue: int = 48
+    admission_write_limit: int = 6
+    admission_write_queue: int = 24
+    admission_export_limit: int = 2
+    admission_export_queue: int = 4
+    admission_queue_timeout: float = 5.0
+    admission_retry_after: int = 2
+    # Full snapshot pages of these feeds are exports; their ?since= delta polls are reads
+    admission_export_paths: List[str] = ["/users/changes", "/projects/changes", "/tasks/changes"]
+
+    # Per-client token bucket (0 disables rate limiting). A client is the peer address
+    # (or the admin principal) plus its X-Client-Id; the peer as a whole also has a
+    # bucket, so rotating X-Client-Id cannot escape the limit (0 disables that one).
+    rate_limit_per_second: float = 0.0
+    rate_limit_burst: int = 20
+    rate_limit_per_peer_per_second: float = 0.0
+    rate_limit_peer_burst: int = 200
+
+    # Coalescing of identical concurrent GETs; a window > 0 also replays fresh results
+    coalesce_window_ms: float = 0.0
+    coalesce_max_body_bytes: int = 4 * 1024 * 1024
+    coalesce_max_entries: int = 1000
+
+    # POST /batch. Each operation passes admission control on its own; a run of reads
+    # executes at most batch_read_concurrency at a time (keep it under admission_read_limit)
+    batch_max_requests: int = 50
+    batch_read_concurrency: int = 4
+
+    # Response compression (brotli is used when installed and accepted)
+    compression_minimum_size: int = 1024
+    gzip_level: int = 6
+    brotli_quality: int = 4
+
+    # Distributed tracing: "none", "file" (JSON lines) or "otlp" (OTLP/HTTP JSON)
+    service_name: str = "task-api"
+    tracing_exporter: str = "none"
+    tracing_file: str = "traces.jsonl"
+    otlp_endpoint: str = "http://localhost:4318"
 
     class Config:
         env_file = ".env"
 
-settings = Settings()
\ No newline at end of file
+settings = Settings()
@@ -0,0 +1,32 @@
+from contextvars import ContextVar
+from typing import Optional
+from starlette.routing import Match
+
+# Route template of the request being handled, e.g. "GET /tasks/{task_id}"
+current_route: ContextVar[Optional[str]] = ContextVar("current_route", default=None)
+
+def resolve_route(scope) -> str:
+    """Return the route template matching an HTTP scope, falling back to the raw path"""
+    app = scope.get("app")
+    for route in getattr(app, "routes", []):
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(route, "path", scope["path"])
+    return scope["path"]
+
+class RequestContextMiddleware:
+    """Expose the current route to code that has no access to the request (SQL hooks, profilers)"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        token = current_route.set(f"{scope['method']} {resolve_route(scope)}")
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_route.reset(token)
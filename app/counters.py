@@ -0,0 +1,179 @@
+"""
+Denormalized task counters on `projects`.
+
+task_count, completed_count and overdue_count are adjusted in the same
+transaction as every ORM write to a task (an after_flush hook issues
+relative `SET x = x + n` updates, so concurrent writers do not lose
+increments); single-statement PATCHes call `adjust_for_patch`, which
+computes the change in SQL from the row itself. Archived tasks stay counted. Overdue status changes with
+the clock rather than with writes, and set-based statements bypass the
+hook, so `reconcile` recounts from the tables; it runs as a scheduled
+job and from the command line:
+
+    python -m app.counters
+
+The counters are part of the project's representation, so every change to
+them also bumps the project's version (and with it its ETag).
+"""
+import argparse
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+from sqlalchemy import and_, case, event, func, inspect, literal, or_, select, update
+from sqlalchemy.orm import Session
+from .database import SessionLocal
+from .events import publish_change
+from .models.archived_task import ArchivedTask
+from .models.project import Project
+from .models.task import Task, TaskStatus
+
+COUNTERS = ("task_count", "completed_count", "overdue_count")
+
+def _is_completed(is_completed, status) -> bool:
+    return bool(is_completed) or status == TaskStatus.DONE
+
+def _contribution(values: Dict, now: datetime) -> List[int]:
+    completed = _is_completed(values["is_completed"], values["status"])
+    due_date = values["due_date"]
+    if due_date is not None and due_date.tzinfo is None:
+        # SQLite returns naive UTC
+        due_date = due_date.replace(tzinfo=timezone.utc)
+    overdue = not completed and due_date is not None and due_date < now
+    return [1, int(completed), int(overdue)]
+
+_FIELDS = ("project_id", "is_completed", "status", "due_date")
+
+def _values(task: Task, committed: bool) -> Dict:
+    state = inspect(task)
+    values = {}
+    for name in _FIELDS:
+        history = state.attrs[name].history
+        if committed and history.deleted:
+            values[name] = history.deleted[0]
+        elif committed and history.added and not history.unchanged:
+            values[name] = None
+        else:
+            values[name] = getattr(task, name)
+    return values
+
+@event.listens_for(Session, "after_flush")
+def _adjust_counters(session, flush_context):
+    now = datetime.now(timezone.utc)
+    deltas: Dict[int, List[int]] = defaultdict(lambda: [0, 0, 0])
+
+    def apply(values: Dict, sign: int):
+        if values["project_id"] is None:
+            return
+        for index, amount in enumerate(_contribution(values, now)):
+            deltas[values["project_id"]][index] += sign * amount
+
+    for obj in session.new:
+        if isinstance(obj, Task):
+            apply(_values(obj, committed=False), 1)
+    for obj in session.dirty:
+        if isinstance(obj, Task) and session.is_modified(obj):
+            apply(_values(obj, committed=True), -1)
+            apply(_values(obj, committed=False), 1)
+    for obj in session.deleted:
+        if isinstance(obj, Task):
+            apply(_values(obj, committed=True), -1)
+
+    for project_id, delta in deltas.items():
+        if not any(delta):
+            continue
+        session.connection().execute(
+            update(Project)
+            .where(Project.id == project_id)
+            .values({name: getattr(Project, name) + amount for name, amount in zip(COUNTERS, delta)})
+            .values(version=Project.version + 1)
+        )
+        _expire_counted(session, project_id)
+    if deltas:
+        # Counters are part of the project representation, so mirrors must refetch it
+        publish_change(session, "projects", "update", [project_id for project_id, delta in deltas.items() if any(delta)])
+
+def _expire_counted(session: Session, project_id: int):
+    """Forget a loaded project's counters and version, which a Core UPDATE just changed"""
+    project = session.identity_map.get(session.identity_key(Project, project_id))
+    if project is not None:
+        session.expire(project, [*COUNTERS, "version"])
+
+def _count(model, *criteria):
+    """Correlated count of `model` rows for the enclosing statement's project"""
+    return select(func.count()).select_from(model).where(model.project_id == Project.id, *criteria).scalar_subquery()
+
+def _completed(model):
+    return or_(model.is_completed.is_(True), model.status == TaskStatus.DONE)
+
+def _completed_flag(is_completed, status):
+    return case((or_(is_completed.is_(True), status == TaskStatus.DONE), 1), else_=0)
+
+def _overdue_flag(is_completed, status, due_date):
+    open_ = ~or_(is_completed.is_(True), status == TaskStatus.DONE)
+    return case((and_(open_, due_date.is_not(None), due_date < func.now()), 1), else_=0)
+
+def adjust_for_patch(db: Session, task_id: int, values: Dict) -> bool:
+    """Apply the counter change of patching task `task_id` with `values`; run it before the UPDATE.
+
+    Old values are read by the statement itself, so no row has to be loaded first.
+    Returns whether any counted field is being patched.
+    """
+    fields = ("is_completed", "status", "due_date")
+    if not set(fields) & values.keys():
+        return False
+    columns = Task.__table__.c
+    old = [columns[name] for name in fields]
+    new = [literal(values[name], columns[name].type) if name in values else columns[name] for name in fields]
+
+    def change(flag, arity):
+        return select(flag(*new[:arity]) - flag(*old[:arity])).where(Task.id == task_id).scalar_subquery()
+
+    completed, overdue = change(_completed_flag, 2), change(_overdue_flag, 3)
+    db.execute(
+        update(Project)
+        .where(
+            Project.id == select(Task.project_id).where(Task.id == task_id).scalar_subquery(),
+            or_(completed != 0, overdue != 0),
+        )
+        .values(
+            completed_count=Project.completed_count + completed,
+            overdue_count=Project.overdue_count + overdue,
+            # The counters are part of the project's representation, so its ETag changes too
+            version=Project.version + 1,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    return True
+
+def reconcile(db: Session, project_id: Optional[int] = None) -> int:
+    """Recount every project's counters (or one project's) and return how many had drifted"""
+    overdue = and_(~_completed(Task), Task.due_date.is_not(None), Task.due_date < func.now())
+    actual = {
+        "task_count": _count(Task) + _count(ArchivedTask),
+        "completed_count": _count(Task, _completed(Task)) + _count(ArchivedTask, _completed(ArchivedTask)),
+        "overdue_count": _count(Task, overdue),
+    }
+    drifted = db.scalars(
+        select(Project.id).where(
+            or_(*(getattr(Project, name) != expression for name, expression in actual.items())),
+            *([Project.id == project_id] if project_id is not None else []),
+        )
+    ).all()
+    if drifted:
+        db.execute(
+            update(Project).where(Project.id.in_(drifted)).values({**actual, "version": Project.version + 1})
+            .execution_options(synchronize_session=False)
+        )
+        publish_change(db, "projects", "update", drifted)
+    db.commit()
+    return len(drifted)
+
+def main():
+    parser = argparse.ArgumentParser(description="Recount the task counters stored on projects")
+    parser.add_argument("--project", type=int, help="only this project id")
+    args = parser.parse_args()
+    with SessionLocal() as db:
+        print(f"{reconcile(db, args.project)} project(s) corrected")
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,109 @@
-from sqlalchemy import create_engine
+from contextvars import ContextVar
+from typing import Callable, Optional
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Connection
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.sql.dml import UpdateBase
 from .config import settings
+from . import slow_queries, tracing
+from .metrics import Gauge
 
-engine = create_engine(settings.database_url)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def _pool_options(url: str):
+    # SQLite uses its own pools, which do not take sizing arguments
+    if url.startswith("sqlite"):
+        return {}
+    return {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_pre_ping": True,
+    }
+
+def _driver_url(url: str):
+    # The app is built on psycopg2 (the LISTEN loop in app/events.py uses its poll() API), but
+    # SQLAlchemy 2.1 maps a bare postgresql:// to psycopg 3
+    parsed = make_url(url)
+    if parsed.drivername == "postgresql":
+        return parsed.set(drivername="postgresql+psycopg2")
+    return parsed
+
+def make_engine(url: str):
+    """Create an engine with the app's pool settings and diagnostics hooks.
+
+    There are no server-side prepared statements: psycopg2 cannot prepare. The hot
+    statements are prebuilt in app/statements.py, so SQLAlchemy's compiled cache serves them.
+    """
+    new_engine = create_engine(_driver_url(url), **_pool_options(url))
+    slow_queries.install(new_engine)
+    tracing.install(new_engine)
+
+    if new_engine.dialect.name == "sqlite":
+        # SQLite ignores foreign keys (and so ON DELETE actions) unless enabled per connection
+        @event.listens_for(new_engine, "connect")
+        def _enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+            dbapi_connection.execute("PRAGMA foreign_keys=ON")
+
+    return new_engine
+
+# Primary: all writes, and reads that must see the latest data
+engine = make_engine(settings.database_url)
+Gauge("db_pool_checked_out", "Connections currently checked out of the pool",
+      function=lambda: engine.pool.checkedout() if hasattr(engine.pool, "checkedout") else 0)
+
+class RoutingSession(Session):
+    """Session that sends reads to `info["read_engine"]` when set, and everything else to the primary"""
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        read_engine = self.info.get("read_engine")
+        if read_engine is not None and not self._flushing and not isinstance(clause, UpdateBase):
+            return read_engine
+        return super().get_bind(mapper=mapper, clause=clause, **kw)
+
+SessionLocal = sessionmaker(class_=RoutingSession, autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+# Set while POST /batch runs atomic operations: their sessions join this connection's
+# transaction, and each handler's commit only releases a savepoint
+shared_connection: ContextVar[Optional[Connection]] = ContextVar("shared_connection", default=None)
+
+def begin_shared() -> Connection:
+    """Open a connection with a transaction for `shared_connection`; finish it with `end_shared`"""
+    connection = engine.connect()
+    if connection.dialect.name == "sqlite":
+        # pysqlite's implicit transactions break SAVEPOINT, so take over BEGIN on this connection
+        raw = connection.connection.driver_connection
+        connection.info["sqlite_isolation_level"] = raw.isolation_level
+        raw.isolation_level = None
+        connection.begin()
+        connection.exec_driver_sql("BEGIN")
+    else:
+        connection.begin()
+    return connection
+
+def end_shared(connection: Connection, commit: bool, on_commit: Optional[Callable[[Connection], None]] = None):
+    """Commit or roll back a `begin_shared` connection; `on_commit` runs after a commit, before it closes"""
+    try:
+        if commit:
+            connection.commit()
+            if on_commit is not None:
+                on_commit(connection)
+        else:
+            connection.rollback()
+    finally:
+        if "sqlite_isolation_level" in connection.info:
+            connection.connection.driver_connection.isolation_level = connection.info.pop("sqlite_isolation_level")
+        connection.close()
+
 def get_db():
-    db = SessionLocal()
+    connection = shared_connection.get()
+    if connection is None:
+        db = SessionLocal()
+    else:
+        db = SessionLocal(bind=connection, join_transaction_mode="create_savepoint")
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
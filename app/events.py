@@ -0,0 +1,186 @@
+"""
+Change events for the /events Server-Sent Events stream.
+
+ORM flushes are turned into compact events ({"entity", "op", "ids"}). On
+PostgreSQL they are sent with NOTIFY inside the writing transaction, so
+they are delivered on commit to every API process through a LISTEN
+thread; on other databases they are published in-process after commit.
+Either way they end up in the per-process `broker`, which fans them out
+to connected SSE clients on the event loop.
+"""
+import asyncio
+import json
+import logging
+import select as select_module
+import threading
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+from typing import Dict, Iterable, List, Optional, Set
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+from .changes import ENTITIES
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+class EventBroker:
+    """Fan events out to subscriber queues on the event loop"""
+
+    def __init__(self):
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.subscribers: Set[asyncio.Queue] = set()
+        self.last_id = 0
+
+    def start(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+
+    def subscribe(self) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=settings.events_queue_size)
+        self.subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self.subscribers.discard(queue)
+
+    def publish(self, payload: Dict):
+        """Thread-safe: hand an event to the loop for fan-out"""
+        if self.loop is not None and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self._fan_out, payload)
+
+    def _fan_out(self, payload: Dict):
+        self.last_id += 1
+        for queue in list(self.subscribers):
+            try:
+                queue.put_nowait((self.last_id, payload))
+            except asyncio.QueueFull:
+                # A slow client missed events; tell it to resync instead of buffering forever
+                queue.get_nowait()
+                queue.put_nowait((self.last_id, {"op": "resync"}))
+
+broker = EventBroker()
+
+def _is_postgres(session: Session) -> bool:
+    return session.get_bind().dialect.name == "postgresql"
+
+def _publish(session: Session, payload: Dict):
+    if _is_postgres(session):
+        session.connection().execute(select(func.pg_notify(settings.events_channel, json.dumps(payload))))
+    else:
+        session.info.setdefault("pending_events", []).append(payload)
+
+def publish_change(session: Session, entity: str, op: str, ids: Iterable[int]):
+    """Queue a change event for `ids`; it is delivered only if the transaction commits.
+
+    Write paths that bypass the ORM unit of work (bulk UPDATE/DELETE statements) call
+    this directly; ORM flushes are published automatically.
+    """
+    ids = list(ids)
+    for start in range(0, len(ids), settings.events_max_ids):
+        _publish(session, {"entity": entity, "op": op, "ids": ids[start:start + settings.events_max_ids]})
+
+def publish_bulk_change(session: Session, entity: str, op: str, **scope):
+    """Queue an event for a set-based change described by `scope` (e.g. project_id=1) rather than ids"""
+    _publish(session, {"entity": entity, "op": op, **scope})
+
+@event.listens_for(Session, "after_flush")
+def _collect_flush_events(session, flush_context):
+    changes: Dict[tuple, List[int]] = defaultdict(list)
+    for op, objects in (("create", session.new), ("update", session.dirty), ("delete", session.deleted)):
+        for obj in objects:
+            entity = ENTITIES.get(type(obj))
+            if entity is not None and (op != "update" or session.is_modified(obj)):
+                changes[(entity, op)].append(obj.id)
+    for (entity, op), ids in changes.items():
+        publish_change(session, entity, op, ids)
+
+# Set while an atomic POST /batch runs: a handler's commit there only releases a
+# savepoint, so its events wait in this list until the batch itself commits
+deferred_events: ContextVar[Optional[List[Dict]]] = ContextVar("deferred_events", default=None)
+
+@event.listens_for(Session, "after_commit")
+def _publish_committed(session):
+    payloads = session.info.pop("pending_events", [])
+    deferred = deferred_events.get()
+    if deferred is not None:
+        deferred.extend(payloads)
+        return
+    for payload in payloads:
+        broker.publish(payload)
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_rolled_back(session, previous_transaction):
+    # Soft rollback also fires when no transaction had begun yet, unlike after_rollback
+    if not session.in_transaction():
+        session.info.pop("pending_events", None)
+
+class PostgresListener(threading.Thread):
+    """LISTEN on the events channel and forward notifications to the broker"""
+
+    def __init__(self, engine):
+        super().__init__(daemon=True, name="events-listener")
+        self.engine = engine
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.is_set():
+            try:
+                self._listen()
+            except Exception:
+                logger.exception("Event listener disconnected, reconnecting")
+                # Events may have been missed while disconnected
+                broker.publish({"op": "resync"})
+                self._stopped.wait(2)
+
+    def _listen(self):
+        connection = self.engine.raw_connection()
+        connection.detach()  # keep this long-lived connection out of the pool
+        dbapi_connection = connection.dbapi_connection
+        dbapi_connection.autocommit = True
+        try:
+            with dbapi_connection.cursor() as cursor:
+                cursor.execute(f"LISTEN {settings.events_channel}")
+            while not self._stopped.is_set():
+                if select_module.select([dbapi_connection], [], [], 5) == ([], [], []):
+                    continue
+                dbapi_connection.poll()
+                while dbapi_connection.notifies:
+                    notify = dbapi_connection.notifies.pop(0)
+                    broker.publish(json.loads(notify.payload))
+        finally:
+            connection.close()
+
+    def stop(self):
+        self._stopped.set()
+
+_listener: Optional[PostgresListener] = None
+
+def start(engine, loop: asyncio.AbstractEventLoop):
+    global _listener
+    broker.start(loop)
+    if engine.dialect.name == "postgresql" and _listener is None:
+        _listener = PostgresListener(engine)
+        _listener.start()
+
+def stop():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+async def stream(entities: Optional[Set[str]] = None):
+    """Yield SSE frames for one client until it disconnects"""
+    queue = broker.subscribe()
+    try:
+        yield f"retry: {settings.events_retry_ms}\n\n"
+        while True:
+            try:
+                event_id, payload = await asyncio.wait_for(queue.get(), timeout=settings.events_heartbeat_seconds)
+            except asyncio.TimeoutError:
+                yield f": ping {int(time.time())}\n\n"
+                continue
+            if entities and payload.get("entity") not in entities and payload["op"] != "resync":
+                continue
+            yield f"id: {event_id}\nevent: {'resync' if payload['op'] == 'resync' else 'change'}\ndata: {json.dumps(payload)}\n\n"
+    finally:
+        broker.unsubscribe(queue)
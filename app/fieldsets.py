@@ -0,0 +1,46 @@
+"""
+Sparse fieldsets: `?fields=id,title,status` on GET endpoints.
+
+When fields are requested, handlers select only those columns and return
+plain dicts in a JSONResponse, skipping both loading ORM objects
+and validating full response models for columns the client does not use.
+Without `fields`, responses are unchanged.
+"""
+import enum
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+from fastapi import HTTPException, Query
+from sqlalchemy import select
+
+FIELDS_QUERY = Query(None, description="Comma-separated columns to return, e.g. id,title,status")
+
+def parse_fields(model, schema, fields: Optional[str], extra: Sequence[str] = ()) -> Optional[List[str]]:
+    """Requested column names of `model` (plus `extra` computed ones), or None for all.
+
+    Only fields of the response `schema` may be requested, so internal columns
+    (change_seq, the sort keys) stay out of the API.
+    """
+    if fields is None:
+        return None
+    names = list(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    allowed = {name for name in schema.model_fields if name in model.__table__.c} | set(extra)
+    unknown = [name for name in names if name not in allowed]
+    if not names or unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown) or fields!r}")
+    return names
+
+def columns(model, names: Iterable[str]):
+    return [model.__table__.c[name] for name in names]
+
+def select_fields(model, names: Iterable[str]):
+    return select(*columns(model, names))
+
+def _encode(value: Any) -> Any:
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+def row_dict(names: Sequence[str], row: Sequence) -> Dict[str, Any]:
+    return {name: _encode(value) for name, value in zip(names, row)}
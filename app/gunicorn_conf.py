@@ -0,0 +1,25 @@
+# Gunicorn settings for the production API server:
+#   gunicorn -c app/gunicorn_conf.py app.main:app
+from app.config import settings
+from app.server import worker_count
+
+bind = f"{settings.host}:{settings.port}"
+workers = worker_count()
+worker_class = "app.server.UvicornWorker"
+
+# Import the app (and create tables) once in the master, then fork workers
+preload_app = settings.preload_app
+
+# On SIGTERM stop accepting connections and let in-flight requests drain
+graceful_timeout = settings.graceful_timeout
+timeout = settings.worker_timeout
+keepalive = 5
+
+accesslog = "-"
+errorlog = "-"
+
+def post_fork(server, worker):
+    # Pooled connections opened in the master must not be shared with workers
+    if preload_app:
+        from app.database import engine
+        engine.dispose(close=False)
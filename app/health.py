@@ -0,0 +1,148 @@
+"""
+Liveness, readiness and warm-up for an API process.
+
+Liveness only says the process and its event loop answer, so a slow
+database never gets pods restarted. Readiness says the process can take
+traffic right now:
+
+- warm-up has finished;
+- the primary answers `SELECT 1` within READINESS_DB_TIMEOUT_SECONDS;
+- the pool has READINESS_MIN_POOL_HEADROOM connections to spare;
+- the event loop lags by at most READINESS_MAX_LOOP_LAG_SECONDS.
+
+Warm-up starts with the app, in a thread so liveness answers meanwhile.
+It opens WARMUP_CONNECTIONS pool connections (the pool size by default)
+on the primary and each replica, then runs the prebuilt statements once
+so they are compiled and cached before real requests arrive. It retries
+until the database is reachable.
+"""
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+from sqlalchemy import text
+from starlette.concurrency import run_in_threadpool
+from . import statements
+from .config import settings
+from .database import SessionLocal, engine
+from .metrics import Gauge
+from .replicas import replicas
+
+logger = logging.getLogger(__name__)
+
+# Runs of the prebuilt statements that compile them into the engine's statement cache
+_PRIMERS = [
+    (statements.user_by_id, {"id": 0}),
+    (statements.project_by_id, {"id": 0}),
+    (statements.task_by_id, {"id": 0}),
+    (statements.users_page, {"skip": 0, "limit": 1}),
+    (statements.projects_page, {"skip": 0, "limit": 1}),
+    (statements.tasks_page, {"skip": 0, "limit": 1}),
+]
+
+class LoopLagMonitor:
+    """Measures how late the event loop wakes a task that sleeps `interval` seconds"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.lag = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            self.lag = max(0.0, loop.time() - started - self.interval)
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+loop_lag = LoopLagMonitor(settings.loop_lag_interval_seconds)
+Gauge("event_loop_lag_seconds", "How late the event loop last woke a sleeping task", function=lambda: loop_lag.lag)
+
+warmed_up = threading.Event()
+_stop = threading.Event()
+
+def _open_connections(target_engine, count: int):
+    """Check out `count` connections at once so the pool holds that many, then return them"""
+    connections = []
+    try:
+        for _ in range(count):
+            connection = target_engine.connect()
+            connections.append(connection)
+            connection.execute(text("SELECT 1"))
+    finally:
+        for connection in connections:
+            connection.close()
+
+def warm_up():
+    """Fill the pools and prime the statement cache, retrying until the database answers"""
+    while not _stop.is_set():
+        started = time.perf_counter()
+        try:
+            count = settings.warmup_connections or settings.db_pool_size
+            for target_engine in [engine, *(replica.engine for replica in replicas.replicas)]:
+                _open_connections(target_engine, count)
+            with SessionLocal() as db:
+                for statement, params in _PRIMERS:
+                    db.execute(statement, params).all()
+        except Exception:
+            logger.warning("Warm-up failed, retrying in %ss", settings.warmup_retry_seconds, exc_info=True)
+            _stop.wait(settings.warmup_retry_seconds)
+            continue
+        logger.info("Warm-up finished in %.0f ms", (time.perf_counter() - started) * 1000)
+        warmed_up.set()
+        return
+
+def start():
+    """Begin measuring loop lag and warming up; call from the running loop"""
+    _stop.clear()
+    warmed_up.clear()
+    loop_lag.start()
+    threading.Thread(target=warm_up, daemon=True, name="warm-up").start()
+
+def stop():
+    """Report not ready from now on, so no new traffic is routed here while shutting down"""
+    _stop.set()
+    warmed_up.clear()
+    loop_lag.stop()
+
+def _ping() -> float:
+    started = time.perf_counter()
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+    return (time.perf_counter() - started) * 1000
+
+async def readiness() -> Tuple[bool, Dict[str, Dict[str, Any]]]:
+    """Whether this process should receive traffic, and the result of each check"""
+    checks: Dict[str, Dict[str, Any]] = {"warm_up": {"ok": warmed_up.is_set()}}
+
+    pool = engine.pool
+    pool_ok = True
+    if hasattr(pool, "checkedout") and engine.dialect.name != "sqlite":
+        capacity = settings.db_pool_size + settings.db_max_overflow
+        checked_out = pool.checkedout()
+        pool_ok = capacity - checked_out >= settings.readiness_min_pool_headroom
+        checks["pool"] = {"ok": pool_ok, "checked_out": checked_out, "capacity": capacity}
+
+    lag_ok = loop_lag.lag <= settings.readiness_max_loop_lag_seconds
+    checks["event_loop"] = {"ok": lag_ok, "lag_ms": round(loop_lag.lag * 1000, 1)}
+
+    # With the pool exhausted the ping would only queue behind the requests holding it
+    if pool_ok:
+        try:
+            latency = await asyncio.wait_for(run_in_threadpool(_ping), settings.readiness_db_timeout_seconds)
+            checks["database"] = {"ok": True, "latency_ms": round(latency, 1)}
+        except asyncio.TimeoutError:
+            checks["database"] = {"ok": False, "error": "timeout"}
+        except Exception as exc:
+            checks["database"] = {"ok": False, "error": type(exc).__name__}
+
+    return all(check["ok"] for check in checks.values()), checks
@@ -0,0 +1,293 @@
+"""
+Background jobs backed by the `jobs` table.
+
+Handlers enqueue a job and return 202; workers claim queued jobs with
+SELECT ... FOR UPDATE SKIP LOCKED (plus a conditional UPDATE, so SQLite
+is safe too). Workers run either as threads inside each API process
+(JOB_BACKEND=local) or as a separate process pool (`python -m app.worker`).
+Job functions receive a JobContext for progress reporting; reporting is
+also where a requested cancellation is noticed. Kinds registered with
+`schedule` are enqueued periodically by a scheduler thread in each API
+process, skipping a run while one is still queued or running.
+
+A claimed job belongs to the worker named in its `worker` column. The
+worker heartbeats while the job runs, and every write it makes (progress,
+heartbeat, final status) requires that it still owns the job, so a run
+that was requeued as stale cannot overwrite the run that replaced it.
+"""
+import inspect
+import logging
+import os
+import socket
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional
+from sqlalchemy import JSON, exists, func, insert, literal, select, update
+from sqlalchemy.orm import Session
+from .config import settings
+from .database import SessionLocal
+from .models.job import Job, JobStatus
+
+logger = logging.getLogger(__name__)
+
+# Registered job functions by kind
+JOB_KINDS: Dict[str, Callable] = {}
+# Periodic job kinds and their interval in seconds
+SCHEDULES: Dict[str, float] = {}
+
+def job_kind(name: str):
+    """Register `func(ctx, **params)` as the implementation of a job kind"""
+    def register(func: Callable) -> Callable:
+        JOB_KINDS[name] = func
+        return func
+    return register
+
+class JobCancelled(Exception):
+    pass
+
+class JobLost(Exception):
+    """The job was requeued as stale and now belongs to another run"""
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+def _owned(job_id: int, worker_name: str):
+    return (Job.id == job_id, Job.status == JobStatus.RUNNING, Job.worker == worker_name)
+
+class JobContext:
+    def __init__(self, job_id: int, worker_name: str):
+        self.job_id = job_id
+        self.worker_name = worker_name
+
+    def report(self, progress: int, total: Optional[int] = None):
+        """Record progress and stop the job if cancellation was requested or it was taken over"""
+        values = {"progress": progress, "heartbeat_at": _utcnow()}
+        if total is not None:
+            values["total"] = total
+        with SessionLocal() as db:
+            owned = db.execute(update(Job).where(*_owned(self.job_id, self.worker_name)).values(**values)).rowcount
+            cancel_requested = db.scalar(select(Job.cancel_requested).where(Job.id == self.job_id))
+            db.commit()
+        if not owned:
+            raise JobLost()
+        if cancel_requested:
+            raise JobCancelled()
+
+# Parameter names of enqueue() itself, which job params cannot reuse
+_RESERVED_PARAMS = ("db", "kind")
+
+def check_params(kind: str, params: Dict[str, Any]):
+    """Raise ValueError unless `params` are keyword arguments the job kind accepts"""
+    reserved = [name for name in params if name in _RESERVED_PARAMS]
+    if reserved:
+        raise ValueError(f"Reserved parameter names: {', '.join(reserved)}")
+    try:
+        inspect.signature(JOB_KINDS[kind]).bind(None, **params)
+    except TypeError as error:
+        raise ValueError(f"Invalid parameters for {kind}: {error}")
+
+def enqueue(db: Session, kind: str, **params) -> Job:
+    if kind not in JOB_KINDS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    check_params(kind, params)
+    job = Job(kind=kind, params=params)
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+def enqueue_unless_pending(db: Session, kind: str, **params) -> Optional[Job]:
+    """Enqueue a job unless one of the same kind is already queued or running.
+
+    Every API process runs a scheduler, so the check and the insert are one
+    statement. SQLite runs it under its single write lock; on PostgreSQL a
+    transaction-scoped advisory lock on the kind serializes the schedulers.
+    """
+    if kind not in JOB_KINDS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(select(func.pg_advisory_xact_lock(zlib.crc32(f"jobs:{kind}".encode()))))
+    pending = exists().where(Job.kind == kind, Job.status.in_([JobStatus.QUEUED, JobStatus.RUNNING]))
+    job_id = db.scalar(
+        insert(Job)
+        .from_select(
+            ["kind", "params", "status", "progress", "cancel_requested"],
+            select(
+                literal(kind),
+                literal(params, JSON()),
+                literal(JobStatus.QUEUED, Job.status.type),
+                literal(0),
+                literal(False),
+            ).where(~pending),
+        )
+        .returning(Job.id)
+    )
+    db.commit()
+    return db.get(Job, job_id) if job_id is not None else None
+
+def schedule(kind: str, every: float):
+    """Enqueue `kind` every `every` seconds; a non-positive interval disables it"""
+    if every > 0:
+        SCHEDULES[kind] = every
+
+def request_cancel(db: Session, job_id: int) -> Optional[Job]:
+    """Cancel a queued job, or flag a running one to stop at its next progress report.
+
+    Both are conditional UPDATEs: a job claimed between the two is flagged, never
+    marked cancelled while its worker runs it.
+    """
+    cancelled = db.execute(
+        update(Job)
+        .where(Job.id == job_id, Job.status == JobStatus.QUEUED)
+        .values(status=JobStatus.CANCELLED, finished_at=func.now())
+    ).rowcount
+    if not cancelled:
+        db.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.status.in_([JobStatus.QUEUED, JobStatus.RUNNING]))
+            .values(cancel_requested=True)
+        )
+    db.commit()
+    return db.get(Job, job_id)
+
+def _requeue_stale(db: Session):
+    """Put back jobs whose worker stopped heartbeating (crashed or killed)"""
+    cutoff = _utcnow() - timedelta(seconds=settings.job_stale_seconds)
+    db.execute(
+        update(Job)
+        .where(Job.status == JobStatus.RUNNING, Job.heartbeat_at < cutoff)
+        .values(status=JobStatus.QUEUED, worker=None)
+    )
+    db.commit()
+
+def claim_next(db: Session, worker_name: str) -> Optional[int]:
+    candidate = db.scalars(
+        select(Job.id)
+        .where(Job.status == JobStatus.QUEUED, Job.kind.in_(list(JOB_KINDS)))
+        .order_by(Job.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    ).first()
+    if candidate is None:
+        db.rollback()
+        return None
+    claimed = db.execute(
+        update(Job)
+        .where(Job.id == candidate, Job.status == JobStatus.QUEUED)
+        .values(status=JobStatus.RUNNING, worker=worker_name, started_at=_utcnow(), heartbeat_at=_utcnow())
+    ).rowcount
+    db.commit()
+    return candidate if claimed else None
+
+def _heartbeat(job_id: int, worker_name: str, stop: threading.Event):
+    """Keep a running job from looking stale, however long it goes between progress reports"""
+    while not stop.wait(settings.job_stale_seconds / 3):
+        try:
+            with SessionLocal() as db:
+                owned = db.execute(update(Job).where(*_owned(job_id, worker_name)).values(heartbeat_at=_utcnow())).rowcount
+                db.commit()
+        except Exception:
+            logger.exception("Could not heartbeat job %s", job_id)
+            continue
+        if not owned:
+            return
+
+def run_job(job_id: int, worker_name: str):
+    with SessionLocal() as db:
+        job = db.get(Job, job_id)
+        func_, params = JOB_KINDS[job.kind], dict(job.params or {})
+
+    stop_heartbeat = threading.Event()
+    threading.Thread(
+        target=_heartbeat, args=(job_id, worker_name, stop_heartbeat), daemon=True, name=f"job-heartbeat-{job_id}"
+    ).start()
+    status, result, error = JobStatus.SUCCEEDED, None, None
+    try:
+        result = func_(JobContext(job_id, worker_name), **params)
+    except JobCancelled:
+        status = JobStatus.CANCELLED
+    except JobLost:
+        logger.warning("Job %s was requeued while %s ran it; dropping this run", job_id, worker_name)
+        return
+    except Exception as e:
+        logger.exception("Job %s failed", job_id)
+        status, error = JobStatus.FAILED, str(e)
+    finally:
+        stop_heartbeat.set()
+
+    with SessionLocal() as db:
+        finished = db.execute(
+            update(Job)
+            .where(*_owned(job_id, worker_name))
+            .values(status=status, result=result, error=error, finished_at=_utcnow())
+        ).rowcount
+        db.commit()
+    if not finished:
+        logger.warning("Job %s was requeued while %s ran it; dropping this run's result", job_id, worker_name)
+
+def work(stop: threading.Event, worker_name: str):
+    """Claim and run jobs until `stop` is set"""
+    polls = 0
+    while not stop.is_set():
+        try:
+            with SessionLocal() as db:
+                if polls % 30 == 0:
+                    _requeue_stale(db)
+                job_id = claim_next(db, worker_name)
+        except Exception:
+            logger.exception("Could not claim a job")
+            job_id = None
+        polls += 1
+        if job_id is None:
+            stop.wait(settings.job_poll_interval)
+        else:
+            run_job(job_id, worker_name)
+
+_stop = threading.Event()
+_threads: List[threading.Thread] = []
+
+def start_local_workers():
+    """Run job workers as threads of this process when JOB_BACKEND=local"""
+    if settings.job_backend != "local" or _threads:
+        return
+    _stop.clear()
+    for index in range(settings.job_workers):
+        name = f"{socket.gethostname()}:{os.getpid()}:{index}"
+        thread = threading.Thread(target=work, args=(_stop, name), daemon=True, name=f"job-worker-{index}")
+        thread.start()
+        _threads.append(thread)
+
+def stop_local_workers():
+    _stop.set()
+    _threads.clear()
+
+def _run_scheduler(stop: threading.Event):
+    next_run = {kind: time.monotonic() for kind in SCHEDULES}
+    while not stop.wait(1.0):
+        for kind, every in SCHEDULES.items():
+            if time.monotonic() < next_run[kind]:
+                continue
+            next_run[kind] = time.monotonic() + every
+            try:
+                with SessionLocal() as db:
+                    enqueue_unless_pending(db, kind)
+            except Exception:
+                logger.exception("Could not enqueue scheduled job %s", kind)
+
+_scheduler_stop = threading.Event()
+_scheduler: Optional[threading.Thread] = None
+
+def start_scheduler():
+    global _scheduler
+    if not SCHEDULES or _scheduler is not None:
+        return
+    _scheduler_stop.clear()
+    _scheduler = threading.Thread(target=_run_scheduler, args=(_scheduler_stop,), daemon=True, name="job-scheduler")
+    _scheduler.start()
+
+def stop_scheduler():
+    global _scheduler
+    _scheduler_stop.set()
+    _scheduler = None
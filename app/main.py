@@ -1,20 +1,64 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from .database import engine, Base
-from .routers import users_router, projects_router, tasks_router
+from fastapi.responses import PlainTextResponse
+from . import events, health, jobs, metrics, profiler
+from .admission import AdmissionMiddleware
+from .coalescing import CoalescingMiddleware
+from .compression import CompressionMiddleware
+from .context import RequestContextMiddleware
+from .profiler import ProfilerMiddleware
+from .replicas import ConsistencyTokenMiddleware, replicas
+from .tracing import TracingMiddleware
+from .database import engine
+from .migrations import upgrade_schema
+from .routers import users_router, projects_router, tasks_router, admin_router, events_router, jobs_router, batch_router, health_router
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+# Create database tables and apply pending schema upgrades
+upgrade_schema(engine)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    profiler.start_continuous(app)
+    events.start(engine, asyncio.get_running_loop())
+    jobs.start_local_workers()
+    jobs.start_scheduler()
+    replicas.start()
+    # Readiness stays 503 until warm-up has filled the pool and primed the statement cache
+    health.start()
+    yield
+    health.stop()
+    replicas.stop()
+    jobs.stop_scheduler()
+    jobs.stop_local_workers()
+    events.stop()
+    profiler.stop_continuous()
 
 app = FastAPI(
     title="Task Management API",
     description="A comprehensive task management system with users, projects, and tasks",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
+app.add_middleware(ProfilerMiddleware)
+app.add_middleware(RequestContextMiddleware)
+app.add_middleware(ConsistencyTokenMiddleware)
+app.add_middleware(TracingMiddleware)
+app.add_middleware(AdmissionMiddleware)
+# Outside admission control, so requests waiting on an identical one hold no slot
+app.add_middleware(CoalescingMiddleware)
+app.add_middleware(CompressionMiddleware)
+
 # Include routers
 app.include_router(users_router)
 app.include_router(projects_router)
 app.include_router(tasks_router)
+app.include_router(admin_router)
+app.include_router(events_router)
+app.include_router(jobs_router)
+app.include_router(batch_router)
+app.include_router(health_router)
 
 @app.get("/")
 def read_root():
@@ -24,6 +68,8 @@ def read_root():
         "redoc": "/redoc"
     }
 
-@app.get("/health")
-def health_check():
-    return {"status": "healthy"}
\ No newline at end of file
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    return metrics.render()
+# Lets a profiled request sample the threadpool thread running its endpoint
+profiler.record_endpoint_threads(app)
@@ -0,0 +1,110 @@
+"""
+Minimal in-process metrics in the Prometheus text format, served at /metrics.
+
+Values are per process; with several gunicorn workers each scrape sees
+one worker, which Prometheus aggregates by pod/instance as usual.
+"""
+import threading
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+_registry: List["_Metric"] = []
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _format_labels(self, key: Tuple[str, ...], extra: str = "") -> str:
+        parts = [f'{name}="{value}"' for name, value in zip(self.labelnames, key)]
+        if extra:
+            parts.append(extra)
+        return "{" + ",".join(parts) + "}" if parts else ""
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            return [f"{self.name}{self._format_labels(key)} {value}" for key, value in self._values.items()]
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        return "\n".join(lines + self.samples())
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+class Gauge(_Metric):
+    type = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), function: Optional[Callable[[], float]] = None):
+        super().__init__(name, documentation, labelnames)
+        self.function = function
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def samples(self) -> List[str]:
+        if self.function is not None:
+            return [f"{self.name} {self.function()}"]
+        return super().samples()
+
+class Histogram(_Metric):
+    type = "histogram"
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+        self._observations: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            # Per-bucket counts, then +Inf count and sum
+            counts = self._observations.setdefault(key, [0] * (len(self.buckets) + 2))
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+            counts[-2] += 1
+            counts[-1] += value
+
+    def samples(self) -> List[str]:
+        lines = []
+        with self._lock:
+            for key, counts in self._observations.items():
+                for bound, count in zip(self.buckets, counts):
+                    le = f'le="{bound}"'
+                    lines.append(f"{self.name}_bucket{self._format_labels(key, le)} {count}")
+                le = 'le="+Inf"'
+                lines.append(f"{self.name}_bucket{self._format_labels(key, le)} {counts[-2]}")
+                lines.append(f"{self.name}_count{self._format_labels(key)} {counts[-2]}")
+                lines.append(f"{self.name}_sum{self._format_labels(key)} {counts[-1]}")
+        return lines
+
+def render() -> str:
+    return "\n".join(metric.render() for metric in _registry) + "\n"
@@ -0,0 +1,140 @@
+"""
+Idempotent schema upgrades run at startup.
+
+`create_all` only creates missing tables, so columns, indexes and data
+fixes added to existing tables are applied here. Every step must be safe
+to run on every start.
+"""
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateColumn
+from .database import Base
+from . import models  # noqa: F401  (registers every table on Base.metadata)
+
+def _add_missing_columns(conn):
+    inspector = inspect(conn)
+    for table in Base.metadata.sorted_tables:
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            if column.computed is not None:
+                # Generated columns fill themselves; SQLite can only add virtual ones, its default
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {CreateColumn(column).compile(dialect=conn.dialect)}"))
+                continue
+            ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(dialect=conn.dialect)}"
+            if column.server_default is not None:
+                ddl += f" DEFAULT {_default_sql(column.server_default.arg, conn.dialect)}"
+            conn.execute(text(ddl))
+
+def _default_sql(arg, dialect) -> str:
+    if isinstance(arg, str):
+        return "'" + arg.replace("'", "''") + "'"
+    return str(arg.compile(dialect=dialect))
+
+def _create_missing_indexes(conn):
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+
+# Indexes the models replaced with better-fitting ones
+_OBSOLETE_INDEXES = ["ix_tasks_assignee_workload", "ix_deletions_entity_deleted_at"]
+
+def _drop_obsolete_indexes(conn):
+    for name in _OBSOLETE_INDEXES:
+        conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+def _sync_foreign_key_actions(conn):
+    """Recreate PostgreSQL foreign keys whose ON DELETE action differs from the models.
+
+    SQLite cannot alter a constraint, only rebuild the table, so an existing
+    SQLite database keeps the actions it was created with; recreate it to pick
+    up changed ones.
+    """
+    if conn.dialect.name != "postgresql":
+        return
+    inspector = inspect(conn)
+    for table in Base.metadata.sorted_tables:
+        existing = {tuple(fk["constrained_columns"]): fk for fk in inspector.get_foreign_keys(table.name)}
+        for constraint in table.foreign_key_constraints:
+            reflected = existing.get(tuple(constraint.column_keys))
+            wanted = (constraint.ondelete or "NO ACTION").upper()
+            if reflected is None or (reflected["options"].get("ondelete") or "NO ACTION").upper() == wanted:
+                continue
+            name = reflected["name"]
+            columns = ", ".join(constraint.column_keys)
+            referred = ", ".join(element.column.name for element in constraint.elements)
+            conn.execute(text(f"ALTER TABLE {table.name} DROP CONSTRAINT {name}"))
+            conn.execute(text(
+                f"ALTER TABLE {table.name} ADD CONSTRAINT {name} FOREIGN KEY ({columns}) "
+                f"REFERENCES {constraint.referred_table.name} ({referred}) ON DELETE {wanted}"
+            ))
+
+def _backfill_updated_at(conn):
+    # Rows created before updated_at had an insert default are invisible to the change feeds
+    for table in ("users", "projects", "tasks"):
+        conn.execute(text(f"UPDATE {table} SET updated_at = created_at WHERE updated_at IS NULL"))
+        if conn.dialect.name == "postgresql":
+            conn.execute(text(f"ALTER TABLE {table} ALTER COLUMN updated_at SET DEFAULT now()"))
+
+def _backfill_change_seq(conn):
+    # Rows from before the change feeds were commit-ordered sort before every token
+    for table in _CHANGE_SEQ_TABLES:
+        conn.execute(text(f"UPDATE {table} SET change_seq = 0 WHERE change_seq IS NULL"))
+
+_DATA_STEPS = [
+    _backfill_updated_at,
+    _backfill_change_seq,
+]
+
+# Tables whose writes the change feeds see, through their change_seq column
+_CHANGE_SEQ_TABLES = ("users", "projects", "tasks", "deletions")
+
+def _install_change_seq_triggers(conn):
+    """Number every insert and update in commit order, whatever statement made it.
+
+    On PostgreSQL a row gets the id of the transaction that wrote it; a feed
+    token is the oldest transaction still in progress, so nothing that commits
+    later can be numbered below it. SQLite has a single writer, so a counter
+    bumped inside the writing transaction is already in commit order.
+    """
+    if conn.dialect.name == "postgresql":
+        conn.execute(text(
+            "CREATE OR REPLACE FUNCTION set_change_seq() RETURNS trigger LANGUAGE plpgsql AS $$ "
+            "BEGIN NEW.change_seq := txid_current(); RETURN NEW; END $$"
+        ))
+        for table in _CHANGE_SEQ_TABLES:
+            exists = conn.scalar(text("SELECT 1 FROM pg_trigger WHERE tgname = :name"), {"name": f"{table}_change_seq"})
+            if not exists:
+                conn.execute(text(
+                    f"CREATE TRIGGER {table}_change_seq BEFORE INSERT OR UPDATE ON {table} "
+                    f"FOR EACH ROW EXECUTE FUNCTION set_change_seq()"
+                ))
+    elif conn.dialect.name == "sqlite":
+        conn.execute(text("CREATE TABLE IF NOT EXISTS change_sequence (value INTEGER NOT NULL)"))
+        conn.execute(text("INSERT INTO change_sequence (value) SELECT 0 WHERE NOT EXISTS (SELECT 1 FROM change_sequence)"))
+        number_row = (
+            "BEGIN UPDATE change_sequence SET value = value + 1; "
+            "UPDATE {table} SET change_seq = (SELECT value FROM change_sequence) WHERE id = NEW.id; END"
+        )
+        for table in _CHANGE_SEQ_TABLES:
+            conn.execute(text(
+                f"CREATE TRIGGER IF NOT EXISTS {table}_change_seq_insert AFTER INSERT ON {table} "
+                + number_row.format(table=table)
+            ))
+            if table != "deletions":
+                conn.execute(text(
+                    f"CREATE TRIGGER IF NOT EXISTS {table}_change_seq_update AFTER UPDATE ON {table} "
+                    f"WHEN NEW.change_seq IS OLD.change_seq " + number_row.format(table=table)
+                ))
+
+def upgrade_schema(engine):
+    """Create missing tables, then bring existing ones up to date with the models"""
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        _add_missing_columns(conn)
+        _create_missing_indexes(conn)
+        _drop_obsolete_indexes(conn)
+        _sync_foreign_key_actions(conn)
+        for step in _DATA_STEPS:
+            step(conn)
+        _install_change_seq_triggers(conn)
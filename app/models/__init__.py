@@ -1,5 +1,9 @@
 from .user import User
 from .project import Project, ProjectStatus
 from .task import Task, TaskStatus, TaskPriority
+from .archived_task import ArchivedTask
+from .deletion import Deletion
+from .job import Job, JobStatus
+from .reminder import TaskReminder, Watermark
 
-__all__ = ["User", "Project", "ProjectStatus", "Task", "TaskStatus", "TaskPriority"]
\ No newline at end of file
+__all__ = ["User", "Project", "ProjectStatus", "Task", "TaskStatus", "TaskPriority", "ArchivedTask", "Deletion", "Job", "JobStatus", "TaskReminder", "Watermark"]
@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum, Boolean
+from sqlalchemy.sql import func
+from ..database import Base
+from .task import TaskStatus, TaskPriority
+
+class ArchivedTask(Base):
+    """Cold storage for tasks completed long ago; same columns as `tasks`, ids kept"""
+    __tablename__ = "tasks_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    title = Column(String, nullable=False)
+    description = Column(Text)
+    status = Column(Enum(TaskStatus))
+    priority = Column(Enum(TaskPriority))
+    is_completed = Column(Boolean)
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False, index=True)
+    assignee_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"))
+    created_at = Column(DateTime(timezone=True))
+    updated_at = Column(DateTime(timezone=True))
+    due_date = Column(DateTime(timezone=True))
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    archived_at = Column(DateTime(timezone=True), default=func.now(), server_default=func.now(), nullable=False)
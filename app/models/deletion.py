@@ -0,0 +1,20 @@
+from sqlalchemy import BigInteger, Column, Integer, String, DateTime, Index
+from sqlalchemy.sql import func
+from ..database import Base
+
+class Deletion(Base):
+    """Tombstone for a deleted row, served by the /{entity}/changes feeds"""
+    __tablename__ = "deletions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    entity = Column(String, nullable=False)
+    entity_id = Column(Integer, nullable=False)
+    deleted_at = Column(DateTime(timezone=True), default=func.now(), server_default=func.now(), nullable=False)
+    # Commit-ordered change number for the /changes feeds, set by a trigger (see app/migrations.py)
+    change_seq = Column(BigInteger)
+
+    __table_args__ = (
+        Index("ix_deletions_entity_change_seq", "entity", "change_seq"),
+        # For purging tombstones past the retention
+        Index("ix_deletions_deleted_at", "deleted_at"),
+    )
@@ -0,0 +1,29 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, Enum, Boolean, JSON
+from sqlalchemy.sql import func
+import enum
+from ..database import Base
+
+class JobStatus(enum.Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+class Job(Base):
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String, nullable=False)
+    params = Column(JSON, nullable=False, default=dict)
+    status = Column(Enum(JobStatus), default=JobStatus.QUEUED, nullable=False, index=True)
+    progress = Column(Integer, default=0, nullable=False)
+    total = Column(Integer)
+    result = Column(JSON)
+    error = Column(Text)
+    cancel_requested = Column(Boolean, default=False, nullable=False)
+    worker = Column(String)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True))
+    heartbeat_at = Column(DateTime(timezone=True))
+    finished_at = Column(DateTime(timezone=True))
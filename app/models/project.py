@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum
+from sqlalchemy import BigInteger, Column, Integer, String, Text, DateTime, ForeignKey, Enum
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import enum
@@ -19,8 +19,19 @@ class Project(Base):
     status = Column(Enum(ProjectStatus), default=ProjectStatus.PLANNING)
     owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    updated_at = Column(DateTime(timezone=True), default=func.now(), server_default=func.now(), onupdate=func.now(), index=True)
+    # Commit-ordered change number for the /changes feeds, set by a trigger (see app/migrations.py)
+    change_seq = Column(BigInteger, index=True)
+    # Maintained by app.counters on every task write
+    task_count = Column(Integer, default=0, server_default="0", nullable=False)
+    completed_count = Column(Integer, default=0, server_default="0", nullable=False)
+    overdue_count = Column(Integer, default=0, server_default="0", nullable=False)
+    # Bumped by every update; checked against If-Match (see app/concurrency.py)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
 
     # Relationships
     owner = relationship("User", back_populates="projects")
-    tasks = relationship("Task", back_populates="project", cascade="all, delete-orphan")
\ No newline at end of file
+    # Tasks are removed by ON DELETE CASCADE instead of being loaded and deleted one by one
+    tasks = relationship("Task", back_populates="project", cascade="all, delete-orphan", passive_deletes=True)
+
+    __mapper_args__ = {"version_id_col": version}
@@ -0,0 +1,24 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, UniqueConstraint
+from sqlalchemy.sql import func
+from ..database import Base
+
+class TaskReminder(Base):
+    """A task found overdue by the reminder scanner, waiting to be notified"""
+    __tablename__ = "task_reminders"
+
+    id = Column(Integer, primary_key=True, index=True)
+    task_id = Column(Integer, ForeignKey("tasks.id", ondelete="CASCADE"), nullable=False)
+    assignee_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), index=True)
+    due_date = Column(DateTime(timezone=True), nullable=False)
+    created_at = Column(DateTime(timezone=True), default=func.now(), server_default=func.now(), nullable=False)
+    notified_at = Column(DateTime(timezone=True), index=True)
+
+    __table_args__ = (UniqueConstraint("task_id", "due_date", name="uq_task_reminders_task_due"),)
+
+class Watermark(Base):
+    """How far an incremental scanner has got, as the (timestamp, id) key of the last row it handled"""
+    __tablename__ = "watermarks"
+
+    name = Column(String, primary_key=True)
+    position = Column(DateTime(timezone=True), nullable=False)
+    last_id = Column(Integer, nullable=False, default=0)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum, Boolean
+from sqlalchemy import BigInteger, Column, Computed, Integer, String, Text, DateTime, ForeignKey, Enum, Boolean, Index, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import enum
@@ -15,6 +15,12 @@ class TaskPriority(enum.Enum):
     HIGH = "high"
     URGENT = "urgent"
 
+# Most urgent first; the enum is stored by name, so sorting the column itself would be alphabetical
+_PRIORITY_RANK = "CASE priority " + " ".join(
+    f"WHEN '{priority.name}' THEN {rank}"
+    for rank, priority in enumerate([TaskPriority.URGENT, TaskPriority.HIGH, TaskPriority.MEDIUM, TaskPriority.LOW])
+) + " ELSE 4 END"
+
 class Task(Base):
     __tablename__ = "tasks"
 
@@ -24,12 +30,37 @@ class Task(Base):
     status = Column(Enum(TaskStatus), default=TaskStatus.TODO)
     priority = Column(Enum(TaskPriority), default=TaskPriority.MEDIUM)
     is_completed = Column(Boolean, default=False)
-    project_id = Column(Integer, ForeignKey("projects.id"), nullable=False)
-    assignee_id = Column(Integer, ForeignKey("users.id"))
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False)
+    assignee_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    updated_at = Column(DateTime(timezone=True), default=func.now(), server_default=func.now(), onupdate=func.now(), index=True)
     due_date = Column(DateTime(timezone=True))
+    # Commit-ordered change number for the /changes feeds, set by a trigger (see app/migrations.py)
+    change_seq = Column(BigInteger, index=True)
+    # Sort keys of GET /users/{id}/tasks, computed by the database so an index can hold them
+    priority_rank = Column(Integer, Computed(_PRIORITY_RANK))
+    # Tasks without a due date sort after every dated one
+    due_sort = Column(DateTime(timezone=True), Computed("coalesce(due_date, '9999-12-31 00:00:00.000000')"))
+    # Bumped by every update; checked against If-Match (see app/concurrency.py)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+
+    __table_args__ = (
+        # Serves GET /users/{id}/tasks in its sort order, and its status counts, without
+        # touching the table on PostgreSQL
+        Index("ix_tasks_assignee_priority_due", "assignee_id", "is_completed", "priority_rank", "due_sort", "id",
+              postgresql_include=["status", "priority"]),
+        # Open tasks by due date, for /tasks/overdue, /tasks/due and the reminder scanner;
+        # queries must filter on `~Task.is_completed` for the planner to pick it
+        Index("ix_tasks_open_due_date", "due_date", "id",
+              postgresql_where=text("NOT is_completed"), sqlite_where=text("NOT is_completed")),
+        # Archived tasks keep their ids, so SQLite must not hand out the id of an
+        # archived (max-id) task again; PostgreSQL sequences never go back anyway.
+        # Only applies to tables created with it: SQLite cannot add it to an existing one
+        {"sqlite_autoincrement": True},
+    )
 
     # Relationships
     project = relationship("Project", back_populates="tasks")
-    assignee = relationship("User", back_populates="tasks")
\ No newline at end of file
+    assignee = relationship("User", back_populates="tasks")
+
+    __mapper_args__ = {"version_id_col": version}
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean
+from sqlalchemy import BigInteger, Column, Integer, String, DateTime, Boolean
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from ..database import Base
@@ -12,8 +12,15 @@ class User(Base):
     full_name = Column(String, nullable=False)
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    updated_at = Column(DateTime(timezone=True), default=func.now(), server_default=func.now(), onupdate=func.now(), index=True)
+    # Commit-ordered change number for the /changes feeds, set by a trigger (see app/migrations.py)
+    change_seq = Column(BigInteger, index=True)
+    # Bumped by every update; checked against If-Match (see app/concurrency.py)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
 
     # Relationships
     projects = relationship("Project", back_populates="owner")
-    tasks = relationship("Task", back_populates="assignee")
\ No newline at end of file
+    # Assignments are cleared by ON DELETE SET NULL
+    tasks = relationship("Task", back_populates="assignee", passive_deletes=True)
+
+    __mapper_args__ = {"version_id_col": version}
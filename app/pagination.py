@@ -0,0 +1,28 @@
+"""
+Opaque cursors for keyset pagination.
+
+A cursor holds the sort key of the last row of a page; the next page is
+the rows whose key sorts after it (`tuple_(...) > tuple_(*key)`), which
+an index can seek to directly instead of counting past OFFSET rows.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional
+from fastapi import HTTPException
+
+def encode_cursor(key: List[Any]) -> str:
+    values = [value.isoformat() if isinstance(value, datetime) else value for value in key]
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: Optional[str], datetime_positions=()) -> Optional[List[Any]]:
+    """Sort key stored in `cursor`; values at `datetime_positions` are parsed back to datetimes"""
+    if cursor is None:
+        return None
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        for position in datetime_positions:
+            values[position] = datetime.fromisoformat(values[position])
+        return values
+    except (ValueError, TypeError, IndexError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
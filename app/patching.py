@@ -0,0 +1,41 @@
+"""
+Single-statement partial updates for the PATCH endpoints.
+
+`patch_row` issues one `UPDATE ... WHERE id = :id AND <conditions>
+RETURNING *` instead of loading the row, setting attributes and
+refreshing it. Checks that would otherwise need their own query go into
+`conditions`, as does the If-Match version; callers look deeper only
+when no row matched, through `raise_for_miss`.
+"""
+from typing import Dict, Optional
+from fastapi import HTTPException
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+from .concurrency import precondition_failed
+
+def patch_row(db: Session, model, row_id: int, values: Dict, *conditions, expected_version: Optional[int] = None) -> Optional[object]:
+    """Apply `values` to row `row_id` of `model` and return it, or None if nothing matched"""
+    if expected_version is not None:
+        conditions += (model.version == expected_version,)
+    if not values:
+        # Nothing to change; do not bump updated_at or the version
+        return db.scalars(select(model).where(model.id == row_id, *conditions)).first()
+    return db.scalars(
+        update(model)
+        .where(model.id == row_id, *conditions)
+        .values(**values, version=model.version + 1)
+        .returning(model)
+        .execution_options(synchronize_session=False)
+    ).first()
+
+def raise_for_miss(db: Session, model, row_id: int, expected_version: Optional[int], not_found: str):
+    """After a patch matched no row: 404 if it does not exist, 412 if its version moved on.
+
+    Returns normally when neither applies, i.e. one of the caller's own conditions failed.
+    """
+    db.rollback()
+    current = db.scalar(select(model.version).where(model.id == row_id))
+    if current is None:
+        raise HTTPException(status_code=404, detail=not_found)
+    if expected_version is not None and current != expected_version:
+        raise precondition_failed(current)
@@ -0,0 +1,207 @@
+import asyncio
+import functools
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict, defaultdict
+from contextvars import ContextVar
+from typing import Callable, Dict, Optional, Set, Tuple
+from fastapi.routing import APIRoute
+from .config import settings
+from .security import is_admin_token
+
+# Leaf frames that mean a thread is parked rather than doing work
+_IDLE_FUNCTIONS = {"wait", "select", "poll", "_wait_for_tstate_lock", "get", "accept", "sleep"}
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    filename = code.co_filename.rsplit("/", 2)
+    return f"{code.co_name} ({'/'.join(filename[-2:])}:{code.co_firstlineno})"
+
+def collapse(frame) -> str:
+    """Render a stack root-first in the collapsed format used by flamegraph.pl and speedscope"""
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+def format_collapsed(counts: Counter) -> str:
+    return "\n".join(f"{stack} {count}" for stack, count in counts.most_common())
+
+def _is_idle(frame) -> bool:
+    return frame.f_code.co_name in _IDLE_FUNCTIONS
+
+class StackSampler(threading.Thread):
+    """Sample the stacks of busy threads every `interval` seconds.
+
+    With `threads`, only the threads whose idents are in that set at the
+    time of a sample; otherwise every thread but the sampler's own.
+    """
+
+    def __init__(self, interval: float, on_sample: Callable, threads: Optional[Set[int]] = None):
+        super().__init__(daemon=True, name="stack-sampler")
+        self.interval = interval
+        self.on_sample = on_sample
+        self.threads = threads
+        self._stopped = threading.Event()
+
+    def run(self):
+        own_ident = threading.get_ident()
+        while not self._stopped.wait(self.interval):
+            frames = sys._current_frames()
+            if self.threads is not None:
+                frames = {ident: frames[ident] for ident in tuple(self.threads) if ident in frames}
+            for ident, frame in frames.items():
+                if ident != own_ident and not _is_idle(frame):
+                    self.on_sample(frame)
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+# Single-request profiles, kept until evicted by newer ones
+_profiles: "OrderedDict[str, Dict]" = OrderedDict()
+_profiles_lock = threading.Lock()
+
+def get_profile(profile_id: str) -> Optional[Dict]:
+    with _profiles_lock:
+        return _profiles.get(profile_id)
+
+def _store_profile(profile: Dict):
+    with _profiles_lock:
+        _profiles[profile["id"]] = profile
+        while len(_profiles) > settings.profile_store_size:
+            _profiles.popitem(last=False)
+
+# Idents of the threads working on the profiled request of this context
+_request_threads: ContextVar[Optional[Set[int]]] = ContextVar("profiled_request_threads", default=None)
+
+def _record_thread(call: Callable) -> Callable:
+    @functools.wraps(call)
+    def run(*args, **kwargs):
+        threads = _request_threads.get()
+        if threads is None:
+            return call(*args, **kwargs)
+        ident = threading.get_ident()
+        threads.add(ident)
+        try:
+            return call(*args, **kwargs)
+        finally:
+            threads.discard(ident)
+    return run
+
+def record_endpoint_threads(app):
+    """Have sync endpoints add their threadpool thread to a profiled request's threads.
+
+    Async endpoints run on the event-loop thread, which is always sampled.
+    Call once after every router is included.
+    """
+    for route in app.routes:
+        if isinstance(route, APIRoute) and not asyncio.iscoroutinefunction(route.dependant.call):
+            route.dependant.call = _record_thread(route.dependant.call)
+
+class ProfilerMiddleware:
+    """Profile a single request when it carries `X-Profile: 1` and a valid `X-Admin-Token`.
+
+    Only the request's own threads are sampled: the event-loop thread and,
+    for sync endpoints, the threadpool thread running the endpoint. The
+    collapsed stacks are stored under the route template and their id is
+    returned in the `X-Profile-Id` header.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._wants_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        counts: Counter = Counter()
+        profile_id = uuid.uuid4().hex
+        threads = {threading.get_ident()}
+        sampler = StackSampler(
+            settings.profile_sample_interval_ms / 1000, lambda frame: counts.update((collapse(frame),)), threads
+        )
+
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", []).append((b"x-profile-id", profile_id.encode()))
+            await send(message)
+
+        started = time.perf_counter()
+        token = _request_threads.set(threads)
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            sampler.stop()
+            _request_threads.reset(token)
+            # Routing leaves the matched route in the scope; store its template, not the raw path
+            route = getattr(scope.get("route"), "path_format", "<other>")
+            _store_profile({
+                "id": profile_id,
+                "route": f"{scope['method']} {route}",
+                "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+                "samples": sum(counts.values()),
+                "collapsed": format_collapsed(counts),
+            })
+
+    @staticmethod
+    def _wants_profile(scope) -> bool:
+        headers = dict(scope["headers"])
+        return headers.get(b"x-profile") == b"1" and is_admin_token(headers.get(b"x-admin-token", b"").decode())
+
+# Continuous low-rate sampling, aggregated per route
+_route_stacks: Dict[str, Counter] = defaultdict(Counter)
+_route_stacks_lock = threading.Lock()
+_continuous_sampler: Optional[StackSampler] = None
+
+def _endpoint_codes(app) -> Dict:
+    codes = {}
+    for route in app.routes:
+        endpoint = getattr(route, "endpoint", None)
+        if endpoint is not None and hasattr(endpoint, "__code__"):
+            for method in getattr(route, "methods", None) or ["GET"]:
+                codes[endpoint.__code__] = f"{method} {route.path}"
+    return codes
+
+def start_continuous(app):
+    """Start the background sampler when PROFILE_CONTINUOUS_INTERVAL_MS is set"""
+    global _continuous_sampler
+    if settings.profile_continuous_interval_ms <= 0 or _continuous_sampler is not None:
+        return
+    codes = _endpoint_codes(app)
+
+    def on_sample(frame):
+        route = "<other>"
+        current = frame
+        while current is not None:
+            if current.f_code in codes:
+                route = codes[current.f_code]
+                break
+            current = current.f_back
+        with _route_stacks_lock:
+            _route_stacks[route][collapse(frame)] += 1
+
+    _continuous_sampler = StackSampler(settings.profile_continuous_interval_ms / 1000, on_sample)
+    _continuous_sampler.start()
+
+def stop_continuous():
+    global _continuous_sampler
+    if _continuous_sampler is not None:
+        _continuous_sampler.stop()
+        _continuous_sampler = None
+
+def route_summary() -> Dict[str, int]:
+    """Total samples per route from the continuous sampler"""
+    with _route_stacks_lock:
+        return {route: sum(counts.values()) for route, counts in _route_stacks.items()}
+
+def route_collapsed(route: str) -> Tuple[bool, str]:
+    with _route_stacks_lock:
+        if route not in _route_stacks:
+            return False, ""
+        return True, format_collapsed(_route_stacks[route])
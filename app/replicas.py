@@ -0,0 +1,206 @@
+"""
+Read-replica routing with read-your-writes consistency.
+
+GET handlers take `get_read_db`, which binds reads to a healthy replica
+(round-robin); replicas lagging more than REPLICA_MAX_LAG_SECONDS behind
+the primary are left out until they catch up. After a request commits on
+the primary, the response carries an X-Consistency-Token: the primary's
+WAL LSN on PostgreSQL, read on the connection that committed, or the
+commit time elsewhere. A client that sends the token back is only served
+by replicas known to have replayed that LSN (or, for time tokens, by the
+primary until REPLICA_MAX_LAG_SECONDS have passed).
+"""
+import itertools
+import logging
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+from fastapi import Request
+from sqlalchemy import event, text
+from .config import settings
+from .database import SessionLocal, engine, get_db, make_engine, shared_connection
+from .metrics import Gauge
+
+logger = logging.getLogger(__name__)
+
+TOKEN_HEADER = "x-consistency-token"
+
+def parse_lsn(value: str) -> int:
+    high, low = value.split("/")
+    return (int(high, 16) << 32) + int(low, 16)
+
+def _current_position(conn) -> Optional[str]:
+    if conn.dialect.name != "postgresql":
+        return None
+    # On a standby this is the replayed position; on a primary, its own WAL position
+    return conn.scalar(text("SELECT COALESCE(pg_last_wal_replay_lsn(), pg_current_wal_lsn())::text"))
+
+def _replication_lag(conn) -> float:
+    """Seconds a standby's replay trails the primary; 0 when it has replayed all it received"""
+    if conn.dialect.name != "postgresql":
+        return 0.0
+    return conn.scalar(text(
+        "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+        "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+    ))
+
+class Replica:
+    def __init__(self, url: str):
+        self.engine = make_engine(url)
+        self.healthy = True
+        self.lsn: Optional[int] = None
+        self.lag = 0.0
+
+    @property
+    def name(self) -> str:
+        return self.engine.url.render_as_string(hide_password=True)
+
+    @property
+    def usable(self) -> bool:
+        return self.healthy and self.lag <= settings.replica_max_lag_seconds
+
+    def check(self):
+        try:
+            with self.engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+                position = _current_position(conn)
+                lag = float(_replication_lag(conn))
+            self.lsn = parse_lsn(position) if position else None
+            self.healthy = True
+        except Exception:
+            if self.healthy:
+                logger.warning("Replica %s failed its health check", self.name)
+            self.healthy = False
+            return
+        if lag > settings.replica_max_lag_seconds >= self.lag:
+            logger.warning("Replica %s lags %.1fs behind the primary; not reading from it", self.name, lag)
+        self.lag = lag
+
+class ReplicaSet:
+    def __init__(self, urls: List[str]):
+        self.replicas = [Replica(url) for url in urls]
+        self._cycle = itertools.cycle(self.replicas) if self.replicas else None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def pick(self, token: Optional[str]):
+        """Next healthy replica able to serve a client holding `token`, or None for the primary"""
+        if not self.replicas:
+            return None
+        required_lsn = None
+        if token:
+            kind, _, value = token.partition(":")
+            try:
+                if kind == "ts":
+                    if time.time() < float(value) + settings.replica_max_lag_seconds:
+                        return None
+                elif kind == "lsn":
+                    required_lsn = parse_lsn(value)
+            except ValueError:
+                return None
+        for _ in range(len(self.replicas)):
+            replica = next(self._cycle)
+            if not replica.usable:
+                continue
+            if required_lsn is not None and (replica.lsn is None or replica.lsn < required_lsn):
+                continue
+            return replica.engine
+        return None
+
+    def _run(self):
+        while not self._stop.wait(settings.replica_health_interval):
+            for replica in self.replicas:
+                replica.check()
+
+    def start(self):
+        if self.replicas and self._thread is None:
+            for replica in self.replicas:
+                replica.check()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True, name="replica-health")
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread = None
+
+replicas = ReplicaSet(settings.database_replica_urls)
+Gauge("db_replicas_healthy", "Read replicas passing health checks",
+      function=lambda: sum(replica.healthy for replica in replicas.replicas))
+Gauge("db_replicas_usable", "Read replicas healthy and within REPLICA_MAX_LAG_SECONDS of the primary",
+      function=lambda: sum(replica.usable for replica in replicas.replicas))
+
+def get_read_db(request: Request):
+    """Session for read-only handlers, routed to a replica when one can serve this client"""
+    if shared_connection.get() is not None:
+        # Inside an atomic batch, reads must see the batch's own uncommitted writes
+        yield from get_db()
+        return
+    db = SessionLocal()
+    read_engine = replicas.pick(request.headers.get(TOKEN_HEADER))
+    if read_engine is not None:
+        db.info["read_engine"] = read_engine
+    try:
+        yield db
+    finally:
+        db.close()
+
+# Token of the primary commit made while handling the current request
+_request_writes: ContextVar[Optional[Dict]] = ContextVar("request_writes", default=None)
+
+def record_commit(connection):
+    """Set the current request's token from a commit just made on `connection`.
+
+    The connection must still be open: on PostgreSQL the LSN is read on it, so
+    no other connection is checked out of the pool for every commit.
+    """
+    holder = _request_writes.get()
+    if holder is None or not replicas.replicas:
+        return
+    position = _current_position(connection)
+    holder["token"] = f"lsn:{position}" if position is not None else f"ts:{time.time():.3f}"
+
+@event.listens_for(SessionLocal, "after_begin")
+def _remember_primary_connection(session, transaction, connection):
+    if connection.engine is engine:
+        session.info["primary_connection"] = connection
+
+@event.listens_for(SessionLocal, "after_transaction_end")
+def _forget_primary_connection(session, transaction):
+    if transaction.parent is None:
+        session.info.pop("primary_connection", None)
+
+@event.listens_for(SessionLocal, "after_commit")
+def _record_commit(session):
+    connection = session.info.get("primary_connection")
+    # Inside an atomic batch this commit only released a savepoint; the batch
+    # records its token once the shared transaction commits
+    if connection is None or shared_connection.get() is not None:
+        return
+    record_commit(connection)
+
+class ConsistencyTokenMiddleware:
+    """Attach X-Consistency-Token to responses of requests that committed on the primary"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in ("GET", "HEAD"):
+            await self.app(scope, receive, send)
+            return
+
+        # Operations of a POST /batch share the batch's holder, so its response carries the token too
+        holder: Dict = _request_writes.get() if _request_writes.get() is not None else {}
+        token = _request_writes.set(holder)
+
+        async def send_with_token(message):
+            if message["type"] == "http.response.start" and "token" in holder:
+                message.setdefault("headers", []).append((TOKEN_HEADER.encode(), holder["token"].encode()))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_token)
+        finally:
+            _request_writes.reset(token)
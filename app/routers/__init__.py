@@ -1,5 +1,10 @@
 from .users import router as users_router
 from .projects import router as projects_router
 from .tasks import router as tasks_router
+from .admin import router as admin_router
+from .events import router as events_router
+from .jobs import router as jobs_router
+from .batch import router as batch_router
+from .health import router as health_router
 
-__all__ = ["users_router", "projects_router", "tasks_router"]
\ No newline at end of file
+__all__ = ["users_router", "projects_router", "tasks_router", "admin_router", "events_router", "jobs_router", "batch_router", "health_router"]
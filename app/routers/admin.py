@@ -0,0 +1,50 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+from .. import profiler, slow_queries
+from ..security import is_admin_token
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Reject requests that do not carry the configured admin token"""
+    if not is_admin_token(x_admin_token):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+router = APIRouter(
+    prefix="/admin",
+    tags=["admin"],
+    dependencies=[Depends(require_admin)],
+)
+
+@router.get("/slow-queries")
+def get_slow_queries(limit: int = 50):
+    """Get the most recent slow queries, newest first"""
+    return slow_queries.recent(limit)
+
+@router.get("/profiles/routes")
+def get_route_profiles():
+    """Get sample totals per route from the continuous profiler"""
+    return profiler.route_summary()
+
+@router.get("/profiles/routes/collapsed", response_class=PlainTextResponse)
+def get_route_profile(route: str):
+    """Get collapsed stacks for one route, e.g. `GET /tasks/`"""
+    found, collapsed = profiler.route_collapsed(route)
+    if not found:
+        raise HTTPException(status_code=404, detail="No samples for route")
+    return collapsed
+
+@router.get("/profiles/{profile_id}")
+def get_profile(profile_id: str):
+    """Get a single-request profile recorded with the X-Profile header"""
+    profile = profiler.get_profile(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return profile
+
+@router.get("/profiles/{profile_id}/collapsed", response_class=PlainTextResponse)
+def get_profile_collapsed(profile_id: str):
+    """Get a single-request profile as collapsed stacks for flamegraph tools"""
+    profile = profiler.get_profile(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return profile["collapsed"]
@@ -0,0 +1,124 @@
+import asyncio
+import json
+from typing import Dict, List
+from fastapi import APIRouter, HTTPException, Request
+from starlette.concurrency import run_in_threadpool
+from .. import events
+from ..config import settings
+from ..database import begin_shared, end_shared, shared_connection
+from ..replicas import record_commit
+from ..schemas.batch import BatchOperation, BatchRequest, BatchResponse, BatchResult
+
+router = APIRouter(
+    prefix="/batch",
+    tags=["batch"],
+)
+
+_READ_METHODS = ("GET", "HEAD")
+# Streams never finish, and nesting would multiply the work of one request
+_REJECTED_PREFIXES = ("/batch", "/events")
+# Request headers describing the outer body rather than the caller
+_BODY_HEADERS = {b"content-length", b"content-type", b"content-encoding", b"accept-encoding"}
+
+async def _dispatch(request: Request, operation: BatchOperation) -> BatchResult:
+    """Run one operation in-process as if it were its own request.
+
+    It goes through the whole middleware stack, so admission control, rate limits,
+    coalescing and tracing apply to each operation.
+    """
+    path, _, query = operation.path.partition("?")
+    if not path.startswith("/") or path.startswith(_REJECTED_PREFIXES):
+        return BatchResult(status=400, body={"detail": f"{path} cannot be batched"})
+
+    body = b"" if operation.body is None else json.dumps(operation.body).encode()
+    headers = [(name, value) for name, value in request.scope["headers"] if name not in _BODY_HEADERS]
+    headers += [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in operation.headers.items()]
+    headers += [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+    scope = {
+        key: value for key, value in request.scope.items()
+        if key not in ("route", "endpoint", "path_params")
+    }
+    scope.update(method=operation.method.upper(), path=path, raw_path=path.encode(), query_string=query.encode(), headers=headers)
+
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    async def receive():
+        return messages.pop() if messages else {"type": "http.disconnect"}
+
+    status, response_headers, chunks = 500, {}, []
+    async def send(message):
+        nonlocal status, response_headers
+        if message["type"] == "http.response.start":
+            status = message["status"]
+            response_headers = {name.decode("latin-1"): value.decode("latin-1") for name, value in message.get("headers", [])}
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    await request.app(scope, receive, send)
+    content = b"".join(chunks)
+    response_headers.pop("content-length", None)
+    if not content:
+        result_body = None
+    elif response_headers.get("content-type", "").startswith("application/json"):
+        result_body = json.loads(content)
+    else:
+        result_body = content.decode("utf-8", "replace")
+    return BatchResult(status=status, headers=response_headers, body=result_body)
+
+async def _run_atomic(request: Request, operations: List[BatchOperation]) -> BatchResponse:
+    connection = await run_in_threadpool(begin_shared)
+    token = shared_connection.set(connection)
+    # Change events of the operations are published only once the whole batch commits
+    pending_events: List[Dict] = []
+    events_token = events.deferred_events.set(pending_events)
+    results: List[BatchResult] = []
+    failed = False
+    try:
+        for operation in operations:
+            if failed:
+                results.append(BatchResult(status=424, body={"detail": "Not run: an earlier operation failed"}))
+                continue
+            result = await _dispatch(request, operation)
+            failed = result.status >= 400
+            results.append(result)
+    finally:
+        events.deferred_events.reset(events_token)
+        shared_connection.reset(token)
+        await run_in_threadpool(end_shared, connection, not failed, record_commit)
+    if not failed:
+        for payload in pending_events:
+            events.broker.publish(payload)
+    return BatchResponse(responses=results, committed=not failed)
+
+async def _dispatch_reads(request: Request, reads: List[BatchOperation]) -> List[BatchResult]:
+    """Run reads concurrently, but at most batch_read_concurrency at a time"""
+    limit = asyncio.Semaphore(settings.batch_read_concurrency)
+    async def dispatch(read: BatchOperation) -> BatchResult:
+        async with limit:
+            return await _dispatch(request, read)
+    return await asyncio.gather(*(dispatch(read) for read in reads))
+
+@router.post("", response_model=BatchResponse)
+async def run_batch(batch: BatchRequest, request: Request):
+    """Run several API operations in one round trip.
+
+    Consecutive reads run concurrently (up to batch_read_concurrency at once); writes
+    run one at a time, in order, each in its own transaction. With `atomic`, everything runs in order in one transaction
+    that is rolled back if any operation fails.
+    """
+    if len(batch.requests) > settings.batch_max_requests:
+        raise HTTPException(status_code=400, detail=f"At most {settings.batch_max_requests} operations per batch")
+    if batch.atomic:
+        return await _run_atomic(request, batch.requests)
+
+    results: List[BatchResult] = []
+    reads: List[BatchOperation] = []
+    for operation in batch.requests + [None]:
+        if operation is not None and operation.method.upper() in _READ_METHODS:
+            reads.append(operation)
+            continue
+        # A write (or the end) closes the current run of reads, so reads see earlier writes
+        results += await _dispatch_reads(request, reads)
+        reads = []
+        if operation is not None:
+            results.append(await _dispatch(request, operation))
+    return BatchResponse(responses=results)
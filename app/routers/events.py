@@ -0,0 +1,19 @@
+from typing import Optional
+from fastapi import APIRouter
+from fastapi.responses import StreamingResponse
+from .. import events
+
+router = APIRouter(
+    prefix="/events",
+    tags=["events"],
+)
+
+@router.get("")
+async def get_events(entities: Optional[str] = None):
+    """Stream change events as Server-Sent Events, optionally limited to `entities=tasks,projects`"""
+    wanted = set(entities.split(",")) if entities else None
+    return StreamingResponse(
+        events.stream(wanted),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,23 @@
+from fastapi import APIRouter, status
+from fastapi.responses import JSONResponse
+from .. import health
+
+router = APIRouter(
+    prefix="/health",
+    tags=["health"],
+)
+
+@router.get("")
+@router.get("/live")
+async def liveness():
+    """Liveness probe: the process and its event loop answer; dependencies are not checked"""
+    return {"status": "healthy"}
+
+@router.get("/ready")
+async def readiness():
+    """Readiness probe: warmed up, database reachable, pool headroom and event-loop lag within limits"""
+    ready, checks = await health.readiness()
+    return JSONResponse(
+        status_code=status.HTTP_200_OK if ready else status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"status": "ready" if ready else "not ready", "checks": checks},
+    )
@@ -0,0 +1,58 @@
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import JSONResponse
+from sqlalchemy.orm import Session
+from .. import jobs
+from ..database import get_db
+from ..models.job import Job, JobStatus
+from ..schemas.job import Job as JobSchema, JobCreate
+from .admin import require_admin
+
+router = APIRouter(
+    prefix="/jobs",
+    tags=["jobs"],
+    responses={404: {"description": "Not found"}},
+)
+
+def accepted(job: Job) -> JSONResponse:
+    """202 response pointing at a job's status endpoint"""
+    return JSONResponse(
+        status_code=status.HTTP_202_ACCEPTED,
+        content=JobSchema.model_validate(job).model_dump(mode="json"),
+        headers={"Location": f"/jobs/{job.id}"},
+    )
+
+@router.get("/", response_model=List[JobSchema])
+def get_all_jobs(job_status: Optional[JobStatus] = None, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+    """Get jobs, newest first"""
+    query = db.query(Job)
+    if job_status is not None:
+        query = query.filter(Job.status == job_status)
+    return query.order_by(Job.id.desc()).offset(skip).limit(limit).all()
+
+@router.get("/{job_id}", response_model=JobSchema)
+def get_job(job_id: int, db: Session = Depends(get_db)):
+    """Get the status and progress of a background job"""
+    job = db.get(Job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@router.post("/", response_model=JobSchema, status_code=status.HTTP_202_ACCEPTED, dependencies=[Depends(require_admin)])
+def create_job(job: JobCreate, db: Session = Depends(get_db)):
+    """Enqueue a job of a registered kind"""
+    if job.kind not in jobs.JOB_KINDS:
+        raise HTTPException(status_code=400, detail=f"Unknown job kind. Available: {', '.join(sorted(jobs.JOB_KINDS))}")
+    try:
+        jobs.check_params(job.kind, job.params)
+    except ValueError as error:
+        raise HTTPException(status_code=422, detail=str(error))
+    return accepted(jobs.enqueue(db, job.kind, **job.params))
+
+@router.post("/{job_id}/cancel", response_model=JobSchema, dependencies=[Depends(require_admin)])
+def cancel_job(job_id: int, db: Session = Depends(get_db)):
+    """Cancel a queued job, or ask a running one to stop at its next progress report"""
+    job = jobs.request_cancel(db, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
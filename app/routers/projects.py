@@ -1,9 +1,24 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from fastapi.responses import JSONResponse
+from sqlalchemy import delete, func, select
 from sqlalchemy.orm import Session
-from ..database import get_db
+from sqlalchemy.orm.exc import StaleDataError
+from .. import counters, jobs, statements
+from ..config import settings
+from ..database import get_db, SessionLocal
+from ..replicas import get_read_db
+from ..changes import changes_since, record_deletions
+from ..events import publish_bulk_change, publish_change
+from ..fieldsets import FIELDS_QUERY, parse_fields, row_dict, select_fields
+from ..concurrency import etag, expected_version, precondition_failed
+from ..patching import patch_row, raise_for_miss
 from ..models.project import Project
+from ..models.task import Task
 from ..models.user import User
+from ..schemas.job import Job as JobSchema
+from .jobs import accepted
+from ..schemas.changes import ChangeFeed
 from ..schemas.project import Project as ProjectSchema, ProjectCreate, ProjectUpdate
 
 router = APIRouter(
@@ -13,24 +28,40 @@ router = APIRouter(
 )
 
 @router.get("/", response_model=List[ProjectSchema])
-def get_all_projects(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def get_all_projects(skip: int = 0, limit: int = 100, fields: Optional[str] = FIELDS_QUERY, db: Session = Depends(get_read_db)):
     """Get all projects"""
-    projects = db.query(Project).offset(skip).limit(limit).all()
+    names = parse_fields(Project, ProjectSchema, fields)
+    if names is not None:
+        rows = db.execute(select_fields(Project, names).offset(skip).limit(limit)).all()
+        return JSONResponse([row_dict(names, row) for row in rows])
+    projects = db.scalars(statements.projects_page, {"skip": skip, "limit": limit}).all()
     return projects
 
+@router.get("/changes", response_model=ChangeFeed[ProjectSchema])
+def get_project_changes(since: Optional[str] = None, cursor: Optional[str] = None, db: Session = Depends(get_db)):
+    """Get projects created or updated since a change token, plus deleted ids"""
+    return changes_since(db, Project, since, cursor)
+
 @router.get("/{project_id}", response_model=ProjectSchema)
-def get_project(project_id: int, db: Session = Depends(get_db)):
+def get_project(project_id: int, response: Response, fields: Optional[str] = FIELDS_QUERY, db: Session = Depends(get_read_db)):
     """Get a specific project by ID"""
-    project = db.query(Project).filter(Project.id == project_id).first()
+    names = parse_fields(Project, ProjectSchema, fields)
+    if names is not None:
+        row = db.execute(select_fields(Project, names).where(Project.id == project_id)).first()
+        if row is None:
+            raise HTTPException(status_code=404, detail="Project not found")
+        return JSONResponse(row_dict(names, row))
+    project = db.scalars(statements.project_by_id, {"id": project_id}).first()
     if project is None:
         raise HTTPException(status_code=404, detail="Project not found")
+    response.headers["ETag"] = etag(project.version)
     return project
 
 @router.post("/", response_model=ProjectSchema, status_code=status.HTTP_201_CREATED)
-def create_project(project: ProjectCreate, db: Session = Depends(get_db)):
+def create_project(project: ProjectCreate, response: Response, db: Session = Depends(get_db)):
     """Create a new project"""
     # Verify owner exists
-    owner = db.query(User).filter(User.id == project.owner_id).first()
+    owner = db.scalars(statements.user_by_id, {"id": project.owner_id}).first()
     if not owner:
         raise HTTPException(status_code=400, detail="Owner not found")
     
@@ -38,30 +69,111 @@ def create_project(project: ProjectCreate, db: Session = Depends(get_db)):
     db.add(db_project)
     db.commit()
     db.refresh(db_project)
+    response.headers["ETag"] = etag(db_project.version)
     return db_project
 
 @router.put("/{project_id}", response_model=ProjectSchema)
-def update_project(project_id: int, project_update: ProjectUpdate, db: Session = Depends(get_db)):
-    """Update a project"""
-    db_project = db.query(Project).filter(Project.id == project_id).first()
+def update_project(
+    project_id: int,
+    project_update: ProjectUpdate,
+    response: Response,
+    if_match: Optional[int] = Depends(expected_version),
+    db: Session = Depends(get_db),
+):
+    """Update a project; with If-Match, only if it is still at that version"""
+    db_project = db.scalars(statements.project_by_id, {"id": project_id}).first()
     if db_project is None:
         raise HTTPException(status_code=404, detail="Project not found")
+    if if_match is not None and db_project.version != if_match:
+        raise precondition_failed(db_project.version)
     
     update_data = project_update.dict(exclude_unset=True)
     for field, value in update_data.items():
         setattr(db_project, field, value)
     
-    db.commit()
+    try:
+        # The flush's UPDATE also matches on the version that was loaded
+        db.commit()
+    except StaleDataError:
+        db.rollback()
+        raise precondition_failed(None)
     db.refresh(db_project)
+    response.headers["ETag"] = etag(db_project.version)
     return db_project
 
-@router.delete("/{project_id}", status_code=status.HTTP_204_NO_CONTENT)
+@router.patch("/{project_id}", response_model=ProjectSchema)
+def patch_project(
+    project_id: int,
+    project_update: ProjectUpdate,
+    response: Response,
+    if_match: Optional[int] = Depends(expected_version),
+    db: Session = Depends(get_db),
+):
+    """Update some fields of a project with a single UPDATE ... RETURNING"""
+    update_data = project_update.dict(exclude_unset=True)
+    db_project = patch_row(db, Project, project_id, update_data, expected_version=if_match)
+    if db_project is None:
+        raise_for_miss(db, Project, project_id, if_match, "Project not found")
+    
+    result = ProjectSchema.model_validate(db_project)
+    response.headers["ETag"] = etag(result.version)
+    if update_data:
+        publish_change(db, "projects", "update", [project_id])
+    db.commit()
+    return result
+
+@router.delete(
+    "/{project_id}",
+    status_code=status.HTTP_204_NO_CONTENT,
+    responses={202: {"model": JobSchema, "description": "Large project, deletion continues as a background job"}},
+)
 def delete_project(project_id: int, db: Session = Depends(get_db)):
-    """Delete a project"""
-    db_project = db.query(Project).filter(Project.id == project_id).first()
+    """Delete a project and, through ON DELETE CASCADE, its tasks"""
+    db_project = db.scalars(statements.project_by_id, {"id": project_id}).first()
     if db_project is None:
         raise HTTPException(status_code=404, detail="Project not found")
     
+    task_count = db.scalar(select(func.count()).select_from(Task).where(Task.project_id == project_id))
+    if task_count > settings.cascade_delete_batch_threshold:
+        return accepted(jobs.enqueue(db, "delete_project", project_id=project_id))
+    
+    record_deletions(db, Task, Task.project_id == project_id)
+    publish_bulk_change(db, "tasks", "delete", project_id=project_id)
     db.delete(db_project)
     db.commit()
-    return None
\ No newline at end of file
+    return None
+
+@jobs.job_kind("delete_project")
+def delete_project_in_batches(ctx: jobs.JobContext, project_id: int):
+    """Delete a project's tasks in short transactions, then the project itself"""
+    with SessionLocal() as db:
+        total = db.scalar(select(func.count()).select_from(Task).where(Task.project_id == project_id))
+        ctx.report(0, total)
+        deleted = 0
+        while True:
+            ids = db.scalars(
+                select(Task.id).where(Task.project_id == project_id).limit(settings.cascade_delete_batch_size)
+            ).all()
+            if not ids:
+                break
+            record_deletions(db, Task, Task.id.in_(ids))
+            db.execute(delete(Task).where(Task.id.in_(ids)))
+            publish_change(db, "tasks", "delete", ids)
+            db.commit()
+            deleted += len(ids)
+            ctx.report(deleted)
+        
+        # Tasks created while the job ran are removed by the cascade
+        db_project = db.get(Project, project_id)
+        if db_project is not None:
+            record_deletions(db, Task, Task.project_id == project_id)
+            db.delete(db_project)
+            db.commit()
+
+@jobs.job_kind("reconcile_project_counters")
+def reconcile_project_counters(ctx: jobs.JobContext):
+    """Repair drift in the denormalized task counters, e.g. overdue tasks whose due date passed"""
+    with SessionLocal() as db:
+        return {"corrected": counters.reconcile(db)}
+
+jobs.schedule("reconcile_project_counters", settings.counter_reconcile_interval_seconds)
@@ -1,11 +1,28 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+import re
+from typing import List, Optional
+from datetime import timedelta
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.responses import JSONResponse
+from sqlalchemy import DateTime, cast, delete, exists, func, insert, null, or_, select, tuple_, union_all
 from sqlalchemy.orm import Session
-from ..database import get_db
-from ..models.task import Task
+from sqlalchemy.orm.exc import StaleDataError
+from .. import counters, jobs, statements
+from ..config import settings
+from ..database import get_db, SessionLocal
+from ..replicas import get_read_db
+from ..changes import changes_since, record_deletions
+from ..events import publish_change
+from ..fieldsets import FIELDS_QUERY, columns, parse_fields, row_dict, select_fields
+from ..concurrency import etag, expected_version, precondition_failed
+from ..patching import patch_row, raise_for_miss
+from ..models.archived_task import ArchivedTask
+from ..models.reminder import TaskReminder, Watermark
+from ..models.task import Task, TaskPriority, TaskStatus
+from ..pagination import decode_cursor, encode_cursor
 from ..models.project import Project
 from ..models.user import User
-from ..schemas.task import Task as TaskSchema, TaskCreate, TaskUpdate
+from ..schemas.changes import ChangeFeed
+from ..schemas.task import Task as TaskSchema, TaskCreate, TaskListPage, TaskPage, TaskUpdate
 
 router = APIRouter(
     prefix="/tasks",
@@ -13,31 +30,180 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
+# Columns the hot and archived tables share; change_seq only numbers hot writes
+_TASK_COLUMNS = [column.name for column in Task.__table__.columns if column.name in ArchivedTask.__table__.c]
+
+def _with_archived():
+    """Hot and archived tasks as one selectable, with archived_at NULL for hot rows"""
+    return union_all(
+        select(*(Task.__table__.c[name] for name in _TASK_COLUMNS), cast(null(), DateTime(timezone=True)).label("archived_at")),
+        select(*(ArchivedTask.__table__.c[name] for name in _TASK_COLUMNS), ArchivedTask.archived_at),
+    ).subquery()
+
 @router.get("/", response_model=List[TaskSchema])
-def get_all_tasks(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    """Get all tasks"""
-    tasks = db.query(Task).offset(skip).limit(limit).all()
+def get_all_tasks(
+    skip: int = 0,
+    limit: int = 100,
+    include_archived: bool = False,
+    fields: Optional[str] = FIELDS_QUERY,
+    db: Session = Depends(get_read_db),
+):
+    """Get all tasks; archived ones only with include_archived"""
+    names = parse_fields(Task, TaskSchema, fields, extra=("archived_at",) if include_archived else ())
+    if include_archived:
+        tasks = _with_archived()
+        selected = tasks.c if names is None else [tasks.c[name] for name in names]
+        rows = db.execute(select(*selected).order_by(tasks.c.id).offset(skip).limit(limit)).all()
+        return rows if names is None else JSONResponse([row_dict(names, row) for row in rows])
+    if names is not None:
+        rows = db.execute(select_fields(Task, names).offset(skip).limit(limit)).all()
+        return JSONResponse([row_dict(names, row) for row in rows])
+    tasks = db.scalars(statements.tasks_page, {"skip": skip, "limit": limit}).all()
     return tasks
 
+@router.get("/changes", response_model=ChangeFeed[TaskSchema])
+def get_task_changes(since: Optional[str] = None, cursor: Optional[str] = None, db: Session = Depends(get_db)):
+    """Get tasks created or updated since a change token, plus deleted ids"""
+    return changes_since(db, Task, since, cursor)
+
+# Open tasks as the partial index ix_tasks_open_due_date defines them, minus ones marked done
+_OPEN = (~Task.is_completed, Task.status != TaskStatus.DONE)
+_DURATION = re.compile(r"^(\d+)([mhdw])$")
+_UNITS = {"m": "minutes", "h": "hours", "d": "days", "w": "weeks"}
+
+def _due_page(db: Session, criteria, cursor: Optional[str], limit: int, fields: Optional[str]):
+    """Keyset page of open tasks matching `criteria`, soonest due first"""
+    names = parse_fields(Task, TaskSchema, fields)
+    selected = [Task] if names is None else columns(Task, names)
+    query = select(Task.due_date, Task.id, *selected).where(*_OPEN, *criteria)
+    after = decode_cursor(cursor, datetime_positions=(0,))
+    if after is not None:
+        query = query.where(tuple_(Task.due_date, Task.id) > tuple_(*after))
+    rows = db.execute(query.order_by(Task.due_date, Task.id).limit(limit + 1)).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(list(rows[-1][:2]))
+    if names is not None:
+        return JSONResponse({"items": [row_dict(names, row[2:]) for row in rows], "next_cursor": next_cursor})
+    return {"items": [row[2] for row in rows], "next_cursor": next_cursor}
+
+@router.get("/overdue", response_model=TaskPage)
+def get_overdue_tasks(
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=500),
+    fields: Optional[str] = FIELDS_QUERY,
+    db: Session = Depends(get_read_db),
+):
+    """Get open tasks whose due date has passed, longest overdue first"""
+    now = db.scalar(select(func.now()))
+    return _due_page(db, [Task.due_date < now], cursor, limit, fields)
+
+@router.get("/due", response_model=TaskPage)
+def get_tasks_due(
+    within: str = Query("7d", description="Window such as 30m, 12h, 7d or 2w"),
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=500),
+    fields: Optional[str] = FIELDS_QUERY,
+    db: Session = Depends(get_read_db),
+):
+    """Get open tasks due from now until the end of the window, soonest first"""
+    match = _DURATION.match(within)
+    if match is None:
+        raise HTTPException(status_code=400, detail="Invalid window, expected e.g. 30m, 12h, 7d or 2w")
+    now = db.scalar(select(func.now()))
+    end = now + timedelta(**{_UNITS[match.group(2)]: int(match.group(1))})
+    return _due_page(db, [Task.due_date >= now, Task.due_date < end], cursor, limit, fields)
+
+@router.get("/page", response_model=TaskListPage)
+def get_task_page(
+    status_filter: Optional[List[TaskStatus]] = Query(None, alias="status"),
+    priority: Optional[List[TaskPriority]] = Query(None),
+    is_completed: Optional[bool] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=500),
+    totals: Optional[bool] = Query(None, description="Include totals; defaults to the first page only"),
+    fields: Optional[str] = FIELDS_QUERY,
+    db: Session = Depends(get_read_db),
+):
+    """Get a keyset page of tasks matching the filters, by id.
+    
+    With totals, the page also carries the number of matching tasks, how many of
+    them are completed and their count per priority.
+    """
+    names = parse_fields(Task, TaskSchema, fields)
+    criteria = []
+    if status_filter:
+        criteria.append(Task.status.in_(status_filter))
+    if priority:
+        criteria.append(Task.priority.in_(priority))
+    if is_completed is not None:
+        criteria.append(Task.is_completed.is_(is_completed))
+    
+    selected = [Task] if names is None else columns(Task, names)
+    query = select(*selected, Task.id).where(*criteria)
+    after = decode_cursor(cursor)
+    if after is not None:
+        query = query.where(Task.id > after[0])
+    rows = db.execute(query.order_by(Task.id).limit(limit + 1)).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([rows[-1][-1]])
+    
+    summary = {}
+    if totals or (totals is None and cursor is None):
+        by_priority = {task_priority: 0 for task_priority in TaskPriority}
+        completed = 0
+        for task_priority, task_completed, count in db.execute(
+            select(Task.priority, Task.is_completed, func.count()).where(*criteria).group_by(Task.priority, Task.is_completed)
+        ):
+            by_priority[task_priority] += count
+            completed += count if task_completed else 0
+        summary = {"total": sum(by_priority.values()), "completed": completed, "by_priority": by_priority}
+    
+    if names is not None:
+        if "by_priority" in summary:
+            summary["by_priority"] = {task_priority.value: count for task_priority, count in summary["by_priority"].items()}
+        return JSONResponse({"items": [row_dict(names, row[:-1]) for row in rows], "next_cursor": next_cursor, **summary})
+    return {"items": [row[0] for row in rows], "next_cursor": next_cursor, **summary}
+
 @router.get("/{task_id}", response_model=TaskSchema)
-def get_task(task_id: int, db: Session = Depends(get_db)):
+def get_task(
+    task_id: int,
+    response: Response,
+    include_archived: bool = False,
+    fields: Optional[str] = FIELDS_QUERY,
+    db: Session = Depends(get_read_db),
+):
     """Get a specific task by ID"""
-    task = db.query(Task).filter(Task.id == task_id).first()
+    names = parse_fields(Task, TaskSchema, fields)
+    if names is not None:
+        row = db.execute(select_fields(Task, names).where(Task.id == task_id)).first()
+        if row is None and include_archived:
+            row = db.execute(select_fields(ArchivedTask, names).where(ArchivedTask.id == task_id)).first()
+        if row is None:
+            raise HTTPException(status_code=404, detail="Task not found")
+        return JSONResponse(row_dict(names, row))
+    task = db.scalars(statements.task_by_id, {"id": task_id}).first()
+    if task is None and include_archived:
+        task = db.get(ArchivedTask, task_id)
     if task is None:
         raise HTTPException(status_code=404, detail="Task not found")
+    response.headers["ETag"] = etag(task.version)
     return task
 
 @router.post("/", response_model=TaskSchema, status_code=status.HTTP_201_CREATED)
-def create_task(task: TaskCreate, db: Session = Depends(get_db)):
+def create_task(task: TaskCreate, response: Response, db: Session = Depends(get_db)):
     """Create a new task"""
     # Verify project exists
-    project = db.query(Project).filter(Project.id == task.project_id).first()
+    project = db.scalars(statements.project_by_id, {"id": task.project_id}).first()
     if not project:
         raise HTTPException(status_code=400, detail="Project not found")
     
     # Verify assignee exists if provided
     if task.assignee_id:
-        assignee = db.query(User).filter(User.id == task.assignee_id).first()
+        assignee = db.scalars(statements.user_by_id, {"id": task.assignee_id}).first()
         if not assignee:
             raise HTTPException(status_code=400, detail="Assignee not found")
     
@@ -45,18 +211,27 @@ def create_task(task: TaskCreate, db: Session = Depends(get_db)):
     db.add(db_task)
     db.commit()
     db.refresh(db_task)
+    response.headers["ETag"] = etag(db_task.version)
     return db_task
 
 @router.put("/{task_id}", response_model=TaskSchema)
-def update_task(task_id: int, task_update: TaskUpdate, db: Session = Depends(get_db)):
-    """Update a task"""
-    db_task = db.query(Task).filter(Task.id == task_id).first()
+def update_task(
+    task_id: int,
+    task_update: TaskUpdate,
+    response: Response,
+    if_match: Optional[int] = Depends(expected_version),
+    db: Session = Depends(get_db),
+):
+    """Update a task; with If-Match, only if it is still at that version"""
+    db_task = db.scalars(statements.task_by_id, {"id": task_id}).first()
     if db_task is None:
         raise HTTPException(status_code=404, detail="Task not found")
+    if if_match is not None and db_task.version != if_match:
+        raise precondition_failed(db_task.version)
     
     # Verify assignee exists if provided
     if task_update.assignee_id:
-        assignee = db.query(User).filter(User.id == task_update.assignee_id).first()
+        assignee = db.scalars(statements.user_by_id, {"id": task_update.assignee_id}).first()
         if not assignee:
             raise HTTPException(status_code=400, detail="Assignee not found")
     
@@ -64,17 +239,119 @@ def update_task(task_id: int, task_update: TaskUpdate, db: Session = Depends(get
     for field, value in update_data.items():
         setattr(db_task, field, value)
     
-    db.commit()
+    try:
+        # The flush's UPDATE also matches on the version that was loaded
+        db.commit()
+    except StaleDataError:
+        db.rollback()
+        raise precondition_failed(None)
     db.refresh(db_task)
+    response.headers["ETag"] = etag(db_task.version)
     return db_task
 
+@router.patch("/{task_id}", response_model=TaskSchema)
+def patch_task(
+    task_id: int,
+    task_update: TaskUpdate,
+    response: Response,
+    if_match: Optional[int] = Depends(expected_version),
+    db: Session = Depends(get_db),
+):
+    """Update some fields of a task with a single UPDATE ... RETURNING"""
+    update_data = task_update.dict(exclude_unset=True)
+    conditions = []
+    if update_data.get("assignee_id"):
+        conditions.append(exists().where(User.id == update_data["assignee_id"]))
+    
+    counted = counters.adjust_for_patch(db, task_id, update_data)
+    db_task = patch_row(db, Task, task_id, update_data, *conditions, expected_version=if_match)
+    if db_task is None:
+        raise_for_miss(db, Task, task_id, if_match, "Task not found")
+        raise HTTPException(status_code=400, detail="Assignee not found")
+    
+    # Serialized before the commit expires it, which would cost another SELECT
+    result = TaskSchema.model_validate(db_task)
+    response.headers["ETag"] = etag(result.version)
+    if update_data:
+        publish_change(db, "tasks", "update", [task_id])
+    if counted:
+        publish_change(db, "projects", "update", [db_task.project_id])
+    db.commit()
+    return result
+
 @router.delete("/{task_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_task(task_id: int, db: Session = Depends(get_db)):
     """Delete a task"""
-    db_task = db.query(Task).filter(Task.id == task_id).first()
+    db_task = db.scalars(statements.task_by_id, {"id": task_id}).first()
     if db_task is None:
         raise HTTPException(status_code=404, detail="Task not found")
     
     db.delete(db_task)
     db.commit()
-    return None
\ No newline at end of file
+    return None
+
+@jobs.job_kind("archive_tasks")
+def archive_completed_tasks(ctx: jobs.JobContext, older_than_days: Optional[int] = None):
+    """Move tasks completed and untouched for `older_than_days` to tasks_archive, in batches"""
+    with SessionLocal() as db:
+        cutoff = db.scalar(select(func.now())) - timedelta(days=older_than_days or settings.archive_after_days)
+        criteria = (or_(Task.is_completed.is_(True), Task.status == TaskStatus.DONE), Task.updated_at < cutoff)
+        total = db.scalar(select(func.count()).select_from(Task).where(*criteria))
+        ctx.report(0, total)
+        archived = 0
+        while True:
+            ids = db.scalars(select(Task.id).where(*criteria).order_by(Task.id).limit(settings.archive_batch_size)).all()
+            if not ids:
+                break
+            db.execute(
+                insert(ArchivedTask).from_select(
+                    _TASK_COLUMNS, select(*(Task.__table__.c[name] for name in _TASK_COLUMNS)).where(Task.id.in_(ids))
+                )
+            )
+            # Clients mirroring the hot set drop archived tasks like deleted ones
+            record_deletions(db, Task, Task.id.in_(ids))
+            db.execute(delete(Task).where(Task.id.in_(ids)))
+            publish_change(db, "tasks", "delete", ids)
+            db.commit()
+            archived += len(ids)
+            ctx.report(archived)
+    return {"archived": archived}
+
+jobs.schedule("archive_tasks", settings.archive_interval_seconds)
+
+@jobs.job_kind("scan_overdue_tasks")
+def scan_overdue_tasks(ctx: jobs.JobContext):
+    """Record a reminder for each open task that became overdue since the last scan.
+
+    The watermark is the (due_date, id) key of the last task handled, so each run only
+    reads the slice of ix_tasks_open_due_date between it and now. The first run just
+    places the watermark, so tasks that were overdue before scanning began are not reported.
+    """
+    recorded = 0
+    with SessionLocal() as db:
+        now = db.scalar(select(func.now()))
+        mark = db.get(Watermark, "overdue_tasks")
+        if mark is None:
+            db.add(Watermark(name="overdue_tasks", position=now, last_id=0))
+            db.commit()
+            return {"recorded": 0}
+        while True:
+            batch = db.execute(
+                select(Task.id, Task.assignee_id, Task.due_date)
+                .where(*_OPEN, Task.due_date <= now, tuple_(Task.due_date, Task.id) > tuple_(mark.position, mark.last_id))
+                .order_by(Task.due_date, Task.id)
+                .limit(settings.reminder_scan_batch_size)
+            ).all()
+            if not batch:
+                break
+            db.execute(insert(TaskReminder), [
+                {"task_id": task_id, "assignee_id": assignee_id, "due_date": due_date}
+                for task_id, assignee_id, due_date in batch
+            ])
+            mark.position, mark.last_id = batch[-1].due_date, batch[-1].id
+            db.commit()
+            recorded += len(batch)
+            ctx.report(recorded)
+    return {"recorded": recorded}
+
+jobs.schedule("scan_overdue_tasks", settings.reminder_scan_interval_seconds)
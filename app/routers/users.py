@@ -1,8 +1,24 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import List, Optional
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.responses import JSONResponse
+from sqlalchemy import func, select, tuple_, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import StaleDataError
+from .. import statements
 from ..database import get_db
+from ..replicas import get_read_db
+from ..changes import changes_since
+from ..events import publish_bulk_change, publish_change
+from ..models.task import Task, TaskStatus
 from ..models.user import User
+from ..pagination import decode_cursor, encode_cursor
+from ..fieldsets import FIELDS_QUERY, columns, parse_fields, row_dict, select_fields
+from ..concurrency import etag, expected_version, precondition_failed
+from ..patching import patch_row, raise_for_miss
+from ..schemas.changes import ChangeFeed
+from ..schemas.task import Task as TaskSchema, UserTasks
 from ..schemas.user import User as UserSchema, UserCreate, UserUpdate
 
 router = APIRouter(
@@ -12,21 +28,88 @@ router = APIRouter(
 )
 
 @router.get("/", response_model=List[UserSchema])
-def get_all_users(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def get_all_users(skip: int = 0, limit: int = 100, fields: Optional[str] = FIELDS_QUERY, db: Session = Depends(get_read_db)):
     """Get all users"""
-    users = db.query(User).offset(skip).limit(limit).all()
+    names = parse_fields(User, UserSchema, fields)
+    if names is not None:
+        rows = db.execute(select_fields(User, names).offset(skip).limit(limit)).all()
+        return JSONResponse([row_dict(names, row) for row in rows])
+    users = db.scalars(statements.users_page, {"skip": skip, "limit": limit}).all()
     return users
 
+@router.get("/changes", response_model=ChangeFeed[UserSchema])
+def get_user_changes(since: Optional[str] = None, cursor: Optional[str] = None, db: Session = Depends(get_db)):
+    """Get users created or updated since a change token, plus deleted ids"""
+    return changes_since(db, User, since, cursor)
+
 @router.get("/{user_id}", response_model=UserSchema)
-def get_user(user_id: int, db: Session = Depends(get_db)):
+def get_user(user_id: int, response: Response, fields: Optional[str] = FIELDS_QUERY, db: Session = Depends(get_read_db)):
     """Get a specific user by ID"""
-    user = db.query(User).filter(User.id == user_id).first()
+    names = parse_fields(User, UserSchema, fields)
+    if names is not None:
+        row = db.execute(select_fields(User, names).where(User.id == user_id)).first()
+        if row is None:
+            raise HTTPException(status_code=404, detail="User not found")
+        return JSONResponse(row_dict(names, row))
+    user = db.scalars(statements.user_by_id, {"id": user_id}).first()
     if user is None:
         raise HTTPException(status_code=404, detail="User not found")
+    response.headers["ETag"] = etag(user.version)
     return user
 
+@router.get("/{user_id}/tasks", response_model=UserTasks)
+def get_user_tasks(
+    user_id: int,
+    status_filter: Optional[TaskStatus] = Query(None, alias="status"),
+    include_completed: bool = False,
+    due_before: Optional[datetime] = None,
+    due_after: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    fields: Optional[str] = FIELDS_QUERY,
+    db: Session = Depends(get_read_db),
+):
+    """Get a user's tasks, most urgent and soonest due first, with their counts by status"""
+    names = parse_fields(Task, TaskSchema, fields)
+    if db.scalar(select(User.id).where(User.id == user_id)) is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    # Same order as ix_tasks_assignee_priority_due, so pages are read straight off the index
+    sort_key = (Task.priority_rank, Task.due_sort, Task.id)
+    selected = [Task] if names is None else columns(Task, names)
+    query = select(*selected, *sort_key).where(Task.assignee_id == user_id)
+    if not include_completed:
+        query = query.where(Task.is_completed.is_(False))
+    if status_filter is not None:
+        query = query.where(Task.status == status_filter)
+    if due_before is not None:
+        query = query.where(Task.due_date < due_before)
+    if due_after is not None:
+        query = query.where(Task.due_date >= due_after)
+    after = decode_cursor(cursor, datetime_positions=(1,))
+    if after is not None:
+        query = query.where(tuple_(*sort_key) > tuple_(*after))
+    
+    rows = db.execute(query.order_by(*sort_key).limit(limit + 1)).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(list(rows[-1][-3:]))
+    
+    counts = {task_status: 0 for task_status in TaskStatus}
+    counts.update(db.execute(
+        select(Task.status, func.count()).where(Task.assignee_id == user_id).group_by(Task.status)
+    ).all())
+    if names is not None:
+        return JSONResponse({
+            "items": [row_dict(names, row[:-3]) for row in rows],
+            "counts": {task_status.value: count for task_status, count in counts.items()},
+            "next_cursor": next_cursor,
+        })
+    return {"items": [row[0] for row in rows], "counts": counts, "next_cursor": next_cursor}
+
 @router.post("/", response_model=UserSchema, status_code=status.HTTP_201_CREATED)
-def create_user(user: UserCreate, db: Session = Depends(get_db)):
+def create_user(user: UserCreate, response: Response, db: Session = Depends(get_db)):
     """Create a new user"""
     # Check if username or email already exists
     db_user = db.query(User).filter(
@@ -42,30 +125,74 @@ def create_user(user: UserCreate, db: Session = Depends(get_db)):
     db.add(db_user)
     db.commit()
     db.refresh(db_user)
+    response.headers["ETag"] = etag(db_user.version)
     return db_user
 
 @router.put("/{user_id}", response_model=UserSchema)
-def update_user(user_id: int, user_update: UserUpdate, db: Session = Depends(get_db)):
-    """Update a user"""
-    db_user = db.query(User).filter(User.id == user_id).first()
+def update_user(
+    user_id: int,
+    user_update: UserUpdate,
+    response: Response,
+    if_match: Optional[int] = Depends(expected_version),
+    db: Session = Depends(get_db),
+):
+    """Update a user; with If-Match, only if it is still at that version"""
+    db_user = db.scalars(statements.user_by_id, {"id": user_id}).first()
     if db_user is None:
         raise HTTPException(status_code=404, detail="User not found")
+    if if_match is not None and db_user.version != if_match:
+        raise precondition_failed(db_user.version)
     
     update_data = user_update.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         setattr(db_user, field, value)
     
-    db.commit()
+    try:
+        # The flush's UPDATE also matches on the version that was loaded
+        db.commit()
+    except StaleDataError:
+        db.rollback()
+        raise precondition_failed(None)
     db.refresh(db_user)
+    response.headers["ETag"] = etag(db_user.version)
     return db_user
 
+@router.patch("/{user_id}", response_model=UserSchema)
+def patch_user(
+    user_id: int,
+    user_update: UserUpdate,
+    response: Response,
+    if_match: Optional[int] = Depends(expected_version),
+    db: Session = Depends(get_db),
+):
+    """Update some fields of a user with a single UPDATE ... RETURNING"""
+    update_data = user_update.model_dump(exclude_unset=True)
+    try:
+        db_user = patch_row(db, User, user_id, update_data, expected_version=if_match)
+    except IntegrityError:
+        # The unique indexes do the duplicate check that create_user queries for
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Username or email already registered")
+    if db_user is None:
+        raise_for_miss(db, User, user_id, if_match, "User not found")
+    
+    result = UserSchema.model_validate(db_user)
+    response.headers["ETag"] = etag(result.version)
+    if update_data:
+        publish_change(db, "users", "update", [user_id])
+    db.commit()
+    return result
+
 @router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_user(user_id: int, db: Session = Depends(get_db)):
     """Delete a user"""
-    db_user = db.query(User).filter(User.id == user_id).first()
+    db_user = db.scalars(statements.user_by_id, {"id": user_id}).first()
     if db_user is None:
         raise HTTPException(status_code=404, detail="User not found")
     
+    # ON DELETE SET NULL would do this too, but without touching updated_at for the change feed
+    db.execute(update(Task).where(Task.assignee_id == user_id).values(assignee_id=None, version=Task.version + 1))
+    publish_bulk_change(db, "tasks", "update", assignee_id=user_id)
     db.delete(db_user)
     db.commit()
     return None
\ No newline at end of file
@@ -1,6 +1,7 @@
 from .user import User, UserCreate, UserUpdate, UserWithProjects, UserWithTasks
 from .project import Project, ProjectCreate, ProjectUpdate, ProjectWithTasks, ProjectWithOwner
-from .task import Task, TaskCreate, TaskUpdate, TaskWithProject, TaskWithAssignee
+from .task import Task, TaskCreate, TaskUpdate, TaskWithProject, TaskWithAssignee, TaskPage, TaskListPage, UserTasks
+from .changes import ChangeFeed
 
 # Update forward references
 UserWithProjects.model_rebuild()
@@ -13,5 +14,6 @@ TaskWithAssignee.model_rebuild()
 __all__ = [
     "User", "UserCreate", "UserUpdate", "UserWithProjects", "UserWithTasks",
     "Project", "ProjectCreate", "ProjectUpdate", "ProjectWithTasks", "ProjectWithOwner",
-    "Task", "TaskCreate", "TaskUpdate", "TaskWithProject", "TaskWithAssignee"
+    "Task", "TaskCreate", "TaskUpdate", "TaskWithProject", "TaskWithAssignee", "TaskPage", "TaskListPage", "UserTasks",
+    "ChangeFeed"
 ]
\ No newline at end of file
@@ -0,0 +1,24 @@
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel
+
+class BatchOperation(BaseModel):
+    method: str = "GET"
+    # Path with optional query string, e.g. "/tasks/?limit=20"
+    path: str
+    body: Optional[Any] = None
+    headers: Dict[str, str] = {}
+
+class BatchRequest(BaseModel):
+    requests: List[BatchOperation]
+    # Run every operation in order in one transaction, rolled back if any of them fails
+    atomic: bool = False
+
+class BatchResult(BaseModel):
+    status: int
+    headers: Dict[str, str] = {}
+    body: Optional[Any] = None
+
+class BatchResponse(BaseModel):
+    responses: List[BatchResult]
+    # Set for atomic batches: whether the transaction was committed
+    committed: Optional[bool] = None
@@ -0,0 +1,14 @@
+from typing import Generic, List, Optional, TypeVar
+from pydantic import BaseModel
+
+T = TypeVar("T")
+
+class ChangeFeed(BaseModel, Generic[T]):
+    """Rows changed since a token, ids deleted since it, and the token for the next poll"""
+    items: List[T]
+    deleted: List[int]
+    next_since: str
+    # True when the feed is a full snapshot and the client must drop its mirror first
+    reset: bool = False
+    # Set on every snapshot page but the last; fetch the rest with ?cursor=
+    next_cursor: Optional[str] = None
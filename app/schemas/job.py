@@ -0,0 +1,25 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import Any, Dict, Optional
+from ..models.job import JobStatus
+
+class JobCreate(BaseModel):
+    kind: str
+    params: Dict[str, Any] = {}
+
+class Job(BaseModel):
+    id: int
+    kind: str
+    params: Dict[str, Any]
+    status: JobStatus
+    progress: int
+    total: Optional[int] = None
+    result: Optional[Any] = None
+    error: Optional[str] = None
+    cancel_requested: bool
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
@@ -22,6 +22,10 @@ class Project(ProjectBase):
     owner_id: int
     created_at: datetime
     updated_at: Optional[datetime] = None
+    version: int = 1
+    task_count: int = 0
+    completed_count: int = 0
+    overdue_count: int = 0
 
     class Config:
         from_attributes = True
@@ -1,7 +1,7 @@
 from __future__ import annotations
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional
+from typing import Dict, List, Optional
 from ..models.task import TaskStatus, TaskPriority
 
 class TaskBase(BaseModel):
@@ -31,10 +31,28 @@ class Task(TaskBase):
     assignee_id: Optional[int] = None
     created_at: datetime
     updated_at: Optional[datetime] = None
+    version: int = 1
+    archived_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
 
+class TaskPage(BaseModel):
+    """One keyset page of tasks"""
+    items: List[Task]
+    # Pass back as `cursor` for the next page; None on the last page
+    next_cursor: Optional[str] = None
+
+class UserTasks(TaskPage):
+    """A page of a user's tasks, plus their task counts by status"""
+    counts: Dict[TaskStatus, int]
+
+class TaskListPage(TaskPage):
+    """A page of filtered tasks; the first page also carries totals over every match"""
+    total: Optional[int] = None
+    completed: Optional[int] = None
+    by_priority: Optional[Dict[TaskPriority, int]] = None
+
 class TaskWithProject(Task):
     project: "Project"
 
@@ -22,6 +22,7 @@ class User(UserBase):
     is_active: bool
     created_at: datetime
     updated_at: Optional[datetime] = None
+    version: int = 1
 
     class Config:
         from_attributes = True
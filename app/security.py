@@ -0,0 +1,7 @@
+import secrets
+from typing import Optional
+from .config import settings
+
+def is_admin_token(token: Optional[str]) -> bool:
+    """Check a token against the configured admin token (always False when none is configured)"""
+    return bool(settings.admin_token and token and secrets.compare_digest(token, settings.admin_token))
@@ -0,0 +1,13 @@
+import os
+from uvicorn.workers import UvicornWorker as BaseUvicornWorker
+from .config import settings
+
+class UvicornWorker(BaseUvicornWorker):
+    """Gunicorn worker running the app on uvloop with the httptools parser"""
+    CONFIG_KWARGS = {"loop": "uvloop", "http": "httptools", "lifespan": "on"}
+
+def worker_count() -> int:
+    """Workers from WEB_CONCURRENCY, otherwise one per CPU available to the process"""
+    if settings.web_concurrency > 0:
+        return settings.web_concurrency
+    return os.process_cpu_count() or 1
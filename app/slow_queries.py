@@ -0,0 +1,90 @@
+import json
+import logging
+import random
+import time
+from collections import deque
+from datetime import datetime, timezone
+from logging.handlers import WatchedFileHandler
+from typing import Any, Dict, List
+from sqlalchemy import event
+from .config import settings
+from .context import current_route
+
+logger = logging.getLogger("app.slow_queries")
+
+# Most recent slow queries, served by /admin/slow-queries
+_recent: deque = deque(maxlen=settings.slow_query_buffer_size)
+
+def install(engine):
+    """Attach the slow query hooks to an engine"""
+    if settings.slow_query_log_file and not logger.handlers:
+        # Workers forked from a preloaded app share this handler's file. Appends of
+        # whole lines are safe across processes, but rotating from inside several
+        # processes is not, so rotation is left to logrotate; the handler reopens
+        # the file once it has been moved.
+        handler = WatchedFileHandler(settings.slow_query_log_file)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+def recent(limit: int = 50) -> List[Dict[str, Any]]:
+    """Return the latest slow queries, newest first"""
+    return list(reversed(_recent))[:limit]
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+def _handle_error(exception_context):
+    starts = exception_context.connection.info.get("query_start") if exception_context.connection else None
+    if starts:
+        starts.pop()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration_ms = (time.perf_counter() - conn.info["query_start"].pop()) * 1000
+    if duration_ms < settings.slow_query_threshold_ms:
+        return
+
+    entry = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "route": current_route.get(),
+        "duration_ms": round(duration_ms, 2),
+        "statement": statement,
+        "parameters": _format_parameters(parameters),
+    }
+    if _should_explain(conn, statement, executemany):
+        entry["plan"] = _explain(conn, statement, parameters)
+
+    _recent.append(entry)
+    logger.info(json.dumps(entry, default=str))
+
+def _format_parameters(parameters, max_length: int = 200):
+    text = repr(parameters)
+    return text if len(text) <= max_length else text[:max_length] + "..."
+
+def _should_explain(conn, statement: str, executemany: bool) -> bool:
+    return (
+        not executemany
+        and conn.dialect.name == "postgresql"
+        and statement.lstrip().upper().startswith("SELECT")
+        and random.random() < settings.slow_query_explain_sample_rate
+    )
+
+def _explain(conn, statement: str, parameters):
+    """Run EXPLAIN ANALYZE on a separate cursor inside a savepoint so the request transaction survives errors"""
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute("SAVEPOINT slow_query_explain")
+        try:
+            cursor.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + statement, parameters)
+            plan = cursor.fetchone()[0]
+        except Exception as e:
+            cursor.execute("ROLLBACK TO SAVEPOINT slow_query_explain")
+            plan = {"error": str(e)}
+        cursor.execute("RELEASE SAVEPOINT slow_query_explain")
+        return plan
+    finally:
+        cursor.close()
@@ -0,0 +1,26 @@
+"""
+Prebuilt statements for the hottest router queries.
+
+Building `db.query(Model).filter(Model.id == x)` on every request costs
+more Python time than the primary-key lookup costs the database. These
+are constructed once, with bind parameters for the per-request values;
+a statement object also memoizes its cache key, so executing one skips
+both construction and SQLAlchemy's compile step:
+
+    db.scalars(statements.task_by_id, {"id": task_id}).first()
+
+Benchmark: benchmarks/statement_cache.py
+"""
+from sqlalchemy import bindparam, select
+from .models.project import Project
+from .models.task import Task
+from .models.user import User
+
+user_by_id = select(User).where(User.id == bindparam("id"))
+project_by_id = select(Project).where(Project.id == bindparam("id"))
+task_by_id = select(Task).where(Task.id == bindparam("id"))
+
+# Pages for the list endpoints; bind "skip" and "limit"
+users_page = select(User).offset(bindparam("skip")).limit(bindparam("limit"))
+projects_page = select(Project).offset(bindparam("skip")).limit(bindparam("limit"))
+tasks_page = select(Task).offset(bindparam("skip")).limit(bindparam("limit"))
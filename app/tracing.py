@@ -0,0 +1,78 @@
+import re
+from typing import Optional
+from sqlalchemy import event
+from common.tracing import SPAN_KIND_CLIENT, SPAN_KIND_SERVER, STATUS_ERROR, Tracer, build_processor, current_span
+from .config import settings
+from .context import resolve_route
+
+_TRACEPARENT_RE = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+tracer = Tracer(build_processor(
+    settings.tracing_exporter, settings.service_name, settings.tracing_file, settings.otlp_endpoint, "app.tracing"
+))
+enabled = tracer.enabled
+start_span = tracer.start_span
+end_span = tracer.end_span
+span = tracer.span
+
+def parse_traceparent(value: Optional[str]):
+    """Return (trace_id, parent_span_id) from a W3C traceparent header, or None"""
+    match = _TRACEPARENT_RE.match((value or "").strip().lower())
+    if not match or match.group(1) == "0" * 32 or match.group(2) == "0" * 16:
+        return None
+    return match.group(1), match.group(2)
+
+class TracingMiddleware:
+    """Open a server span per request, continuing the caller's trace from `traceparent`"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not enabled():
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        remote_parent = parse_traceparent(headers.get(b"traceparent", b"").decode())
+        route = resolve_route(scope)
+        attributes = {"http.method": scope["method"], "http.route": route, "url.path": scope["path"]}
+
+        with span(f"{scope['method']} {route}", SPAN_KIND_SERVER, attributes, remote_parent) as server_span:
+            async def send_with_status(message):
+                if message["type"] == "http.response.start":
+                    server_span.attributes["http.status_code"] = message["status"]
+                    if message["status"] >= 500:
+                        server_span.status = STATUS_ERROR
+                    message.setdefault("headers", []).append((b"traceparent", server_span.traceparent.encode()))
+                await send(message)
+
+            await self.app(scope, receive, send_with_status)
+
+def install(engine):
+    """Record a client span for every SQL statement issued inside a traced request"""
+    if not enabled():
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if current_span.get() is None:
+        conn.info.setdefault("trace_spans", []).append(None)
+        return
+    attributes = {"db.system": conn.dialect.name, "db.statement": statement}
+    conn.info.setdefault("trace_spans", []).append(start_span(statement.split(None, 1)[0].upper(), SPAN_KIND_CLIENT, attributes))
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    sql_span = conn.info["trace_spans"].pop()
+    if sql_span is not None:
+        end_span(sql_span)
+
+def _handle_error(exception_context):
+    spans = exception_context.connection.info.get("trace_spans") if exception_context.connection else None
+    if spans:
+        sql_span = spans.pop()
+        if sql_span is not None:
+            sql_span.status = STATUS_ERROR
+            end_span(sql_span)
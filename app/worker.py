@@ -0,0 +1,33 @@
+"""
+Standalone job worker pool, for JOB_BACKEND=external:
+
+    python -m app.worker --processes 4
+"""
+import argparse
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+from . import jobs
+from . import routers  # noqa: F401  (registers job kinds)
+
+def _run_worker(index: int):
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    jobs.work(stop, f"{socket.gethostname()}:{os.getpid()}:{index}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Run background job workers")
+    parser.add_argument("--processes", type=int, default=os.process_cpu_count() or 1)
+    args = parser.parse_args()
+
+    processes = [multiprocessing.Process(target=_run_worker, args=(index,)) for index in range(args.processes)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Measure Streamlit client script-run time for each page, cold and on rerun.
+
+Every page runs in a fresh interpreter through streamlit's AppTest. Like a
+freshly started Streamlit server, streamlit is already imported there, so
+"cold" is the first script run of the process: the app's own imports plus
+rendering. "rerun" is the next run of the same session. The API is pointed
+at a closed port, so the time measured is the client's own.
+
+    uv run python benchmarks/client_startup.py --repeat 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+RUNNER = """
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file(sys.argv[1], default_timeout=60)
+at.session_state["page"] = sys.argv[2]
+started = time.perf_counter()
+at.run()
+cold = time.perf_counter() - started
+started = time.perf_counter()
+at.run()
+rerun = time.perf_counter() - started
+print(json.dumps({"cold": cold * 1000, "rerun": rerun * 1000, "pandas": "pandas" in sys.modules}))
+"""
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--pages", nargs="+", default=["Dashboard", "Users", "Projects", "Tasks"])
+    args = parser.parse_args()
+
+    env = {**os.environ, "API_BASE_URL": "http://127.0.0.1:9", "PYTHONPATH": ROOT}
+    print(f"Script run (ms, median of {args.repeat} fresh processes)")
+    for page in args.pages:
+        samples = []
+        for _ in range(args.repeat):
+            output = subprocess.run(
+                [sys.executable, "-c", RUNNER, os.path.join(ROOT, "main.py"), page],
+                env=env, cwd=ROOT, capture_output=True, text=True, check=True,
+            ).stdout
+            samples.append(json.loads(output.strip().splitlines()[-1]))
+        cold = statistics.median(sample["cold"] for sample in samples)
+        rerun = statistics.median(sample["rerun"] for sample in samples)
+        pandas = "yes" if samples[-1]["pandas"] else "no"
+        print(f"  {page:<10} cold {cold:8.1f}   rerun {rerun:7.1f}   pandas loaded: {pandas}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Measure bytes on the wire and CPU cost of compressing a GET /tasks/ response.
+
+Builds a realistic task list JSON payload and compresses it with each
+available encoding and level, reporting compressed size, ratio and CPU time
+per response.
+
+    uv run python benchmarks/compression.py --tasks 100 1000
+"""
+import argparse
+import json
+import random
+import time
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+WORDS = "the a project task review update deploy fix client api database index query release test docs design sprint".split()
+
+def make_tasks(count: int):
+    rng = random.Random(42)
+    return [
+        {
+            "title": " ".join(rng.choices(WORDS, k=4)).title(),
+            "description": " ".join(rng.choices(WORDS, k=rng.randint(20, 80))),
+            "priority": rng.choice(["low", "medium", "high", "urgent"]),
+            "due_date": f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T00:00:00Z",
+            "id": i,
+            "status": rng.choice(["todo", "in_progress", "done"]),
+            "is_completed": rng.random() < 0.3,
+            "project_id": rng.randint(1, 50),
+            "assignee_id": rng.randint(1, 200),
+            "created_at": "2025-01-01T09:30:00.000000Z",
+            "updated_at": "2025-02-01T09:30:00.000000Z",
+        }
+        for i in range(count)
+    ]
+
+def cpu_ms(func, payload: bytes, repeat: int) -> float:
+    started = time.process_time()
+    for _ in range(repeat):
+        func(payload)
+    return (time.process_time() - started) * 1000 / repeat
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, nargs="+", default=[100, 1000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    codecs = [(f"gzip-{level}", lambda data, level=level: zlib.compress(data, level, 31)) for level in (1, 6, 9)]
+    if brotli is not None:
+        codecs += [(f"br-{quality}", lambda data, quality=quality: brotli.compress(data, quality=quality)) for quality in (1, 4, 11)]
+
+    for count in args.tasks:
+        payload = json.dumps(make_tasks(count)).encode()
+        print(f"\n{count} tasks: {len(payload):,} bytes uncompressed")
+        for name, compress in codecs:
+            size = len(compress(payload))
+            print(f"  {name:<8} {size:>10,} bytes  ratio {len(payload) / size:5.1f}x  cpu {cpu_ms(compress, payload, args.repeat):7.2f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Compare API startup time and throughput for 1 worker vs N workers.
+
+Starts `gunicorn -c app/gunicorn_conf.py app.main:app` against a throwaway
+SQLite database, waits for /health, then drives GET /tasks/ with keep-alive
+connections from a thread pool.
+
+    uv run python benchmarks/server_workers.py --workers 1 4 --duration 10
+"""
+import argparse
+import http.client
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+def wait_for_health(port: int, timeout: float = 60.0) -> float:
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/health")
+            if conn.getresponse().status == 200:
+                return time.perf_counter() - started
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError("server did not become healthy")
+
+def drive(port: int, path: str, duration: float, concurrency: int) -> int:
+    deadline = time.perf_counter() + duration
+    counts = [0] * concurrency
+
+    def client(index: int):
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+        while time.perf_counter() < deadline:
+            conn.request("GET", path)
+            conn.getresponse().read()
+            counts[index] += 1
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sum(counts)
+
+def run(workers: int, args) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {
+            **os.environ,
+            "DATABASE_URL": f"sqlite:///{tmp}/bench.db",
+            "WEB_CONCURRENCY": str(workers),
+            "PORT": str(args.port),
+            "SLOW_QUERY_LOG_FILE": "",
+        }
+        started = time.perf_counter()
+        server = subprocess.Popen(
+            [sys.executable, "-m", "gunicorn", "-c", "app/gunicorn_conf.py", "app.main:app"],
+            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            wait_for_health(args.port)
+            startup = time.perf_counter() - started
+            total = drive(args.port, args.path, args.duration, args.concurrency)
+            print(f"workers={workers:<3} startup={startup:6.2f}s  requests={total:<8} throughput={total / args.duration:8.1f} req/s")
+        finally:
+            server.terminate()
+            server.wait()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, os.process_cpu_count() or 1])
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--path", default="/tasks/")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    for workers in args.workers:
+        run(workers, args)
+
+if __name__ == "__main__":
+    main()
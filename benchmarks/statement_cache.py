@@ -0,0 +1,83 @@
+"""
+Measure Python CPU per lookup and per request for the hot router queries.
+
+Seeds a throwaway SQLite database, then reports CPU time (process time,
+so waiting is excluded) for:
+
+- each lookup built per call as `db.query(Model).filter(...)` versus the
+  prebuilt statement from app.statements, on the same session;
+- whole GET requests through the ASGI app, handler to serialized body.
+
+    uv run python benchmarks/statement_cache.py --rows 1000 --repeat 2000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+def cpu_us(func, repeat: int) -> float:
+    started = time.process_time()
+    for index in range(repeat):
+        func(index)
+    return (time.process_time() - started) * 1e6 / repeat
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    database = os.path.join(tempfile.mkdtemp(), "bench.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{database}"
+    os.environ.setdefault("JOB_WORKERS", "0")
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    from fastapi.testclient import TestClient
+    from sqlalchemy import insert
+    from app.database import SessionLocal, engine
+    from app.main import app
+    from app.models import Project, Task, User
+
+    with engine.begin() as conn:
+        conn.execute(insert(User), [
+            {"id": i, "username": f"user{i}", "email": f"user{i}@example.com", "full_name": f"User {i}"}
+            for i in range(1, 51)
+        ])
+        conn.execute(insert(Project), [{"id": i, "name": f"Project {i}", "owner_id": i % 50 + 1} for i in range(1, 21)])
+        conn.execute(insert(Task), [
+            {"id": i, "title": f"Task {i}", "project_id": i % 20 + 1, "assignee_id": i % 50 + 1}
+            for i in range(1, args.rows + 1)
+        ])
+
+    print(f"Lookups (µs CPU per call, {args.repeat} calls)")
+    try:
+        from app import statements
+    except ImportError:
+        statements = None
+    with SessionLocal() as db:
+        cases = [
+            ("task by id", lambda i: db.query(Task).filter(Task.id == i % args.rows + 1).first(),
+             lambda i: db.scalars(statements.task_by_id, {"id": i % args.rows + 1}).first()),
+            ("user by id", lambda i: db.query(User).filter(User.id == i % 50 + 1).first(),
+             lambda i: db.scalars(statements.user_by_id, {"id": i % 50 + 1}).first()),
+            ("tasks page of 20", lambda i: db.query(Task).offset(i % 50 * 20).limit(20).all(),
+             lambda i: db.scalars(statements.tasks_page, {"skip": i % 50 * 20, "limit": 20}).all()),
+        ]
+        for name, built, cached in cases:
+            line = f"  {name:<18} built per call {cpu_us(built, args.repeat):8.1f}"
+            if statements is not None:
+                line += f"   prebuilt {cpu_us(cached, args.repeat):8.1f}"
+            print(line)
+            db.expunge_all()
+
+    print(f"\nRequests (µs CPU per request, {args.repeat // 4} requests)")
+    with TestClient(app) as client:
+        for path in ("/tasks/{id}", "/users/{id}", "/projects/{id}", "/tasks/?limit=20"):
+            def request(i, path=path):
+                client.get(path.format(id=i % 20 + 1)).raise_for_status()
+            request(0)
+            print(f"  GET {path:<18} {cpu_us(request, args.repeat // 4):8.1f}")
+
+if __name__ == "__main__":
+    main()
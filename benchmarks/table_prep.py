@@ -0,0 +1,99 @@
+"""
+Measure render-prep time for the Streamlit task table: from the list of
+task dicts to the display DataFrame plus the metric-card numbers.
+
+Compares the previous per-row pipeline (emoji strings built in Python
+loops, `format_datetime` applied row by row, counts in dict loops) with
+the vectorized one in client.utils.helpers, on synthetic tasks.
+
+    uv run python benchmarks/table_prep.py --rows 10000 100000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+COLUMNS = ['id', 'title', 'status', 'priority', 'is_completed', 'project_id', 'assignee_id', 'due_date']
+
+def make_tasks(rows: int):
+    rng = random.Random(0)
+    start = datetime(2025, 1, 1)
+    return [
+        {
+            "id": i,
+            "title": f"Task {i}",
+            "description": None,
+            "status": rng.choice(["todo", "in_progress", "done"]),
+            "priority": rng.choice(["low", "medium", "high", "urgent"]),
+            "is_completed": rng.random() < 0.3,
+            "project_id": i % 20 + 1,
+            "assignee_id": i % 50 + 1 if rng.random() < 0.8 else None,
+            "due_date": (start + timedelta(hours=i)).isoformat() if rng.random() < 0.7 else None,
+            "created_at": (start + timedelta(minutes=i)).isoformat(),
+            "updated_at": None,
+            "version": 1,
+        }
+        for i in range(1, rows + 1)
+    ]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    import pandas as pd
+    from client.utils.helpers import (
+        completed_label, create_data_table, format_datetime, get_priority_emoji, get_status_emoji,
+        priority_label, status_label,
+    )
+
+    def per_row(tasks):
+        for task in tasks:
+            task['status_display'] = f"{get_status_emoji(task['status'])} {task['status'].replace('_', ' ').title()}"
+            task['priority_display'] = f"{get_priority_emoji(task['priority'])} {task['priority'].title()}"
+            task['completed_display'] = "✅ Yes" if task['is_completed'] else "⏳ No"
+        df = pd.DataFrame(tasks)
+        for col in df.columns:
+            if 'created_at' in col or 'updated_at' in col or 'due_date' in col:
+                df[col] = df[col].apply(format_datetime)
+        df = df[['id', 'title', 'status_display', 'priority_display', 'completed_display',
+                 'project_id', 'assignee_id', 'due_date']]
+        completed = sum(1 for task in tasks if task['is_completed'])
+        priority_counts = {}
+        for task in tasks:
+            priority_counts[task['priority']] = priority_counts.get(task['priority'], 0) + 1
+        return df, completed, priority_counts.get('urgent', 0)
+
+    def vectorized(tasks):
+        frame = pd.DataFrame(tasks)
+        df = create_data_table(frame, COLUMNS, labels={
+            'status': status_label, 'priority': priority_label, 'is_completed': completed_label,
+        })
+        completed = int(frame['is_completed'].sum())
+        return df, completed, int(frame['priority'].value_counts().get('urgent', 0))
+
+    def best_ms(prepare, rows):
+        times = []
+        for _ in range(args.repeat):
+            tasks = make_tasks(rows)
+            started = time.perf_counter()
+            result = prepare(tasks)
+            times.append((time.perf_counter() - started) * 1000)
+        return min(times), result
+
+    print(f"Render prep (ms, best of {args.repeat})")
+    for rows in args.rows:
+        before, (old_df, *old_metrics) = best_ms(per_row, rows)
+        after, (new_df, *new_metrics) = best_ms(vectorized, rows)
+        assert old_metrics == new_metrics
+        # The per-row path sees pandas' NaN for missing dates, not None, so never shows "Not set"
+        assert list(old_df['due_date'].fillna("Not set")) == list(new_df['due_date'])
+        assert list(old_df['status_display']) == list(new_df['status'].astype(str))
+        print(f"  {rows:>7} rows   per row {before:8.1f}   vectorized {after:8.1f}   {before / after:5.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,145 @@
+import threading
+import uuid
 import requests
 import streamlit as st
-from typing import Dict, Any, Optional
+from contextlib import contextmanager
+from typing import Callable, Dict, Any, List, Optional
+from urllib.parse import urlencode
 from client.config import config
+from client import tracing
+
+try:
+    import brotli  # noqa: F401  (lets urllib3 decode "br" responses)
+    ACCEPT_ENCODING = "br, gzip"
+except ImportError:
+    ACCEPT_ENCODING = "gzip"
+
+def if_match(version: Optional[int]) -> Dict[str, str]:
+    """Make an update apply only if the record is still at `version` (412 otherwise)"""
+    return {"If-Match": f'"{version}"'} if version is not None else {}
+
+class PendingResult:
+    """Result of a call queued inside `APIClient.batch()`; `value` is set when the block exits"""
+    def __init__(self):
+        self.value: Optional[Any] = None
 
 class APIClient:
     def __init__(self):
         self.base_url = config.api_base_url
         self.timeout = config.timeout
+        # Reuse connections and advertise the encodings we can decompress
+        self.session = requests.Session()
+        self.session.headers["Accept-Encoding"] = ACCEPT_ENCODING
+        # The client is shared by every Streamlit session, so open batches are per thread
+        self._local = threading.local()
+    
+    @contextmanager
+    def batch(self, atomic: bool = False):
+        """Queue the API calls made inside the block and send them as one POST /batch on exit.
+        
+        Calls inside the block return PendingResult placeholders; read their `value` after
+        the block. With `atomic`, the calls run in one transaction that fails as a whole.
+        """
+        queue = []
+        self._local.queue = queue
+        try:
+            yield self
+        finally:
+            self._local.queue = None
+        if queue:
+            self._flush_batch(queue, atomic)
+    
+    def _flush_batch(self, queue: List, atomic: bool):
+        operations = [operation for operation, _ in queue]
+        response = self._make_request("POST", "batch", json={"requests": operations, "atomic": atomic})
+        if response is None:
+            return
+        for (_, pending), result in zip(queue, response["responses"]):
+            if result["status"] == 204:
+                pending.value = {"success": True}
+            elif result["status"] < 400:
+                pending.value = result["body"]
+            elif result["status"] != 424:  # Not run because an earlier atomic call failed
+                detail = result["body"].get("detail") if isinstance(result["body"], dict) else None
+                self._show_http_error(result["status"], detail, result["headers"].get("retry-after"))
+    
+    def _show_http_error(self, status_code: int, detail: Optional[str] = None, retry_after: Optional[str] = None):
+        if status_code == 404:
+            st.error("❌ Resource not found!")
+        elif status_code == 400:
+            st.error(f"❌ {detail or 'Bad request'}")
+        elif status_code == 412:
+            st.warning("⚠️ Someone else changed this record while you were editing. It has been reloaded; please apply your changes again.")
+        elif status_code in (429, 503):
+            st.warning(f"⏳ The server is busy. Please retry in {retry_after or 'a few'} seconds.")
+        else:
+            st.error(f"❌ HTTP Error: {status_code}")
         
+    @contextmanager
+    def deferred(self):
+        """Build the API calls made inside the block without sending them.
+        
+        Each call returns its prepared request instead. `send` it on any thread,
+        then hand the outcome to `receive` back on the script thread.
+        """
+        self._local.deferring = True
+        try:
+            yield self
+        finally:
+            self._local.deferring = False
+    
     def _make_request(self, method: str, endpoint: str, **kwargs) -> Optional[Dict]:
         """Make HTTP request to API"""
-        url = config.get_endpoint(endpoint)
+        queue = getattr(self._local, "queue", None)
+        if queue is not None:
+            path = "/" + endpoint + ("?" + urlencode(kwargs["params"]) if kwargs.get("params") else "")
+            operation = {"method": method, "path": path, "body": kwargs.get("json"), "headers": kwargs.get("headers", {})}
+            pending = PendingResult()
+            queue.append((operation, pending))
+            return pending
         
-        try:
-            response = requests.request(
+        request = self._prepare(method, endpoint, **kwargs)
+        if getattr(self._local, "deferring", False):
+            return request
+        return self.receive(lambda: self.send(request))
+    
+    def _prepare(self, method: str, endpoint: str, **kwargs) -> Dict[str, Any]:
+        """The request to send, with this session's headers (reads session state, so script thread only)"""
+        # Per-session id, so the API's rate limits apply per user rather than per Streamlit pod
+        client_id = st.session_state.setdefault("client_id", uuid.uuid4().hex)
+        kwargs["headers"] = {**kwargs.get("headers", {}), "X-Client-Id": client_id}
+        # Echo the token from our last write so reads never come from a replica that has not caught up
+        consistency_token = st.session_state.get("consistency_token")
+        if consistency_token:
+            kwargs["headers"]["X-Consistency-Token"] = consistency_token
+        return {"method": method, "url": config.get_endpoint(endpoint), "kwargs": kwargs}
+    
+    def send(self, request: Dict[str, Any]) -> requests.Response:
+        """Send a prepared request; touches no Streamlit API, so any thread may call it"""
+        method, url, kwargs = request["method"], request["url"], request["kwargs"]
+        with tracing.span(f"HTTP {method}", tracing.SPAN_KIND_CLIENT, {"http.method": method, "url.full": url}) as http_span:
+            if http_span is not None:
+                kwargs["headers"]["traceparent"] = http_span.traceparent
+            
+            response = self.session.request(
                 method=method,
                 url=url,
                 timeout=self.timeout,
                 **kwargs
             )
             
+            if http_span is not None:
+                http_span.attributes["http.status_code"] = response.status_code
+        return response
+    
+    def receive(self, outcome: Callable[[], requests.Response]) -> Optional[Dict]:
+        """Handle a response on the script thread; `outcome()` returns it or raises what sending raised"""
+        try:
+            response = outcome()
+            
+            if "X-Consistency-Token" in response.headers:
+                st.session_state["consistency_token"] = response.headers["X-Consistency-Token"]
+            
             if response.status_code == 204:  # No content for DELETE
                 return {"success": True}
                 
@@ -33,24 +153,23 @@ class APIClient:
             st.error("⏱️ Request timed out. Please try again.")
             return None
         except requests.exceptions.HTTPError as e:
-            if e.response.status_code == 404:
-                st.error("❌ Resource not found!")
-            elif e.response.status_code == 400:
-                try:
-                    error_detail = e.response.json().get("detail", "Bad request")
-                    st.error(f"❌ {error_detail}")
-                except:
-                    st.error("❌ Bad request")
-            else:
-                st.error(f"❌ HTTP Error: {e.response.status_code}")
+            try:
+                error_detail = e.response.json().get("detail")
+            except:
+                error_detail = None
+            self._show_http_error(e.response.status_code, error_detail, e.response.headers.get("Retry-After"))
             return None
         except Exception as e:
             st.error(f"❌ Unexpected error: {str(e)}")
             return None
     
     # User endpoints
-    def get_users(self, skip: int = 0, limit: int = 100) -> Optional[Any]:
-        return self._make_request("GET", f"users/?skip={skip}&limit={limit}")
+    def get_users(self, skip: int = 0, limit: int = 100, fields: Optional[str] = None) -> Optional[Any]:
+        """`fields` limits each item to those columns, e.g. "id,name" for a select box"""
+        params = {"skip": skip, "limit": limit}
+        if fields:
+            params["fields"] = fields
+        return self._make_request("GET", "users/", params=params)
     
     def get_user(self, user_id: int) -> Optional[Dict]:
         return self._make_request("GET", f"users/{user_id}")
@@ -58,15 +177,26 @@ class APIClient:
     def create_user(self, user_data: Dict) -> Optional[Dict]:
         return self._make_request("POST", "users/", json=user_data)
     
-    def update_user(self, user_id: int, user_data: Dict) -> Optional[Dict]:
-        return self._make_request("PUT", f"users/{user_id}", json=user_data)
+    def update_user(self, user_id: int, user_data: Dict, version: Optional[int] = None) -> Optional[Dict]:
+        return self._make_request("PATCH", f"users/{user_id}", json=user_data, headers=if_match(version))
     
     def delete_user(self, user_id: int) -> Optional[Dict]:
         return self._make_request("DELETE", f"users/{user_id}")
     
+    def get_user_tasks(self, user_id: int, cursor: Optional[str] = None, limit: int = 50, **filters) -> Optional[Dict]:
+        """One page of a user's tasks (filters: status, include_completed, due_before, due_after) with status counts"""
+        params = {"limit": limit, **{key: value for key, value in filters.items() if value is not None}}
+        if cursor:
+            params["cursor"] = cursor
+        return self._make_request("GET", f"users/{user_id}/tasks", params=params)
+    
     # Project endpoints
-    def get_projects(self, skip: int = 0, limit: int = 100) -> Optional[Any]:
-        return self._make_request("GET", f"projects/?skip={skip}&limit={limit}")
+    def get_projects(self, skip: int = 0, limit: int = 100, fields: Optional[str] = None) -> Optional[Any]:
+        """`fields` limits each item to those columns, e.g. "id,name" for a select box"""
+        params = {"skip": skip, "limit": limit}
+        if fields:
+            params["fields"] = fields
+        return self._make_request("GET", "projects/", params=params)
     
     def get_project(self, project_id: int) -> Optional[Dict]:
         return self._make_request("GET", f"projects/{project_id}")
@@ -74,15 +204,33 @@ class APIClient:
     def create_project(self, project_data: Dict) -> Optional[Dict]:
         return self._make_request("POST", "projects/", json=project_data)
     
-    def update_project(self, project_id: int, project_data: Dict) -> Optional[Dict]:
-        return self._make_request("PUT", f"projects/{project_id}", json=project_data)
+    def update_project(self, project_id: int, project_data: Dict, version: Optional[int] = None) -> Optional[Dict]:
+        return self._make_request("PATCH", f"projects/{project_id}", json=project_data, headers=if_match(version))
     
     def delete_project(self, project_id: int) -> Optional[Dict]:
         return self._make_request("DELETE", f"projects/{project_id}")
     
     # Task endpoints
-    def get_tasks(self, skip: int = 0, limit: int = 100) -> Optional[Any]:
-        return self._make_request("GET", f"tasks/?skip={skip}&limit={limit}")
+    def get_tasks(self, skip: int = 0, limit: int = 100, fields: Optional[str] = None) -> Optional[Any]:
+        """`fields` limits each item to those columns, e.g. "id,name" for a select box"""
+        params = {"skip": skip, "limit": limit}
+        if fields:
+            params["fields"] = fields
+        return self._make_request("GET", "tasks/", params=params)
+    
+    def get_task_page(
+        self, cursor: Optional[str] = None, limit: int = 100, totals: Optional[bool] = None,
+        fields: Optional[str] = None, **filters
+    ) -> Optional[Dict]:
+        """One page of tasks matching `filters` (status, priority, is_completed), by default with totals on the first"""
+        params = {"limit": limit, **{key: value for key, value in filters.items() if value is not None}}
+        if cursor:
+            params["cursor"] = cursor
+        if totals is not None:
+            params["totals"] = totals
+        if fields:
+            params["fields"] = fields
+        return self._make_request("GET", "tasks/page", params=params)
     
     def get_task(self, task_id: int) -> Optional[Dict]:
         return self._make_request("GET", f"tasks/{task_id}")
@@ -90,11 +238,43 @@ class APIClient:
     def create_task(self, task_data: Dict) -> Optional[Dict]:
         return self._make_request("POST", "tasks/", json=task_data)
     
-    def update_task(self, task_id: int, task_data: Dict) -> Optional[Dict]:
-        return self._make_request("PUT", f"tasks/{task_id}", json=task_data)
+    def update_task(self, task_id: int, task_data: Dict, version: Optional[int] = None) -> Optional[Dict]:
+        return self._make_request("PATCH", f"tasks/{task_id}", json=task_data, headers=if_match(version))
     
     def delete_task(self, task_id: int) -> Optional[Dict]:
         return self._make_request("DELETE", f"tasks/{task_id}")
 
+    # Change feeds
+    def get_changes(self, entity: str, since: Optional[str] = None, cursor: Optional[str] = None) -> Optional[Dict]:
+        params = {key: value for key, value in (("since", since), ("cursor", cursor)) if value}
+        return self._make_request("GET", f"{entity}/changes", params=params or None)
+    
+    def sync_mirror(self, entity: str) -> Optional[List[Dict]]:
+        """Bring this session's local copy of `entity` ("users", "projects", "tasks") up to date"""
+        mirrors = st.session_state.setdefault("mirrors", {})
+        mirror = mirrors.setdefault(entity, {"since": None, "rows": {}})
+        
+        changes = self.get_changes(entity, mirror["since"])
+        if changes is None:
+            return None
+        
+        # A snapshot replaces the mirror once all of its pages have arrived
+        rows = {} if changes["reset"] else mirror["rows"]
+        while True:
+            for row in changes["items"]:
+                rows[row["id"]] = row
+            for deleted_id in changes["deleted"]:
+                rows.pop(deleted_id, None)
+            if changes.get("next_cursor") is None:
+                break
+            changes = self.get_changes(entity, cursor=changes["next_cursor"])
+            if changes is None:
+                return None
+        mirror["rows"] = rows
+        mirror["since"] = changes["next_since"]
+        
+        # Copies, so page-level display columns never leak into the mirror
+        return [dict(mirror["rows"][row_id]) for row_id in sorted(mirror["rows"])]
+
 # Create global API client instance
 api_client = APIClient()
\ No newline at end of file
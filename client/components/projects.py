@@ -1,11 +1,15 @@
 import streamlit as st
-import pandas as pd
+from datetime import datetime
 from client.api_client import api_client
+from client.tracing import traced
+from client.events import live_rows, force_refresh
 from client.utils.helpers import (
     display_success_message, display_error_message, 
-    create_data_table, format_datetime, get_status_emoji, confirm_deletion
+    create_data_table, format_datetime, get_status_emoji, confirm_deletion,
+    editing_version, finish_editing, status_label
 )
 
+@traced
 def render_projects_page():
     """Render the Projects management page"""
     st.title("📁 Project Management")
@@ -29,6 +33,7 @@ def render_projects_page():
     elif operation == "Delete Project":
         render_delete_project()
 
+@traced
 def render_projects_list():
     """Display all projects"""
     st.subheader("📋 All Projects")
@@ -36,23 +41,26 @@ def render_projects_list():
     col1, col2 = st.columns([3, 1])
     with col2:
         if st.button("🔄 Refresh", key="refresh_projects"):
+            force_refresh("projects")
             st.rerun()
     
-    projects = api_client.get_projects()
+    # Served from the session mirror unless the API reported changes
+    projects = live_rows("projects")
     if projects:
-        # Add status emojis
-        for project in projects:
-            project['status_display'] = f"{get_status_emoji(project['status'])} {project['status'].replace('_', ' ').title()}"
+        import pandas as pd
+        frame = pd.DataFrame(projects)
+        # Counters are maintained by the API, so no tasks need to be loaded
+        frame['progress'] = frame['completed_count'].astype(str) + "/" + frame['task_count'].astype(str)
         
-        df = create_data_table(projects, ['id', 'name', 'status_display', 'owner_id', 'created_at'])
-        df.rename(columns={'status_display': 'status'}, inplace=True)
+        df = create_data_table(
+            frame,
+            ['id', 'name', 'status', 'progress', 'overdue_count', 'owner_id', 'created_at'],
+            labels={'status': status_label},
+        )
         
         # Display metrics
-        total_projects = len(projects)
-        status_counts = {}
-        for project in projects:
-            status = project['status']
-            status_counts[status] = status_counts.get(status, 0) + 1
+        total_projects = len(frame)
+        status_counts = frame['status'].value_counts(sort=False)
         
         cols = st.columns(len(status_counts) + 1)
         with cols[0]:
@@ -60,7 +68,7 @@ def render_projects_list():
         
         for i, (status, count) in enumerate(status_counts.items(), 1):
             with cols[i]:
-                st.metric(f"{get_status_emoji(status)} {status.replace('_', ' ').title()}", count)
+                st.metric(status_label(status), int(count))
         
         # Display table
         st.dataframe(df, use_container_width=True)
@@ -71,17 +79,18 @@ def render_projects_list():
             st.download_button(
                 label="Download CSV",
                 data=csv,
-                file_name=f"projects_{pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')}.csv",
+                file_name=f"projects_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
                 mime="text/csv"
             )
     else:
         st.info("No projects found or unable to fetch projects.")
 
+@traced
 def render_project_details():
     """Display detailed view of a specific project"""
     st.subheader("🔍 Project Details")
     
-    projects = api_client.get_projects()
+    projects = api_client.get_projects(fields="id,name")
     if not projects:
         st.error("Unable to fetch projects")
         return
@@ -108,16 +117,23 @@ def render_project_details():
                 st.write(f"**Created:** {format_datetime(project['created_at'])}")
                 st.write(f"**Updated:** {format_datetime(project.get('updated_at'))}")
             
+            task_count = project.get('task_count', 0)
+            completed_count = project.get('completed_count', 0)
+            st.write("**Progress**")
+            st.progress(completed_count / task_count if task_count else 0.0,
+                        text=f"{completed_count} of {task_count} tasks completed, {project.get('overdue_count', 0)} overdue")
+            
             if project.get('description'):
                 st.write("**Description**")
                 st.write(project['description'])
 
+@traced
 def render_create_project():
     """Create new project form"""
     st.subheader("➕ Create New Project")
     
     # Get users for owner selection
-    users = api_client.get_users()
+    users = api_client.get_users(fields="id,username,full_name")
     if not users:
         st.error("Unable to fetch users. Please create users first.")
         return
@@ -157,11 +173,12 @@ def render_create_project():
                     display_success_message(f"Project '{name}' created successfully!")
                     st.rerun()
 
+@traced
 def render_update_project():
     """Update existing project form"""
     st.subheader("✏️ Update Project")
     
-    projects = api_client.get_projects()
+    projects = api_client.get_projects(fields="id,name")
     if not projects:
         st.error("Unable to fetch projects")
         return
@@ -174,6 +191,9 @@ def render_update_project():
         project = api_client.get_project(project_id)
         
         if project:
+            # Saved with If-Match, so a concurrent edit from another session is not overwritten
+            base_version = editing_version("project", project)
+            
             with st.form("update_project_form"):
                 col1, col2 = st.columns(2)
                 
@@ -200,18 +220,20 @@ def render_update_project():
                         update_data['description'] = description
                     
                     if update_data:
-                        result = api_client.update_project(project_id, update_data)
+                        result = api_client.update_project(project_id, update_data, version=base_version)
+                        finish_editing("project", project_id)
                         if result:
                             display_success_message(f"Project '{name}' updated successfully!")
                             st.rerun()
                     else:
                         st.info("No changes detected.")
 
+@traced
 def render_delete_project():
     """Delete project form"""
     st.subheader("🗑️ Delete Project")
     
-    projects = api_client.get_projects()
+    projects = api_client.get_projects(fields="id,name")
     if not projects:
         st.error("Unable to fetch projects")
         return
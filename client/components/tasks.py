@@ -1,14 +1,18 @@
 # client/components/tasks.py
 import streamlit as st
-import pandas as pd
 from datetime import datetime, date
+from functools import partial
 from client.api_client import api_client
+from client.tracing import traced
+from client.paging import all_pages, current_page, page_navigation, reset_pages
 from client.utils.helpers import (
     display_success_message, display_error_message, 
     create_data_table, format_datetime, get_status_emoji, 
-    get_priority_emoji, confirm_deletion
+    get_priority_emoji, confirm_deletion, editing_version, finish_editing,
+    status_label, priority_label, completed_label
 )
 
+@traced
 def render_tasks_page():
     """Render the Tasks management page"""
     st.title("📝 Task Management")
@@ -32,127 +36,106 @@ def render_tasks_page():
     elif operation == "Delete Task":
         render_delete_task()
 
+# Only the columns the table shows
+TABLE_FIELDS = "id,title,status,priority,is_completed,project_id,assignee_id,due_date"
+
+def task_table(tasks):
+    """The task table as shown and exported"""
+    df = create_data_table(
+        tasks,
+        ['id', 'title', 'status', 'priority', 'is_completed', 'project_id', 'assignee_id', 'due_date'],
+        labels={'status': status_label, 'priority': priority_label, 'is_completed': completed_label},
+    )
+    df.rename(columns={'is_completed': 'completed'}, inplace=True)
+    return df
+
+@traced
 def render_tasks_list():
-    """Display all tasks"""
+    """Display all tasks, one server page at a time"""
     st.subheader("📋 All Tasks")
     
     col1, col2 = st.columns([3, 1])
     with col2:
         if st.button("🔄 Refresh", key="refresh_tasks"):
+            reset_pages("tasks")
             st.rerun()
     
-    tasks = api_client.get_tasks()
-    if tasks:
-        # Add display formatting
-        for task in tasks:
-            task['status_display'] = f"{get_status_emoji(task['status'])} {task['status'].replace('_', ' ').title()}"
-            task['priority_display'] = f"{get_priority_emoji(task['priority'])} {task['priority'].title()}"
-            task['completed_display'] = "✅ Yes" if task['is_completed'] else "⏳ No"
-        
-        df = create_data_table(tasks, [
-            'id', 'title', 'status_display', 'priority_display', 
-            'completed_display', 'project_id', 'assignee_id', 'due_date'
-        ])
-        df.rename(columns={
-            'status_display': 'status',
-            'priority_display': 'priority',
-            'completed_display': 'completed'
-        }, inplace=True)
-        
-        # Display metrics
-        total_tasks = len(tasks)
-        completed_tasks = sum(1 for task in tasks if task['is_completed'])
-        pending_tasks = total_tasks - completed_tasks
-        
-        # Priority breakdown
-        priority_counts = {}
-        for task in tasks:
-            priority = task['priority']
-            priority_counts[priority] = priority_counts.get(priority, 0) + 1
-        
-        col1, col2, col3, col4 = st.columns(4)
-        with col1:
-            st.metric("Total Tasks", total_tasks)
-        with col2:
-            st.metric("✅ Completed", completed_tasks)
-        with col3:
-            st.metric("⏳ Pending", pending_tasks)
-        with col4:
-            st.metric("🔴 Urgent", priority_counts.get('urgent', 0))
+    # Filters run on the server, so each page holds only matching tasks
+    with st.expander("🔍 Filters"):
+        filter_col1, filter_col2, filter_col3, filter_col4 = st.columns(4)
         
-        # Filters
-        with st.expander("🔍 Filters"):
-            filter_col1, filter_col2, filter_col3 = st.columns(3)
-            
-            with filter_col1:
-                status_filter = st.multiselect(
-                    "Filter by Status",
-                    options=['todo', 'in_progress', 'done'],
-                    format_func=lambda x: f"{get_status_emoji(x)} {x.replace('_', ' ').title()}"
-                )
-            
-            with filter_col2:
-                priority_filter = st.multiselect(
-                    "Filter by Priority",
-                    options=['low', 'medium', 'high', 'urgent'],
-                    format_func=lambda x: f"{get_priority_emoji(x)} {x.title()}"
-                )
-            
-            with filter_col3:
-                completion_filter = st.selectbox(
-                    "Filter by Completion",
-                    options=['All', 'Completed', 'Pending']
-                )
-        
-        # Apply filters
-        filtered_tasks = tasks.copy()
-        if status_filter:
-            filtered_tasks = [task for task in filtered_tasks if task['status'] in status_filter]
-        if priority_filter:
-            filtered_tasks = [task for task in filtered_tasks if task['priority'] in priority_filter]
-        if completion_filter == 'Completed':
-            filtered_tasks = [task for task in filtered_tasks if task['is_completed']]
-        elif completion_filter == 'Pending':
-            filtered_tasks = [task for task in filtered_tasks if not task['is_completed']]
-        
-        # Update display with filtered data
-        if filtered_tasks != tasks:
-            st.info(f"Showing {len(filtered_tasks)} of {total_tasks} tasks")
-            for task in filtered_tasks:
-                task['status_display'] = f"{get_status_emoji(task['status'])} {task['status'].replace('_', ' ').title()}"
-                task['priority_display'] = f"{get_priority_emoji(task['priority'])} {task['priority'].title()}"
-                task['completed_display'] = "✅ Yes" if task['is_completed'] else "⏳ No"
-            
-            df = create_data_table(filtered_tasks, [
-                'id', 'title', 'status_display', 'priority_display', 
-                'completed_display', 'project_id', 'assignee_id', 'due_date'
-            ])
-            df.rename(columns={
-                'status_display': 'status',
-                'priority_display': 'priority',
-                'completed_display': 'completed'
-            }, inplace=True)
+        with filter_col1:
+            status_filter = st.multiselect(
+                "Filter by Status",
+                options=['todo', 'in_progress', 'done'],
+                format_func=status_label
+            )
         
-        # Display table
-        st.dataframe(df, use_container_width=True)
+        with filter_col2:
+            priority_filter = st.multiselect(
+                "Filter by Priority",
+                options=['low', 'medium', 'high', 'urgent'],
+                format_func=priority_label
+            )
         
-        # Export option
-        if st.button("📥 Export to CSV"):
-            csv = df.to_csv(index=False)
-            st.download_button(
-                label="Download CSV",
-                data=csv,
-                file_name=f"tasks_{pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                mime="text/csv"
+        with filter_col3:
+            completion_filter = st.selectbox(
+                "Filter by Completion",
+                options=['All', 'Completed', 'Pending']
             )
-    else:
+        
+        with filter_col4:
+            page_size = st.selectbox("Rows per page", options=[50, 100, 200, 500], index=1)
+    
+    filters = {
+        "status": status_filter or None,
+        "priority": priority_filter or None,
+        "is_completed": {'All': None, 'Completed': True, 'Pending': False}[completion_filter],
+    }
+    fetch = partial(api_client.get_task_page, fields=TABLE_FIELDS)
+    page = current_page("tasks", fetch, filters, page_size)
+    if page is None or (not page["items"] and page["number"] == 0):
         st.info("No tasks found or unable to fetch tasks.")
+        return
+    
+    # Display metrics, counted by the API over every matching task
+    totals = page["totals"] or {}
+    total_tasks = totals.get("total", 0)
+    completed_tasks = totals.get("completed", 0)
+    
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Total Tasks", total_tasks)
+    with col2:
+        st.metric("✅ Completed", completed_tasks)
+    with col3:
+        st.metric("⏳ Pending", total_tasks - completed_tasks)
+    with col4:
+        st.metric("🔴 Urgent", totals.get("by_priority", {}).get('urgent', 0))
+    
+    # Display table
+    st.dataframe(task_table(page["items"]), use_container_width=True)
+    page_navigation("tasks", page, totals.get("total"), page_size)
+    
+    # Export option: every matching task, not just the page on screen
+    if st.button("📥 Export to CSV"):
+        tasks = all_pages(fetch, filters)
+        if tasks is None:
+            return
+        csv = task_table(tasks).to_csv(index=False)
+        st.download_button(
+            label="Download CSV",
+            data=csv,
+            file_name=f"tasks_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+            mime="text/csv"
+        )
 
+@traced
 def render_task_details():
     """Display detailed view of a specific task"""
     st.subheader("🔍 Task Details")
     
-    tasks = api_client.get_tasks()
+    tasks = api_client.get_tasks(fields="id,title")
     if not tasks:
         st.error("Unable to fetch tasks")
         return
@@ -187,13 +170,16 @@ def render_task_details():
                 st.write("**Description**")
                 st.write(task['description'])
 
+@traced
 def render_create_task():
     """Create new task form"""
     st.subheader("➕ Create New Task")
     
-    # Get projects and users for selection
-    projects = api_client.get_projects()
-    users = api_client.get_users()
+    # Get projects and users for selection, in one round trip
+    with api_client.batch() as batch:
+        pending_projects = batch.get_projects(fields="id,name")
+        pending_users = batch.get_users(fields="id,username,full_name")
+    projects, users = pending_projects.value, pending_users.value
     
     if not projects:
         st.error("Unable to fetch projects. Please create projects first.")
@@ -251,11 +237,12 @@ def render_create_task():
                     display_success_message(f"Task '{title}' created successfully!")
                     st.rerun()
 
+@traced
 def render_update_task():
     """Update existing task form"""
     st.subheader("✏️ Update Task")
     
-    tasks = api_client.get_tasks()
+    tasks = api_client.get_tasks(fields="id,title")
     if not tasks:
         st.error("Unable to fetch tasks")
         return
@@ -265,11 +252,13 @@ def render_update_task():
     
     if selected_task:
         task_id = task_options[selected_task]
-        task = api_client.get_task(task_id)
+        # The task and the users for assignee selection, in one round trip
+        with api_client.batch() as batch:
+            pending_task = batch.get_task(task_id)
+            pending_users = batch.get_users(fields="id,username,full_name")
+        task, users = pending_task.value, pending_users.value
         
         if task:
-            # Get users for assignee selection
-            users = api_client.get_users()
             user_options = {f"{user['full_name']} ({user['username']})": user['id'] for user in users} if users else {}
             
             # Find current assignee
@@ -280,6 +269,9 @@ def render_update_task():
                         current_assignee = f"{user['full_name']} ({user['username']})"
                         break
             
+            # Saved with If-Match, so a concurrent edit from another session is not overwritten
+            base_version = editing_version("task", task)
+            
             with st.form("update_task_form"):
                 col1, col2 = st.columns(2)
                 
@@ -357,18 +349,20 @@ def render_update_task():
                         update_data['due_date'] = new_due_date
                     
                     if update_data:
-                        result = api_client.update_task(task_id, update_data)
+                        result = api_client.update_task(task_id, update_data, version=base_version)
+                        finish_editing("task", task_id)
                         if result:
                             display_success_message(f"Task '{title}' updated successfully!")
                             st.rerun()
                     else:
                         st.info("No changes detected.")
 
+@traced
 def render_delete_task():
     """Delete task form"""
     st.subheader("🗑️ Delete Task")
     
-    tasks = api_client.get_tasks()
+    tasks = api_client.get_tasks(fields="id,title")
     if not tasks:
         st.error("Unable to fetch tasks")
         return
@@ -1,12 +1,16 @@
 import streamlit as st
-import pandas as pd
+from datetime import datetime
 from client.api_client import api_client
+from client.tracing import traced
+from client.events import live_rows, force_refresh
 
 from client.utils.helpers import (
     display_success_message, display_error_message, 
-    create_data_table, format_datetime, confirm_deletion
+    create_data_table, format_datetime, confirm_deletion,
+    editing_version, finish_editing
 )
 
+@traced
 def render_users_page():
     """Render the Users management page"""
     st.title("👥 User Management")
@@ -30,6 +34,7 @@ def render_users_page():
     elif operation == "Delete User":
         render_delete_user()
 
+@traced
 def render_users_list():
     """Display all users"""
     st.subheader("📋 All Users")
@@ -37,9 +42,11 @@ def render_users_list():
     col1, col2 = st.columns([3, 1])
     with col2:
         if st.button("🔄 Refresh", key="refresh_users"):
+            force_refresh("users")
             st.rerun()
     
-    users = api_client.get_users()
+    # Served from the session mirror unless the API reported changes
+    users = live_rows("users")
     if users:
         df = create_data_table(users, ['id', 'username', 'email', 'full_name', 'is_active', 'created_at'])
         
@@ -65,17 +72,18 @@ def render_users_list():
             st.download_button(
                 label="Download CSV",
                 data=csv,
-                file_name=f"users_{pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')}.csv",
+                file_name=f"users_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
                 mime="text/csv"
             )
     else:
         st.info("No users found or unable to fetch users.")
 
+@traced
 def render_user_details():
     """Display detailed view of a specific user"""
     st.subheader("🔍 User Details")
     
-    users = api_client.get_users()
+    users = api_client.get_users(fields="id,username")
     if not users:
         st.error("Unable to fetch users")
         return
@@ -102,7 +110,24 @@ def render_user_details():
                 st.write("**Timestamps**")
                 st.write(f"**Created:** {format_datetime(user['created_at'])}")
                 st.write(f"**Updated:** {format_datetime(user.get('updated_at'))}")
+            
+            # Filtered, sorted and counted by the API instead of scanning every task here
+            st.write("**Open Tasks**")
+            workload = api_client.get_user_tasks(user_id)
+            if workload:
+                count_cols = st.columns(len(workload['counts']))
+                for col, (task_status, count) in zip(count_cols, workload['counts'].items()):
+                    with col:
+                        st.metric(task_status.replace('_', ' ').title(), count)
+                if workload['items']:
+                    df = create_data_table(workload['items'], ['id', 'title', 'status', 'priority', 'due_date', 'project_id'])
+                    st.dataframe(df, use_container_width=True)
+                    if workload['next_cursor']:
+                        st.caption("Showing the 50 most urgent open tasks.")
+                else:
+                    st.info("No open tasks assigned.")
 
+@traced
 def render_create_user():
     """Create new user form"""
     st.subheader("➕ Create New User")
@@ -135,11 +160,12 @@ def render_create_user():
                     display_success_message(f"User '{username}' created successfully!")
                     st.rerun()
 
+@traced
 def render_update_user():
     """Update existing user form"""
     st.subheader("✏️ Update User")
     
-    users = api_client.get_users()
+    users = api_client.get_users(fields="id,username")
     if not users:
         st.error("Unable to fetch users")
         return
@@ -152,6 +178,9 @@ def render_update_user():
         user = api_client.get_user(user_id)
         
         if user:
+            # Saved with If-Match, so a concurrent edit from another session is not overwritten
+            base_version = editing_version("user", user)
+            
             with st.form("update_user_form"):
                 col1, col2 = st.columns(2)
                 
@@ -177,18 +206,20 @@ def render_update_user():
                         update_data['is_active'] = is_active
                     
                     if update_data:
-                        result = api_client.update_user(user_id, update_data)
+                        result = api_client.update_user(user_id, update_data, version=base_version)
+                        finish_editing("user", user_id)
                         if result:
                             display_success_message(f"User '{username}' updated successfully!")
                             st.rerun()
                     else:
                         st.info("No changes detected.")
 
+@traced
 def render_delete_user():
     """Delete user form"""
     st.subheader("🗑️ Delete User")
     
-    users = api_client.get_users()
+    users = api_client.get_users(fields="id,username")
     if not users:
         st.error("Unable to fetch users")
         return
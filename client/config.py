@@ -5,6 +5,12 @@ class ClientConfig:
     def __init__(self):
         self.api_base_url: str = os.getenv("API_BASE_URL", "http://localhost:8000")
         self.timeout: int = int(os.getenv("API_TIMEOUT", "30"))
+
+        # Tracing: "none", "file" (JSON lines) or "otlp" (OTLP/HTTP JSON)
+        self.service_name: str = os.getenv("SERVICE_NAME", "task-client")
+        self.tracing_exporter: str = os.getenv("TRACING_EXPORTER", "none")
+        self.tracing_file: str = os.getenv("TRACING_FILE", "client_traces.jsonl")
+        self.otlp_endpoint: str = os.getenv("OTLP_ENDPOINT", "http://localhost:4318")
         
     def get_endpoint(self, path: str) -> str:
         """Get full endpoint URL"""
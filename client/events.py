@@ -0,0 +1,80 @@
+# client/events.py
+"""
+Live change tracking for the Streamlit client.
+
+One background thread per Streamlit process follows the API's /events
+stream and bumps a version counter for each entity that changes. List
+pages compare that counter with the version they last rendered and only
+ask the API for deltas when something actually changed.
+"""
+import json
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+import requests
+import streamlit as st
+from client.config import config
+from client.api_client import api_client
+
+ENTITIES = ("users", "projects", "tasks")
+
+class ChangeListener(threading.Thread):
+    def __init__(self):
+        super().__init__(daemon=True, name="change-listener")
+        self.versions: Dict[str, int] = defaultdict(int)
+        self.connected = False
+
+    def _bump(self, entities):
+        for entity in entities:
+            self.versions[entity] += 1
+
+    def run(self):
+        while True:
+            try:
+                with requests.get(
+                    config.get_endpoint("events"),
+                    stream=True,
+                    headers={"Accept": "text/event-stream"},
+                    timeout=(5, 60),  # the API sends a heartbeat every 15s
+                ) as response:
+                    response.raise_for_status()
+                    self.connected = True
+                    for line in response.iter_lines(decode_unicode=True):
+                        if not line or not line.startswith("data:"):
+                            continue
+                        payload = json.loads(line[5:])
+                        self._bump(ENTITIES if payload["op"] == "resync" else [payload["entity"]])
+            except (requests.RequestException, ValueError):
+                pass
+            # Anything may have changed while we were disconnected
+            self.connected = False
+            self._bump(ENTITIES)
+            time.sleep(3)
+
+@st.cache_resource
+def get_change_listener() -> ChangeListener:
+    """Start the shared listener once per Streamlit process"""
+    listener = ChangeListener()
+    listener.start()
+    return listener
+
+def live_rows(entity: str) -> Optional[List[Dict]]:
+    """Rows of `entity` for this session, re-synced only when the API reported a change"""
+    listener = get_change_listener()
+    seen = st.session_state.setdefault("seen_versions", {})
+    mirror = st.session_state.get("mirrors", {}).get(entity)
+    
+    if mirror is not None and listener.connected and seen.get(entity) == listener.versions[entity]:
+        return [dict(mirror["rows"][row_id]) for row_id in sorted(mirror["rows"])]
+    
+    # Read the version first so a change arriving mid-sync triggers another sync
+    version = listener.versions[entity]
+    rows = api_client.sync_mirror(entity)
+    if rows is not None:
+        seen[entity] = version
+    return rows
+
+def force_refresh(entity: str):
+    """Make the next live_rows() call go to the API even without a change event"""
+    st.session_state.setdefault("seen_versions", {}).pop(entity, None)
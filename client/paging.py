@@ -0,0 +1,117 @@
+# client/paging.py
+"""
+Paged tables for the Streamlit client.
+
+A paged table shows one server page at a time. Pages fetched for the
+current filters stay in session state, so paging back and forth costs no
+requests, and the page after the one on screen is fetched in the
+background while the user reads. Only the HTTP exchange runs on the
+prefetch pool; the request is built and its response handled on the
+script thread, the only one that may use Streamlit. Filtering happens on
+the server, and the totals come back with the first page.
+
+Keyset cursors stay valid when rows change, so a change event for the
+entity only drops the cached pages and totals; the position is kept.
+"""
+import contextvars
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+import streamlit as st
+from client.api_client import api_client
+from client.events import get_change_listener
+
+# Shared by every session; each prefetch is one page-sized GET
+_prefetcher = ThreadPoolExecutor(max_workers=4, thread_name_prefix="page-prefetch")
+
+def _in_background(fetch: Callable[..., Optional[Dict]], **kwargs) -> Future:
+    """Send the request `fetch(**kwargs)` would make on the prefetch pool; pass the future to `_collect`"""
+    with api_client.deferred():
+        request = fetch(**kwargs)
+    # The copied context carries the current trace span, so the HTTP span nests under it
+    return _prefetcher.submit(contextvars.copy_context().run, api_client.send, request)
+
+def _collect(prefetched: Future) -> Optional[Dict]:
+    """The page a prefetch returned, handled here on the script thread"""
+    return api_client.receive(prefetched.result)
+
+def _table_state(entity: str, filters: Dict[str, Any], page_size: int) -> Dict:
+    state_key = f"paged_{entity}"
+    key = (repr(sorted(filters.items())), page_size)
+    version = get_change_listener().versions[entity]
+    state = st.session_state.get(state_key)
+    if state is None or state["key"] != key:
+        # New filters: start over from the first page
+        state = {"key": key, "version": version, "number": 0, "cursors": [None], "pages": {}, "prefetch": {}, "totals": None}
+        st.session_state[state_key] = state
+    elif state["version"] != version:
+        reset_pages(entity)
+        state["version"] = version
+    return state
+
+def reset_pages(entity: str):
+    """Forget the fetched pages and totals of `entity`, keeping the page the user is on"""
+    state = st.session_state.get(f"paged_{entity}")
+    if state is not None:
+        state.update(pages={}, prefetch={}, totals=None)
+
+def current_page(entity: str, fetch: Callable[..., Optional[Dict]], filters: Dict[str, Any], page_size: int) -> Optional[Dict]:
+    """The page of `entity` the user is on, as {"items", "number", "has_next", "totals"}.
+
+    `fetch(cursor=, limit=, totals=, **filters)` returns one API page. Returns None when
+    the fetch failed; the API client has already shown why.
+    """
+    state = _table_state(entity, filters, page_size)
+    number = state["number"]
+
+    page = state["pages"].get(number)
+    if page is None:
+        prefetched = state["prefetch"].pop(number, None)
+        page = _collect(prefetched) if prefetched is not None else None
+        if page is None or (state["totals"] is None and page.get("total") is None):
+            page = fetch(cursor=state["cursors"][number], limit=page_size, totals=state["totals"] is None, **filters)
+        if page is None:
+            return None
+        state["pages"][number] = page
+        if page.get("total") is not None:
+            state["totals"] = {key: value for key, value in page.items() if key not in ("items", "next_cursor")}
+        if page["next_cursor"] is not None:
+            del state["cursors"][number + 1:]
+            state["cursors"].append(page["next_cursor"])
+
+    # Have the next page ready before the user asks for it
+    next_number = number + 1
+    if page["next_cursor"] is not None and next_number not in state["pages"] and next_number not in state["prefetch"]:
+        state["prefetch"][next_number] = _in_background(
+            fetch, cursor=page["next_cursor"], limit=page_size, totals=False, **filters
+        )
+
+    return {"items": page["items"], "number": number, "has_next": page["next_cursor"] is not None, "totals": state["totals"]}
+
+def page_navigation(entity: str, page: Dict, total: Optional[int], page_size: int):
+    """Previous/next buttons and the page position"""
+    state = st.session_state[f"paged_{entity}"]
+    pages = max(1, -(-total // page_size)) if total is not None else None
+
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col1:
+        if st.button("⬅️ Previous", key=f"{entity}_previous_page", disabled=page["number"] == 0):
+            state["number"] -= 1
+            st.rerun()
+    with col2:
+        st.caption(f"Page {page['number'] + 1}" + (f" of {pages}" if pages is not None else ""))
+    with col3:
+        if st.button("Next ➡️", key=f"{entity}_next_page", disabled=not page["has_next"]):
+            state["number"] += 1
+            st.rerun()
+
+def all_pages(fetch: Callable[..., Optional[Dict]], filters: Dict[str, Any], page_size: int = 500) -> Optional[List[Dict]]:
+    """Every item matching `filters`, walking the keyset cursors; None when a fetch failed"""
+    items, cursor = [], None
+    while True:
+        page = fetch(cursor=cursor, limit=page_size, totals=False, **filters)
+        if page is None:
+            return None
+        items.extend(page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return items
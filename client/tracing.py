@@ -0,0 +1,24 @@
+# client/tracing.py
+"""
+Lightweight tracing for the Streamlit client.
+
+Spans come from the same `common.tracing` module as the API's, so both sides
+can be loaded into one trace viewer; the active span is propagated to the API
+via the W3C `traceparent` header.
+"""
+import functools
+from common.tracing import SPAN_KIND_CLIENT, Tracer, build_processor  # noqa: F401  (SPAN_KIND_CLIENT is used by api_client)
+from client.config import config
+
+tracer = Tracer(build_processor(
+    config.tracing_exporter, config.service_name, config.tracing_file, config.otlp_endpoint, "client.tracing"
+))
+span = tracer.span
+
+def traced(func):
+    """Decorator recording a span around a render function"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with span(func.__name__):
+            return func(*args, **kwargs)
+    return wrapper
@@ -1,7 +1,11 @@
+from __future__ import annotations
 import streamlit as st
-import pandas as pd
 from datetime import datetime
-from typing import Dict, List, Optional, Any
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Mapping, Optional, Union
+
+# pandas takes longer to import than streamlit itself, so it loads when the first table is built
+if TYPE_CHECKING:
+    import pandas as pd
 
 def display_success_message(message: str):
     """Display success message"""
@@ -21,21 +25,53 @@ def format_datetime(dt_str: Optional[str]) -> str:
     except:
         return dt_str
 
-def create_data_table(data: List[Dict], columns: List[str]) -> pd.DataFrame:
-    """Create pandas DataFrame for display"""
-    if not data:
+def format_datetime_column(values: pd.Series) -> pd.Series:
+    """Vectorized format_datetime: parse and format the whole column at once"""
+    import numpy as np
+    import pandas as pd
+    
+    # Like format_datetime, show the wall-clock time as sent, whatever its offset
+    wall_clock = values.astype("string").str.replace(r"(Z|[+-]\d{2}:?\d{2})$", "", regex=True)
+    parsed = pd.to_datetime(wall_clock, errors="coerce", format="ISO8601")
+    # "%Y-%m-%d %H:%M" via numpy, which formats in C where dt.strftime goes element by element
+    minutes = np.datetime_as_string(parsed.to_numpy(dtype="datetime64[m]"), unit="m")
+    formatted = pd.Series(minutes, index=values.index).str.replace("T", " ", regex=False).where(parsed.notna())
+    # Unparseable values are shown as sent, missing ones as "Not set"
+    formatted = formatted.fillna(values.astype(object))
+    return formatted.where(values.notna() & (values != ""), "Not set")
+
+def label_column(values: pd.Series, label: Callable[[Any], str]) -> pd.Series:
+    """Display labels for a low-cardinality column, computing `label` once per distinct value"""
+    labels = {value: label(value) for value in values.dropna().unique()}
+    return values.map(labels).astype("category")
+
+def create_data_table(
+    data: Union[List[Dict], pd.DataFrame],
+    columns: List[str],
+    labels: Optional[Mapping[str, Callable[[Any], str]]] = None,
+) -> pd.DataFrame:
+    """Create pandas DataFrame for display, replacing the columns in `labels` with display labels"""
+    import pandas as pd
+    
+    if len(data) == 0:
         return pd.DataFrame()
     
-    df = pd.DataFrame(data)
+    df = data if isinstance(data, pd.DataFrame) else pd.DataFrame(data)
+    
+    # Select only specified columns if they exist, so only those are formatted
+    available_cols = [col for col in columns if col in df.columns]
+    df = df[available_cols].copy() if available_cols else df.copy()
+    
+    for col, label in (labels or {}).items():
+        if col in df.columns:
+            df[col] = label_column(df[col], label)
     
     # Format datetime columns
     for col in df.columns:
         if 'created_at' in col or 'updated_at' in col or 'due_date' in col:
-            df[col] = df[col].apply(format_datetime)
+            df[col] = format_datetime_column(df[col])
     
-    # Select only specified columns if they exist
-    available_cols = [col for col in columns if col in df.columns]
-    return df[available_cols] if available_cols else df
+    return df
 
 def get_status_emoji(status: str) -> str:
     """Get emoji for status"""
@@ -59,6 +95,17 @@ def get_priority_emoji(priority: str) -> str:
     }
     return priority_emojis.get(priority.lower(), '⚪')
 
+def status_label(status: str) -> str:
+    """Status with its emoji, e.g. 🚀 In Progress"""
+    return f"{get_status_emoji(status)} {status.replace('_', ' ').title()}"
+
+def priority_label(priority: str) -> str:
+    """Priority with its emoji, e.g. 🔴 Urgent"""
+    return f"{get_priority_emoji(priority)} {priority.title()}"
+
+def completed_label(is_completed: bool) -> str:
+    return "✅ Yes" if is_completed else "⏳ No"
+
 def create_metric_cards(metrics: Dict[str, Any]):
     """Create metric cards layout"""
     cols = st.columns(len(metrics))
@@ -68,4 +115,12 @@ def create_metric_cards(metrics: Dict[str, Any]):
 
 def confirm_deletion(item_type: str, item_name: str) -> bool:
     """Show confirmation dialog for deletion"""
-    return st.checkbox(f"⚠️ Confirm deletion of {item_type}: **{item_name}**")
\ No newline at end of file
+    return st.checkbox(f"⚠️ Confirm deletion of {item_type}: **{item_name}**")
+
+def editing_version(item_type: str, item: Dict) -> Optional[int]:
+    """Version of `item` when this session started editing it, sent as If-Match on save"""
+    return st.session_state.setdefault(f"editing_{item_type}_{item['id']}", item.get('version'))
+
+def finish_editing(item_type: str, item_id: int):
+    """Forget the edit's base version, so the next edit starts from the latest data"""
+    st.session_state.pop(f"editing_{item_type}_{item_id}", None)
@@ -0,0 +1,186 @@
+"""
+Span model and exporters shared by the API and the Streamlit client.
+
+Both images copy this package next to their own code. Each side builds a
+`Tracer` from its own configuration; spans are OTLP-shaped so the two
+halves of a trace load into one viewer, and the exporter thread is only
+started once the first span ends.
+"""
+import json
+import os
+import queue
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+# Span kinds as defined by OTLP
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CLIENT = 3
+
+STATUS_UNSET = 0
+STATUS_ERROR = 2
+
+class Span:
+    def __init__(self, name: str, kind: int, trace_id: str, parent_id: Optional[str], attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.kind = kind
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.attributes = dict(attributes or {})
+        self.status = STATUS_UNSET
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def to_otlp(self) -> Dict[str, Any]:
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in self.attributes.items()],
+            "status": {"code": self.status},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+def _otlp_value(value) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+class FileExporter:
+    """Append finished spans as OTLP-shaped JSON lines, for offline inspection"""
+
+    def __init__(self, path: str, service_name: str):
+        self.path = path
+        self.service_name = service_name
+        self._lock = threading.Lock()
+
+    def export(self, spans: List[Span]):
+        with self._lock, open(self.path, "a") as f:
+            for span in spans:
+                f.write(json.dumps({"service": self.service_name, **span.to_otlp()}) + "\n")
+
+class OTLPHttpExporter:
+    """Send spans to an OTLP/HTTP collector using the JSON encoding"""
+
+    def __init__(self, endpoint: str, service_name: str, scope: str):
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+        self.service_name = service_name
+        self.scope = scope
+
+    def export(self, spans: List[Span]):
+        payload = {
+            "resourceSpans": [{
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": self.service_name}}]},
+                "scopeSpans": [{"scope": {"name": self.scope}, "spans": [span.to_otlp() for span in spans]}],
+            }]
+        }
+        request = urllib.request.Request(
+            self.url, data=json.dumps(payload).encode(), headers={"Content-Type": "application/json"}, method="POST"
+        )
+        try:
+            urllib.request.urlopen(request, timeout=5).close()
+        except OSError:
+            pass  # Tracing must never break request handling
+
+class BatchProcessor:
+    """Hand finished spans to an exporter from a background thread"""
+
+    def __init__(self, exporter, max_batch: int = 512, interval: float = 2.0):
+        self.exporter = exporter
+        self.max_batch = max_batch
+        self.interval = interval
+        self._queue: "queue.Queue[Span]" = queue.Queue(maxsize=10000)
+        self._pid: Optional[int] = None
+        self._start_lock = threading.Lock()
+
+    def on_end(self, span: Span):
+        # Start lazily, and again after a fork: threads do not survive into gunicorn workers
+        if self._pid != os.getpid():
+            with self._start_lock:
+                if self._pid != os.getpid():
+                    self._pid = os.getpid()
+                    threading.Thread(target=self._run, daemon=True, name="span-exporter").start()
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            pass
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.interval
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            self.exporter.export(batch)
+
+def build_processor(exporter: str, service_name: str, tracing_file: str, otlp_endpoint: str, scope: str) -> Optional[BatchProcessor]:
+    """Processor for the configured exporter: "file", "otlp", or None for anything else"""
+    if exporter == "file":
+        return BatchProcessor(FileExporter(tracing_file, service_name))
+    if exporter == "otlp":
+        return BatchProcessor(OTLPHttpExporter(otlp_endpoint, service_name, scope))
+    return None
+
+current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+class Tracer:
+    """Start spans as children of the current one and hand them to `processor` when they end"""
+
+    def __init__(self, processor: Optional[BatchProcessor]):
+        self.processor = processor
+
+    def enabled(self) -> bool:
+        return self.processor is not None
+
+    def start_span(self, name: str, kind: int = SPAN_KIND_INTERNAL, attributes: Optional[Dict[str, Any]] = None, remote_parent=None) -> Span:
+        parent = current_span.get()
+        if remote_parent is not None:
+            trace_id, parent_id = remote_parent
+        elif parent is not None:
+            trace_id, parent_id = parent.trace_id, parent.span_id
+        else:
+            trace_id, parent_id = os.urandom(16).hex(), None
+        return Span(name, kind, trace_id, parent_id, attributes)
+
+    def end_span(self, span: Span):
+        span.end_ns = time.time_ns()
+        if self.processor is not None:
+            self.processor.on_end(span)
+
+    @contextmanager
+    def span(self, name: str, kind: int = SPAN_KIND_INTERNAL, attributes: Optional[Dict[str, Any]] = None, remote_parent=None):
+        """Run a block inside a new child span of the current one"""
+        if not self.enabled():
+            yield None
+            return
+        new_span = self.start_span(name, kind, attributes, remote_parent)
+        token = current_span.set(new_span)
+        try:
+            yield new_span
+        except BaseException:
+            new_span.status = STATUS_ERROR
+            raise
+        finally:
+            current_span.reset(token)
+            self.end_span(new_span)
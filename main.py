@@ -1,10 +1,12 @@
 # client/main.py
+import importlib
+import sys
 import streamlit as st
 import requests
+from typing import Callable
 from client.config import config
-from client.components.users import render_users_page
-from client.components.projects import render_projects_page
-from client.components.tasks import render_tasks_page
+from client import tracing
+from client.tracing import traced
 
 # Configure Streamlit page
 st.set_page_config(
@@ -14,6 +16,24 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Page modules by st.session_state.page, imported on first visit so the
+# dashboard paints without loading the others (or pandas, which they use)
+PAGE_MODULES = {
+    "Users": ("client.components.users", "render_users_page"),
+    "Projects": ("client.components.projects", "render_projects_page"),
+    "Tasks": ("client.components.tasks", "render_tasks_page"),
+}
+
+def load_page(page: str) -> Callable[[], None]:
+    """Render function of `page`, importing its module on the first visit in this process"""
+    module_name, function_name = PAGE_MODULES[page]
+    module = sys.modules.get(module_name)
+    if module is None:
+        # Traced, so cold page loads show up next to the page render time
+        with tracing.span(f"import {module_name}"):
+            module = importlib.import_module(module_name)
+    return getattr(module, function_name)
+
 def check_api_connection():
     """Check if the FastAPI server is running"""
     try:
@@ -22,6 +42,7 @@ def check_api_connection():
     except:
         return False
 
+@traced
 def render_dashboard():
     """Render the main dashboard"""
     st.title("📊 Dashboard")
@@ -143,15 +164,12 @@ def main():
     st.sidebar.markdown("- Check API URL in configuration")
     st.sidebar.markdown("- Use filters to find data quickly")
     
-    # Render selected page
-    if st.session_state.page == "Dashboard":
-        render_dashboard()
-    elif st.session_state.page == "Users":
-        render_users_page()
-    elif st.session_state.page == "Projects":
-        render_projects_page()
-    elif st.session_state.page == "Tasks":
-        render_tasks_page()
+    # Render selected page, one trace per script run
+    with tracing.span(f"page {st.session_state.page}"):
+        if st.session_state.page == "Dashboard":
+            render_dashboard()
+        else:
+            load_page(st.session_state.page)()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
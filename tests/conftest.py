@@ -0,0 +1,86 @@
+"""
+Shared fixtures. The app reads its settings and creates its engine at import,
+so the environment is set up here, before anything from `app` is imported:
+a throwaway SQLite database, no job worker threads and no periodic jobs.
+"""
+import os
+import tempfile
+
+_directory = tempfile.mkdtemp(prefix="task-api-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_directory, 'test.db')}"
+os.environ["SLOW_QUERY_LOG_FILE"] = os.path.join(_directory, "slow_queries.log")
+os.environ["JOB_WORKERS"] = "0"
+os.environ["ARCHIVE_INTERVAL_SECONDS"] = "0"
+os.environ["CHANGE_TOMBSTONE_PURGE_INTERVAL_SECONDS"] = "0"
+os.environ["COUNTER_RECONCILE_INTERVAL_SECONDS"] = "0"
+os.environ["REMINDER_SCAN_INTERVAL_SECONDS"] = "0"
+
+import pytest
+from fastapi.testclient import TestClient
+from app.admission import AdmissionMiddleware
+from app.coalescing import CoalescingMiddleware
+from app.config import settings
+from app.database import Base, SessionLocal, engine
+from app.main import app
+
+@pytest.fixture(autouse=True)
+def _empty_tables():
+    yield
+    with engine.begin() as connection:
+        for table in reversed(Base.metadata.sorted_tables):
+            connection.execute(table.delete())
+
+@pytest.fixture
+def db():
+    with SessionLocal() as session:
+        yield session
+
+@pytest.fixture
+def client():
+    """Client without the lifespan: no background threads, requests run in-process"""
+    return TestClient(app)
+
+def _middleware(client, middleware_class):
+    client.get("/")  # builds the middleware stack
+    layer = app.middleware_stack
+    while not isinstance(layer, middleware_class):
+        layer = layer.app
+    return layer
+
+@pytest.fixture
+def admission(client) -> AdmissionMiddleware:
+    """The app's admission middleware, to swap its token buckets in a test"""
+    return _middleware(client, AdmissionMiddleware)
+
+@pytest.fixture
+def coalescing(client, monkeypatch) -> CoalescingMiddleware:
+    """The app's coalescing middleware with a replay window and nothing remembered yet"""
+    layer = _middleware(client, CoalescingMiddleware)
+    monkeypatch.setattr(settings, "coalesce_window_ms", 60_000)
+    monkeypatch.setattr(layer, "recent", type(layer.recent)())
+    return layer
+
+class _JobContext:
+    def report(self, progress, total=None):
+        pass
+
+@pytest.fixture
+def job_context():
+    """Stands in for the JobContext a worker passes when a job function is called directly"""
+    return _JobContext()
+
+@pytest.fixture
+def user(client):
+    return client.post("/users/", json={"username": "ada", "email": "ada@example.com", "full_name": "Ada"}).json()
+
+@pytest.fixture
+def project(client, user):
+    return client.post("/projects/", json={"name": "Apollo", "owner_id": user["id"]}).json()
+
+@pytest.fixture
+def make_task(client, project):
+    def make(**fields):
+        response = client.post("/tasks/", json={"title": "Task", "project_id": project["id"], **fields})
+        assert response.status_code == 201, response.text
+        return response.json()
+    return make
@@ -0,0 +1,75 @@
+import asyncio
+from app.admission import ConcurrencyLimiter, TokenBuckets, client_key, route_class
+from app.config import settings
+
+def _scope(client_id=None, admin_token=None, peer="203.0.113.7"):
+    headers = []
+    if client_id is not None:
+        headers.append((b"x-client-id", client_id.encode()))
+    if admin_token is not None:
+        headers.append((b"x-admin-token", admin_token.encode()))
+    return {"type": "http", "headers": headers, "client": (peer, 50000)}
+
+def test_client_id_only_sub_keys_the_peer_address():
+    assert client_key(_scope()) == "203.0.113.7"
+    assert client_key(_scope("session-1")) == "203.0.113.7/session-1"
+    # Claiming another peer's session id does not share its bucket
+    assert client_key(_scope("session-1", peer="198.51.100.2")) != client_key(_scope("session-1"))
+
+def test_admin_token_keys_on_the_admin_principal(monkeypatch):
+    monkeypatch.setattr(settings, "admin_token", "secret")
+    assert client_key(_scope("session-1", admin_token="secret")) == "admin/session-1"
+    assert client_key(_scope("session-1", admin_token="guess")) == "203.0.113.7/session-1"
+
+def test_token_bucket_refuses_past_the_burst_and_says_how_long_to_wait():
+    buckets = TokenBuckets(rate=1.0, burst=2)
+    assert buckets.take("a") == 0
+    assert buckets.take("a") == 0
+    assert 0 < buckets.take("a") <= 1
+    assert buckets.take("b") == 0
+
+def test_rotating_client_ids_does_not_escape_the_peer_limit(client, admission, monkeypatch):
+    monkeypatch.setattr(admission, "peer_buckets", TokenBuckets(rate=0.001, burst=3))
+    statuses = [
+        client.get(f"/users/?limit={index}", headers={"X-Client-Id": f"session-{index}"}).status_code
+        for index in range(5)
+    ]
+    assert statuses == [200, 200, 200, 429, 429]
+
+def test_rate_limited_requests_get_429_with_retry_after(client, admission, monkeypatch):
+    monkeypatch.setattr(admission, "buckets", TokenBuckets(rate=0.5, burst=1))
+    assert client.get("/users/", headers={"X-Client-Id": "one"}).status_code == 200
+    response = client.get("/users/?limit=5", headers={"X-Client-Id": "one"})
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "2"
+    assert client.get("/users/?limit=6", headers={"X-Client-Id": "two"}).status_code == 200
+
+def test_concurrency_limiter_rejects_when_the_queue_is_full_or_the_wait_times_out(monkeypatch):
+    monkeypatch.setattr(settings, "admission_queue_timeout", 0.05)
+
+    async def scenario():
+        full = ConcurrencyLimiter("reads", limit=1, queue_size=0)
+        assert await full.acquire() is None
+        assert await full.acquire() == "queue_full"
+
+        slow = ConcurrencyLimiter("reads", limit=1, queue_size=1)
+        assert await slow.acquire() is None
+        assert await slow.acquire() == "queue_timeout"
+        slow.release()
+        assert await slow.acquire() is None
+
+    asyncio.run(scenario())
+
+def test_only_change_feed_snapshots_are_exports():
+    assert route_class("GET", "/users/changes") == "exports"
+    assert route_class("GET", "/users/changes", b"cursor=abc") == "exports"
+    assert route_class("GET", "/users/changes", b"since=12%3A1700000000") == "reads"
+    assert route_class("GET", "/users/") == "reads"
+    assert route_class("POST", "/users/") == "writes"
+
+def test_delta_polls_are_not_held_to_the_export_limit(client, admission, monkeypatch):
+    token = client.get("/users/changes").json()["next_since"]
+    monkeypatch.setattr(admission.limiters["exports"], "semaphore", asyncio.Semaphore(0))
+    monkeypatch.setattr(admission.limiters["exports"], "queue_size", 0)
+    assert client.get("/users/changes", params={"since": token}).status_code == 200
+    assert client.get("/users/changes").status_code == 503
@@ -0,0 +1,34 @@
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import update
+from app.models import Task
+from app.routers.tasks import archive_completed_tasks
+
+def test_archived_tasks_leave_the_hot_table_and_stay_listable(client, db, make_task, job_context):
+    done = make_task(title="Old and done")
+    open_task = make_task(title="Still open")
+    long_ago = datetime.now(timezone.utc) - timedelta(days=400)
+    db.execute(update(Task).where(Task.id == done["id"]).values(is_completed=True, updated_at=long_ago))
+    db.commit()
+    token = client.get("/tasks/changes").json()["next_since"]
+
+    assert archive_completed_tasks(job_context, older_than_days=30) == {"archived": 1}
+
+    assert [task["id"] for task in client.get("/tasks/").json()] == [open_task["id"]]
+    listed = client.get("/tasks/", params={"include_archived": True}).json()
+    assert sorted(task["id"] for task in listed) == sorted([done["id"], open_task["id"]])
+    assert client.get(f"/tasks/{done['id']}", params={"include_archived": True}).json()["title"] == "Old and done"
+    assert client.get("/tasks/changes", params={"since": token}).json()["deleted"] == [done["id"]]
+
+def test_ids_of_archived_tasks_are_not_handed_out_again(client, db, make_task, job_context):
+    make_task(title="Open")
+    newest = make_task(title="Newest, done")
+    db.execute(update(Task).where(Task.id == newest["id"]).values(
+        is_completed=True, updated_at=datetime.now(timezone.utc) - timedelta(days=400)
+    ))
+    db.commit()
+    archive_completed_tasks(job_context, older_than_days=30)
+
+    created = make_task(title="Created after archiving")
+    assert created["id"] > newest["id"]
+    archived = client.get(f"/tasks/{newest['id']}", params={"include_archived": True}).json()
+    assert archived["title"] == "Newest, done"
@@ -0,0 +1,83 @@
+import asyncio
+from app import events
+from app.admission import TokenBuckets
+from app.routers import batch as batch_router
+
+def test_operations_run_in_order_and_reads_see_earlier_writes(client, user):
+    response = client.post("/batch", json={"requests": [
+        {"method": "POST", "path": "/projects/", "body": {"name": "Zeus", "owner_id": user["id"]}},
+        {"path": "/projects/?fields=name"},
+        {"path": "/users/999"},
+    ]})
+    assert response.status_code == 200
+    statuses = [result["status"] for result in response.json()["responses"]]
+    assert statuses == [201, 200, 404]
+    assert response.json()["responses"][1]["body"] == [{"name": "Zeus"}]
+
+def test_atomic_batch_rolls_back_everything_when_one_operation_fails(client, user, monkeypatch):
+    published = []
+    monkeypatch.setattr(events.broker, "publish", published.append)
+    response = client.post("/batch", json={"atomic": True, "requests": [
+        {"method": "POST", "path": "/projects/", "body": {"name": "Hera", "owner_id": user["id"]}},
+        {"method": "POST", "path": "/projects/", "body": {"name": "Orphan", "owner_id": 999}},
+        {"path": "/projects/"},
+    ]})
+    body = response.json()
+    assert body["committed"] is False
+    assert [result["status"] for result in body["responses"]] == [201, 400, 424]
+    assert client.get("/projects/").json() == []
+    # Events of the rolled-back create must never reach subscribers
+    assert published == []
+
+def test_atomic_batch_publishes_events_after_commit(client, user, monkeypatch):
+    published = []
+    monkeypatch.setattr(events.broker, "publish", published.append)
+    response = client.post("/batch", json={"atomic": True, "requests": [
+        {"method": "POST", "path": "/projects/", "body": {"name": "Hera", "owner_id": user["id"]}},
+    ]})
+    assert response.json()["committed"] is True
+    project_id = response.json()["responses"][0]["body"]["id"]
+    assert {"entity": "projects", "op": "create", "ids": [project_id]} in published
+
+def test_each_operation_is_charged_against_the_rate_limit(client, user, admission, monkeypatch):
+    monkeypatch.setattr(admission, "buckets", TokenBuckets(rate=0.001, burst=2))
+    # Distinct paths, so coalescing cannot merge them into one admitted request
+    response = client.post("/batch", json={"requests": [{"path": f"/users/?limit={limit}"} for limit in range(1, 5)]})
+    assert response.status_code == 200
+    assert sorted(result["status"] for result in response.json()["responses"]) == [200, 200, 429, 429]
+
+def test_concurrent_reads_are_capped(client, monkeypatch):
+    monkeypatch.setattr(batch_router.settings, "batch_read_concurrency", 2)
+    running = peak = 0
+    async def fake_dispatch(request, operation):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return batch_router.BatchResult(status=200)
+    monkeypatch.setattr(batch_router, "_dispatch", fake_dispatch)
+    response = client.post("/batch", json={"requests": [{"path": "/users/"}] * 10})
+    assert len(response.json()["responses"]) == 10
+    assert peak == 2
+
+def test_streams_and_nested_batches_are_rejected(client):
+    response = client.post("/batch", json={"requests": [{"path": "/events"}, {"method": "POST", "path": "/batch"}]})
+    assert [result["status"] for result in response.json()["responses"]] == [400, 400]
+
+def test_atomic_reads_see_the_batchs_own_writes(client, user, coalescing):
+    client.get("/users/")  # remembered for the replay window
+    response = client.post("/batch", json={"atomic": True, "requests": [
+        {"method": "POST", "path": "/users/", "body": {"username": "bo", "email": "bo@example.com", "full_name": "Bo"}},
+        {"path": "/users/"},
+    ]})
+    assert [item["username"] for item in response.json()["responses"][1]["body"]] == ["ada", "bo"]
+
+def test_uncommitted_atomic_reads_are_not_replayed_to_others(client, user, coalescing):
+    response = client.post("/batch", json={"atomic": True, "requests": [
+        {"method": "POST", "path": "/users/", "body": {"username": "bo", "email": "bo@example.com", "full_name": "Bo"}},
+        {"path": "/users/"},
+        {"method": "POST", "path": "/projects/", "body": {"name": "Orphan", "owner_id": 999}},
+    ]})
+    assert response.json()["committed"] is False
+    assert [item["username"] for item in client.get("/users/").json()] == ["ada"]
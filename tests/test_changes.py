@@ -0,0 +1,72 @@
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import select, update
+from app.changes import purge_tombstones
+from app.config import settings
+from app.models import Deletion, User
+
+def _make_users(client, count: int):
+    return [
+        client.post("/users/", json={"username": f"u{index}", "email": f"u{index}@example.com", "full_name": "U"}).json()
+        for index in range(count)
+    ]
+
+def test_poll_returns_writes_and_deletions_after_the_token(client, user):
+    token = client.get("/users/changes").json()["next_since"]
+    assert client.get("/users/changes", params={"since": token}).json()["items"] == []
+
+    other = _make_users(client, 1)[0]
+    client.patch(f"/users/{user['id']}", json={"full_name": "Ada L."})
+    client.delete(f"/users/{other['id']}")
+    feed = client.get("/users/changes", params={"since": token}).json()
+    assert feed["reset"] is False
+    assert [item["full_name"] for item in feed["items"]] == ["Ada L."]
+    assert feed["deleted"] == [other["id"]]
+
+def test_set_based_updates_are_numbered_too(client, user, db):
+    token = client.get("/users/changes").json()["next_since"]
+    db.execute(update(User).where(User.id == user["id"]).values(is_active=False))
+    db.commit()
+    feed = client.get("/users/changes", params={"since": token}).json()
+    assert [(item["id"], item["is_active"]) for item in feed["items"]] == [(user["id"], False)]
+
+def test_snapshot_is_paged_by_id_and_changes_during_it_are_caught_up(client, monkeypatch):
+    monkeypatch.setattr(settings, "change_feed_page_size", 2)
+    users = _make_users(client, 5)
+
+    first = client.get("/users/changes").json()
+    assert first["reset"] is True and len(first["items"]) == 2
+    client.patch(f"/users/{users[0]['id']}", json={"full_name": "Changed mid-snapshot"})
+
+    ids, page = [item["id"] for item in first["items"]], first
+    while page["next_cursor"] is not None:
+        page = client.get("/users/changes", params={"cursor": page["next_cursor"]}).json()
+        assert page["reset"] is False and page["next_since"] == first["next_since"]
+        ids += [item["id"] for item in page["items"]]
+    assert ids == [user["id"] for user in users]
+
+    caught_up = client.get("/users/changes", params={"since": first["next_since"]}).json()
+    assert [item["full_name"] for item in caught_up["items"]] == ["Changed mid-snapshot"]
+
+def test_wall_clock_tokens_from_before_the_upgrade_get_a_snapshot(client, user):
+    feed = client.get("/users/changes", params={"since": "2026-01-01T00:00:00"}).json()
+    assert feed["reset"] is True
+    assert [item["id"] for item in feed["items"]] == [user["id"]]
+
+def test_invalid_token_and_cursor_are_rejected(client):
+    assert client.get("/users/changes", params={"since": "yesterday"}).status_code == 400
+    assert client.get("/users/changes", params={"cursor": "not-a-cursor"}).status_code == 400
+
+def test_tombstones_past_the_retention_are_purged(client, db, user, job_context, monkeypatch):
+    token = client.get("/users/changes").json()["next_since"]
+    old, recent = _make_users(client, 2)
+    client.delete(f"/users/{old['id']}")
+    client.delete(f"/users/{recent['id']}")
+    db.execute(update(Deletion).where(Deletion.entity_id == old["id"]).values(
+        deleted_at=datetime.now(timezone.utc) - timedelta(days=settings.change_tombstone_retention_days + 1)
+    ))
+    db.commit()
+
+    monkeypatch.setattr(settings, "change_tombstone_purge_batch_size", 1)
+    assert purge_tombstones(job_context) == {"purged": 1}
+    assert db.scalars(select(Deletion.entity_id)).all() == [recent["id"]]
+    assert client.get("/users/changes", params={"since": token}).json()["deleted"] == [recent["id"]]
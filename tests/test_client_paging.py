@@ -0,0 +1,53 @@
+import json
+import threading
+import requests
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from client import paging
+from client.api_client import api_client
+
+def _response(body, headers=None) -> requests.Response:
+    response = requests.Response()
+    response.status_code = 200
+    response._content = json.dumps(body).encode()
+    response.headers.update(headers or {})
+    return response
+
+def test_prefetch_only_sends_on_the_worker(monkeypatch):
+    sent = []
+
+    def request(method, url, timeout, **kwargs):
+        sent.append({
+            "thread": threading.current_thread(),
+            "script_context": get_script_run_ctx(suppress_warning=True),
+            "headers": kwargs["headers"],
+        })
+        return _response({"items": [], "next_cursor": None}, {"X-Consistency-Token": "after-prefetch"})
+    monkeypatch.setattr(api_client.session, "request", request)
+    st.session_state["client_id"] = "session-1"
+
+    prefetched = paging._in_background(api_client.get_task_page, cursor="abc", limit=10)
+    prefetched.result()
+    assert sent[0]["thread"] is not threading.current_thread()
+    assert sent[0]["script_context"] is None
+    # Session headers were read when the request was built, on this thread
+    assert sent[0]["headers"]["X-Client-Id"] == "session-1"
+    assert st.session_state.get("consistency_token") != "after-prefetch"
+
+    assert paging._collect(prefetched) == {"items": [], "next_cursor": None}
+    assert st.session_state["consistency_token"] == "after-prefetch"
+
+def test_all_pages_walks_every_cursor_with_the_filters():
+    pages = {None: ([1, 2], "c1"), "c1": ([3, 4], "c2"), "c2": ([5], None)}
+    calls = []
+
+    def fetch(cursor, limit, totals, **filters):
+        calls.append((cursor, filters))
+        items, next_cursor = pages[cursor]
+        return {"items": items, "next_cursor": next_cursor}
+
+    assert paging.all_pages(fetch, {"status": ["todo"]}) == [1, 2, 3, 4, 5]
+    assert calls == [(None, {"status": ["todo"]}), ("c1", {"status": ["todo"]}), ("c2", {"status": ["todo"]})]
+
+def test_all_pages_gives_up_when_a_fetch_fails():
+    assert paging.all_pages(lambda **kwargs: None, {}) is None
@@ -0,0 +1,13 @@
+from app.config import settings
+
+def test_replay_window_keeps_at_most_max_entries_newest_last(client, user, coalescing, monkeypatch):
+    monkeypatch.setattr(settings, "coalesce_max_entries", 3)
+    for limit in range(1, 8):
+        client.get("/users/", params={"limit": limit})
+    assert len(coalescing.recent) == 3
+    assert [key.split("#")[0] for key in coalescing.recent] == [f"/users/?limit={limit}" for limit in (5, 6, 7)]
+
+def test_identical_gets_within_the_window_are_replayed(client, user, coalescing):
+    first = client.get("/users/").json()
+    client.post("/users/", json={"username": "bo", "email": "bo@example.com", "full_name": "Bo"})
+    assert client.get("/users/").json() == first
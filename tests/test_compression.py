@@ -0,0 +1,46 @@
+import pytest
+from app import compression
+from app.compression import choose_compressor
+
+@pytest.fixture
+def without_brotli(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", None)
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip", "gzip"),
+    ("gzip;q=0", None),
+    ("*, gzip;q=0", None),
+    ("*;q=0.5", "gzip"),
+    ("identity, gzip;q=0.5", None),
+    ("gzip;q=0.5, identity;q=0.1", "gzip"),
+    ("deflate", None),
+    ("", None),
+])
+def test_q_values_are_honoured(without_brotli, header, expected):
+    chosen = choose_compressor(header)
+    assert (chosen.encoding.decode() if chosen else None) == expected
+
+def test_brotli_is_skipped_when_refused_or_ranked_lower(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", object())
+    assert choose_compressor("br, gzip").encoding == b"br"
+    assert choose_compressor("br;q=0, gzip").encoding == b"gzip"
+    assert choose_compressor("br;q=0.4, gzip;q=0.8").encoding == b"gzip"
+    assert choose_compressor("*, br;q=0").encoding == b"gzip"
+
+def test_compressed_body_gets_its_own_etag_which_if_match_accepts(client, without_brotli, make_task):
+    task = make_task(description="x" * 4000)
+    plain = client.get(f"/tasks/{task['id']}", headers={"Accept-Encoding": "identity"})
+    compressed = client.get(f"/tasks/{task['id']}", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in plain.headers
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert compressed.headers["ETag"] == plain.headers["ETag"][:-1] + '-gzip"'
+
+    updated = client.patch(f"/tasks/{task['id']}", json={"title": "Renamed"}, headers={"If-Match": compressed.headers["ETag"]})
+    assert updated.status_code == 200
+    stale = client.patch(f"/tasks/{task['id']}", json={"title": "Again"}, headers={"If-Match": compressed.headers["ETag"]})
+    assert stale.status_code == 412
+
+def test_small_responses_are_not_compressed(client, user):
+    response = client.get(f"/users/{user['id']}", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+    assert response.headers["ETag"] == '"1"'
@@ -0,0 +1,30 @@
+import pytest
+
+@pytest.mark.parametrize("method", ["put", "patch"])
+def test_write_applies_only_at_the_version_in_if_match(client, make_task, method):
+    task = make_task()
+    etag = client.get(f"/tasks/{task['id']}").headers["ETag"]
+    assert etag == '"1"'
+
+    write = getattr(client, method)
+    updated = write(f"/tasks/{task['id']}", json={"title": "First"}, headers={"If-Match": etag})
+    assert updated.status_code == 200
+    assert updated.headers["ETag"] == '"2"' and updated.json()["version"] == 2
+
+    stale = write(f"/tasks/{task['id']}", json={"title": "Lost update"}, headers={"If-Match": etag})
+    assert stale.status_code == 412
+    assert stale.headers["ETag"] == '"2"'
+    assert client.get(f"/tasks/{task['id']}").json()["title"] == "First"
+
+def test_writes_without_a_version_still_apply(client, make_task):
+    task = make_task()
+    assert client.patch(f"/tasks/{task['id']}", json={"title": "Any"}).status_code == 200
+    assert client.patch(f"/tasks/{task['id']}", json={"title": "Star"}, headers={"If-Match": "*"}).json()["version"] == 3
+
+def test_weak_and_malformed_tags(client, project):
+    assert client.patch(f"/projects/{project['id']}", json={"name": "W"}, headers={"If-Match": 'W/"1"'}).status_code == 412
+    assert client.patch(f"/projects/{project['id']}", json={"name": "X"}, headers={"If-Match": '"one"'}).status_code == 400
+    assert client.get(f"/projects/{project['id']}").json()["name"] == "Apollo"
+
+def test_missing_row_is_404_not_412(client):
+    assert client.patch("/tasks/999", json={"title": "Ghost"}, headers={"If-Match": '"1"'}).status_code == 404
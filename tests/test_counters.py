@@ -0,0 +1,60 @@
+from sqlalchemy import update
+from app import counters
+from app.models import Project, Task
+
+def _counts(client, project):
+    body = client.get(f"/projects/{project['id']}").json()
+    return body["task_count"], body["completed_count"], body["overdue_count"]
+
+def test_counters_follow_task_writes(client, project, make_task):
+    open_task = make_task(due_date="2000-01-01T00:00:00Z")
+    done = make_task()
+    assert _counts(client, project) == (2, 0, 1)
+
+    client.patch(f"/tasks/{done['id']}", json={"is_completed": True})
+    assert _counts(client, project) == (2, 1, 1)
+    client.put(f"/tasks/{open_task['id']}", json={"status": "done"})
+    assert _counts(client, project) == (2, 2, 0)
+    client.patch(f"/tasks/{open_task['id']}", json={"status": "todo", "due_date": "2999-01-01T00:00:00Z"})
+    assert _counts(client, project) == (2, 1, 0)
+
+    client.delete(f"/tasks/{done['id']}")
+    assert _counts(client, project) == (1, 0, 0)
+
+def test_rejected_patch_leaves_the_counters_alone(client, project, make_task):
+    task = make_task()
+    client.patch(f"/tasks/{task['id']}", json={"title": "Bumps the version"})
+    response = client.patch(f"/tasks/{task['id']}", json={"is_completed": True}, headers={"If-Match": '"1"'})
+    assert response.status_code == 412
+    assert _counts(client, project) == (1, 0, 0)
+
+def test_reconcile_repairs_drift_from_set_based_updates(client, db, project, make_task):
+    task = make_task()
+    db.execute(update(Task).where(Task.id == task["id"]).values(is_completed=True))
+    db.commit()
+    assert _counts(client, project) == (1, 0, 0)
+
+    assert counters.reconcile(db) == 1
+    assert _counts(client, project) == (1, 1, 0)
+    assert counters.reconcile(db) == 0
+
+def test_counter_changes_move_the_projects_etag(client, project, make_task):
+    etag = client.get(f"/projects/{project['id']}").headers["ETag"]
+    task = make_task()
+    assert client.get(f"/projects/{project['id']}").headers["ETag"] != etag
+    stale = client.patch(f"/projects/{project['id']}", json={"name": "Renamed"}, headers={"If-Match": etag})
+    assert stale.status_code == 412
+
+    etag = client.get(f"/projects/{project['id']}").headers["ETag"]
+    client.patch(f"/tasks/{task['id']}", json={"is_completed": False, "title": "Counters unchanged"})
+    assert client.get(f"/projects/{project['id']}").headers["ETag"] == etag
+    client.patch(f"/tasks/{task['id']}", json={"is_completed": True})
+    assert client.get(f"/projects/{project['id']}").headers["ETag"] != etag
+
+def test_a_loaded_project_can_still_be_saved_after_its_counters_move(db, project):
+    loaded = db.get(Project, project["id"])
+    db.add(Task(title="Counted", project_id=loaded.id))
+    db.flush()
+    loaded.name = "Renamed"
+    db.commit()
+    assert (loaded.task_count, loaded.version) == (1, 3)
@@ -0,0 +1,100 @@
+import json
+import socket
+import threading
+from types import SimpleNamespace
+from app import events
+from app.models import User
+
+class FakeDBAPIConnection:
+    """psycopg2-like connection whose readiness is driven through a socketpair"""
+
+    def __init__(self):
+        self.reader, self.writer = socket.socketpair()
+        self.notifies = []
+        self.executed = []
+        self.autocommit = False
+
+    def fileno(self):
+        return self.reader.fileno()
+
+    def cursor(self):
+        connection = self
+        class Cursor:
+            def __enter__(self):
+                return self
+            def __exit__(self, *exc):
+                return False
+            def execute(self, sql):
+                connection.executed.append(sql)
+        return Cursor()
+
+    def notify(self, payload):
+        self.notifies_pending = payload
+        self.writer.send(b"x")
+
+    def poll(self):
+        self.reader.recv(1)
+        payload = getattr(self, "notifies_pending", None)
+        if payload is not None:
+            self.notifies.append(SimpleNamespace(payload=json.dumps(payload)))
+            self.notifies_pending = None
+
+class FakeEngine:
+    def __init__(self, dbapi_connection):
+        self.dbapi_connection = dbapi_connection
+        self.closed = False
+
+    def raw_connection(self):
+        engine = self
+        return SimpleNamespace(
+            dbapi_connection=self.dbapi_connection,
+            detach=lambda: None,
+            close=lambda: setattr(engine, "closed", True),
+        )
+
+def test_listen_forwards_notifications_to_the_broker(monkeypatch):
+    published = []
+    received = threading.Event()
+    def publish(payload):
+        published.append(payload)
+        received.set()
+    monkeypatch.setattr(events.broker, "publish", publish)
+
+    dbapi_connection = FakeDBAPIConnection()
+    engine = FakeEngine(dbapi_connection)
+    listener = events.PostgresListener(engine)
+    errors = []
+    def listen():
+        try:
+            listener._listen()
+        except Exception as exc:  # surfaced below, so the thread cannot swallow it
+            errors.append(exc)
+            received.set()
+    thread = threading.Thread(target=listen, daemon=True)
+    thread.start()
+
+    dbapi_connection.notify({"entity": "tasks", "op": "update", "ids": [1]})
+    assert received.wait(5)
+    listener.stop()
+    dbapi_connection.writer.send(b"x")  # wake select() so the loop sees the stop
+    thread.join(5)
+
+    assert errors == []
+    assert published == [{"entity": "tasks", "op": "update", "ids": [1]}]
+    assert dbapi_connection.autocommit is True
+    assert dbapi_connection.executed == [f"LISTEN {events.settings.events_channel}"]
+    assert engine.closed
+
+def test_flushed_changes_are_published_only_on_commit(db, monkeypatch):
+    published = []
+    monkeypatch.setattr(events.broker, "publish", published.append)
+
+    db.add(User(username="rolled", email="rolled@example.com", full_name="Rolled"))
+    db.flush()
+    db.rollback()
+    assert published == []
+
+    kept = User(username="kept", email="kept@example.com", full_name="Kept")
+    db.add(kept)
+    db.commit()
+    assert published == [{"entity": "users", "op": "create", "ids": [kept.id]}]
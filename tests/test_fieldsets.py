@@ -0,0 +1,11 @@
+def test_requested_fields_only(client, make_task):
+    task = make_task(title="Sparse")
+    assert client.get(f"/tasks/{task['id']}", params={"fields": "id,title"}).json() == {"id": task["id"], "title": "Sparse"}
+
+def test_internal_columns_cannot_be_requested(client, user, make_task):
+    task = make_task()
+    for name in ("change_seq", "priority_rank", "due_sort"):
+        assert client.get(f"/tasks/{task['id']}", params={"fields": f"id,{name}"}).status_code == 400
+    assert client.get("/users/", params={"fields": "id,change_seq"}).status_code == 400
+    assert client.get("/tasks/", params={"fields": "id,archived_at"}).status_code == 400
+    assert client.get("/tasks/", params={"fields": "id,archived_at", "include_archived": True}).status_code == 200
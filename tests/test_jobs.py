@@ -0,0 +1,114 @@
+import time
+from datetime import datetime, timedelta, timezone
+import pytest
+from sqlalchemy import update
+from app import jobs
+from app.config import settings
+from app.database import SessionLocal
+from app.models.job import Job, JobStatus
+
+@jobs.job_kind("test_echo")
+def _echo(ctx, **params):
+    return params
+
+def _running(db, worker: str, heartbeat_age: float) -> Job:
+    job = Job(
+        kind="test_echo", params={}, status=JobStatus.RUNNING, worker=worker,
+        heartbeat_at=datetime.now(timezone.utc) - timedelta(seconds=heartbeat_age),
+    )
+    db.add(job)
+    db.commit()
+    return job
+
+def test_requeue_puts_back_only_jobs_without_a_recent_heartbeat(db):
+    stale = _running(db, "gone", settings.job_stale_seconds + 60)
+    fresh = _running(db, "alive", 1)
+    jobs._requeue_stale(db)
+    db.expire_all()
+    assert (stale.status, stale.worker) == (JobStatus.QUEUED, None)
+    assert (fresh.status, fresh.worker) == (JobStatus.RUNNING, "alive")
+
+def test_claim_takes_a_queued_job_once(db):
+    job = jobs.enqueue(db, "test_echo", value=1)
+    assert jobs.claim_next(db, "first") == job.id
+    assert jobs.claim_next(db, "second") is None
+    db.refresh(job)
+    assert (job.status, job.worker) == (JobStatus.RUNNING, "first")
+    jobs.run_job(job.id, "first")
+    db.refresh(job)
+    assert (job.status, job.result) == (JobStatus.SUCCEEDED, {"value": 1})
+
+def test_requeued_run_cannot_overwrite_the_run_that_replaced_it(db, monkeypatch):
+    job = jobs.enqueue(db, "test_echo")
+    jobs.claim_next(db, "slow")
+
+    def taken_over(ctx):
+        # Requeued as stale and claimed by another worker while this run was busy
+        with SessionLocal() as other:
+            other.execute(update(Job).where(Job.id == job.id).values(status=JobStatus.QUEUED, worker=None))
+            other.commit()
+            jobs.claim_next(other, "replacement")
+        return {"from": "slow"}
+    monkeypatch.setitem(jobs.JOB_KINDS, "test_echo", taken_over)
+
+    jobs.run_job(job.id, "slow")
+    db.refresh(job)
+    assert (job.status, job.worker, job.result) == (JobStatus.RUNNING, "replacement", None)
+    with pytest.raises(jobs.JobLost):
+        jobs.JobContext(job.id, "slow").report(1)
+
+def test_heartbeat_keeps_a_long_quiet_job_from_being_requeued(db, monkeypatch):
+    monkeypatch.setattr(settings, "job_stale_seconds", 0.3)
+    job = jobs.enqueue(db, "test_echo")
+    jobs.claim_next(db, "busy")
+
+    def quiet(ctx):
+        time.sleep(1.0)  # never reports progress
+        with SessionLocal() as other:
+            jobs._requeue_stale(other)
+        return "done"
+    monkeypatch.setitem(jobs.JOB_KINDS, "test_echo", quiet)
+
+    jobs.run_job(job.id, "busy")
+    db.refresh(job)
+    assert (job.status, job.result) == (JobStatus.SUCCEEDED, "done")
+
+def test_scheduled_kind_is_not_enqueued_twice_while_pending(db):
+    first = jobs.enqueue_unless_pending(db, "test_echo")
+    assert first is not None and first.status == JobStatus.QUEUED and first.params == {}
+    assert jobs.enqueue_unless_pending(db, "test_echo") is None
+    first.status = JobStatus.SUCCEEDED
+    db.commit()
+    assert jobs.enqueue_unless_pending(db, "test_echo") is not None
+
+def test_cancel_requires_the_admin_token(client, db, monkeypatch):
+    monkeypatch.setattr(settings, "admin_token", "secret")
+    job = jobs.enqueue(db, "test_echo")
+    assert client.post(f"/jobs/{job.id}/cancel").status_code == 403
+    response = client.post(f"/jobs/{job.id}/cancel", headers={"X-Admin-Token": "secret"})
+    assert response.status_code == 200
+    assert response.json()["status"] == "cancelled"
+
+def test_cancelling_a_claimed_job_only_flags_it(db):
+    job = jobs.enqueue(db, "test_echo")
+    jobs.claim_next(db, "worker")
+    cancelled = jobs.request_cancel(db, job.id)
+    assert (cancelled.status, cancelled.cancel_requested) == (JobStatus.RUNNING, True)
+    assert jobs.request_cancel(db, 999) is None
+
+@pytest.mark.parametrize("kind, params", [
+    ("test_echo", {"db": 1}),
+    ("test_echo", {"kind": "other"}),
+    ("archive_tasks", {"older_than": 3}),
+    ("delete_project", {}),
+])
+def test_job_params_must_fit_the_job_kind(client, monkeypatch, kind, params):
+    monkeypatch.setattr(settings, "admin_token", "secret")
+    response = client.post("/jobs/", json={"kind": kind, "params": params}, headers={"X-Admin-Token": "secret"})
+    assert response.status_code == 422
+
+def test_valid_job_params_are_accepted(client, monkeypatch):
+    monkeypatch.setattr(settings, "admin_token", "secret")
+    response = client.post("/jobs/", json={"kind": "archive_tasks", "params": {"older_than_days": 3}}, headers={"X-Admin-Token": "secret"})
+    assert response.status_code == 202
+    assert response.json()["params"] == {"older_than_days": 3}
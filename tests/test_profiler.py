@@ -0,0 +1,55 @@
+import contextvars
+import threading
+import time
+from collections import Counter
+from app import profiler
+from app.config import settings
+
+def _spin(stop: threading.Event):
+    while not stop.is_set():
+        sum(range(1000))
+
+def _spin_elsewhere(stop: threading.Event):
+    while not stop.is_set():
+        sum(range(1000))
+
+def test_sampler_limited_to_threads_samples_only_those():
+    stop = threading.Event()
+    wanted = threading.Thread(target=_spin, args=(stop,))
+    other = threading.Thread(target=_spin_elsewhere, args=(stop,))
+    wanted.start()
+    other.start()
+    counts: Counter = Counter()
+    sampler = profiler.StackSampler(0.001, lambda frame: counts.update((profiler.collapse(frame),)), {wanted.ident})
+    sampler.start()
+    time.sleep(0.1)
+    sampler.stop()
+    stop.set()
+    wanted.join()
+    other.join()
+
+    assert counts
+    assert all("_spin (" in stack for stack in counts)
+    assert not any("_spin_elsewhere" in stack for stack in counts)
+
+def test_sync_endpoint_adds_its_thread_while_it_runs():
+    seen = []
+    recorded = profiler._record_thread(lambda: seen.append(set(threads)))
+    threads = {threading.get_ident()}
+    token = profiler._request_threads.set(threads)
+    # The threadpool runs endpoints in a copy of the request's context
+    worker = threading.Thread(target=contextvars.copy_context().run, args=(recorded,))
+    worker.start()
+    worker.join()
+    profiler._request_threads.reset(token)
+
+    assert seen == [{threading.get_ident(), worker.ident}]
+    assert threads == {threading.get_ident()}
+
+def test_profile_is_stored_under_the_route_template(client, user, monkeypatch):
+    monkeypatch.setattr(settings, "admin_token", "secret")
+    response = client.get(f"/users/{user['id']}", headers={"X-Profile": "1", "X-Admin-Token": "secret"})
+    assert response.status_code == 200
+
+    profile = profiler.get_profile(response.headers["X-Profile-Id"])
+    assert profile["route"] == "GET /users/{user_id}"
@@ -0,0 +1,62 @@
+import os
+import tempfile
+import pytest
+from app import replicas as replicas_module
+from app.config import settings
+from app.database import engine
+from app.replicas import ReplicaSet
+
+@pytest.fixture
+def replica_set():
+    directory = tempfile.mkdtemp(prefix="replicas-")
+    return ReplicaSet([f"sqlite:///{os.path.join(directory, f'replica{index}.db')}" for index in range(2)])
+
+def test_pick_skips_replicas_lagging_beyond_the_limit(replica_set):
+    lagging, current = replica_set.replicas
+    lagging.lag = settings.replica_max_lag_seconds + 1
+    assert {replica_set.pick(None) for _ in range(4)} == {current.engine}
+    current.lag = settings.replica_max_lag_seconds + 1
+    assert replica_set.pick(None) is None
+
+def test_pick_skips_unhealthy_replicas_and_those_behind_the_token(replica_set):
+    first, second = replica_set.replicas
+    first.healthy = False
+    assert {replica_set.pick(None) for _ in range(4)} == {second.engine}
+    first.healthy, first.lsn, second.lsn = True, 0x20, 0x10
+    assert {replica_set.pick("lsn:0/18") for _ in range(4)} == {first.engine}
+
+def test_health_check_measures_lag(replica_set, monkeypatch):
+    replica = replica_set.replicas[0]
+    monkeypatch.setattr(replicas_module, "_replication_lag", lambda conn: settings.replica_max_lag_seconds + 3)
+    replica.check()
+    assert replica.healthy and not replica.usable
+    monkeypatch.setattr(replicas_module, "_replication_lag", lambda conn: 0)
+    replica.check()
+    assert replica.usable
+
+@pytest.fixture
+def positions(replica_set, monkeypatch):
+    """Pretend the primary is PostgreSQL: record where the LSN is read and hand out increasing ones"""
+    monkeypatch.setattr(replicas_module.replicas, "replicas", replica_set.replicas)
+    reads = []
+
+    def current_position(connection):
+        reads.append({"connection": connection, "checked_out": engine.pool.checkedout()})
+        return f"0/{len(reads):X}"
+    monkeypatch.setattr(replicas_module, "_current_position", current_position)
+    return reads
+
+def test_commit_token_is_read_on_the_committing_connection(client, positions):
+    response = client.post("/users/", json={"username": "ada", "email": "ada@example.com", "full_name": "Ada"})
+    assert response.headers["X-Consistency-Token"] == "lsn:0/1"
+    # No second connection was checked out to read the LSN
+    assert [read["checked_out"] for read in positions] == [1]
+
+def test_atomic_batch_reads_its_token_once_the_whole_batch_commits(client, user, positions):
+    response = client.post("/batch", json={"atomic": True, "requests": [
+        {"method": "POST", "path": "/projects/", "body": {"name": "One", "owner_id": user["id"]}},
+        {"method": "POST", "path": "/projects/", "body": {"name": "Two", "owner_id": user["id"]}},
+    ]})
+    assert response.json()["committed"] is True
+    assert len(positions) == 1
+    assert response.headers["X-Consistency-Token"] == "lsn:0/1"
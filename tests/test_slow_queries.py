@@ -0,0 +1,38 @@
+import json
+import os
+from sqlalchemy import create_engine
+from app import slow_queries
+from app.config import settings
+
+def _logged(path: str):
+    with open(path) as log:
+        return [json.loads(line) for line in log]
+
+def test_slow_queries_are_kept_and_logged_with_their_route(client, user, monkeypatch):
+    monkeypatch.setattr(settings, "slow_query_threshold_ms", 0)
+    client.get(f"/users/{user['id']}")
+
+    entry = slow_queries.recent(1)[0]
+    assert entry["route"] == "GET /users/{user_id}"
+    assert _logged(settings.slow_query_log_file)[-1]["statement"] == entry["statement"]
+
+def test_log_is_reopened_after_external_rotation(client, user, monkeypatch):
+    monkeypatch.setattr(settings, "slow_query_threshold_ms", 0)
+    rotated = settings.slow_query_log_file + ".1"
+    client.get(f"/users/{user['id']}")
+    os.replace(settings.slow_query_log_file, rotated)
+    try:
+        client.get("/projects/")
+        assert _logged(settings.slow_query_log_file)[-1]["route"] == "GET /projects/"
+        assert all(entry["route"] != "GET /projects/" for entry in _logged(rotated))
+    finally:
+        os.remove(rotated)
+
+def test_no_log_file_unless_one_is_configured(tmp_path, monkeypatch):
+    assert type(settings).model_fields["slow_query_log_file"].default == ""
+    monkeypatch.setattr(settings, "slow_query_log_file", "")
+    monkeypatch.setattr(slow_queries.logger, "handlers", [])
+    monkeypatch.chdir(tmp_path)
+    slow_queries.install(create_engine("sqlite://"))
+    assert slow_queries.logger.handlers == []
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,43 @@
+import threading
+from app import tracing
+from common.tracing import BatchProcessor, Tracer
+
+class _Recorder:
+    def __init__(self):
+        self.spans = []
+        self.exported = threading.Event()
+
+    def on_end(self, span):
+        self.spans.append(span)
+
+    def export(self, spans):
+        self.spans += spans
+        self.exported.set()
+
+def _exporter_threads():
+    return [thread for thread in threading.enumerate() if thread.name == "span-exporter"]
+
+def test_exporter_thread_starts_with_the_first_span():
+    before = len(_exporter_threads())
+    recorder = _Recorder()
+    tracer = Tracer(BatchProcessor(recorder, interval=0.01))
+    assert len(_exporter_threads()) == before
+
+    with tracer.span("first") as parent:
+        with tracer.span("second") as child:
+            pass
+    assert len(_exporter_threads()) == before + 1
+    assert recorder.exported.wait(1)
+    assert child.parent_id == parent.span_id and child.trace_id == parent.trace_id
+
+def test_server_span_continues_the_callers_trace(client, user, monkeypatch):
+    recorder = _Recorder()
+    monkeypatch.setattr(tracing.tracer, "processor", recorder)
+    trace_id, parent_id = "ab" * 16, "cd" * 8
+    response = client.get(f"/users/{user['id']}", headers={"traceparent": f"00-{trace_id}-{parent_id}-01"})
+
+    server_span = recorder.spans[-1]
+    assert server_span.name == "GET /users/{user_id}"
+    assert (server_span.trace_id, server_span.parent_id) == (trace_id, parent_id)
+    assert server_span.attributes["http.status_code"] == 200
+    assert response.headers["traceparent"] == server_span.traceparent
@@ -0,0 +1,42 @@
+from sqlalchemy import text
+from app.database import engine
+
+def _assigned(make_task, user):
+    return [
+        make_task(title=title, priority=priority, due_date=due, assignee_id=user["id"])
+        for title, priority, due in [
+            ("low, undated", "low", None),
+            ("urgent, later", "urgent", "2026-11-02T00:00:00Z"),
+            ("urgent, undated", "urgent", None),
+            ("urgent, sooner", "urgent", "2026-11-01T00:00:00Z"),
+            ("high, dated", "high", "2026-10-01T00:00:00Z"),
+        ]
+    ]
+
+def test_most_urgent_then_soonest_due_with_undated_last_across_pages(client, user, make_task):
+    _assigned(make_task, user)
+    titles, cursor = [], None
+    while True:
+        page = client.get(f"/users/{user['id']}/tasks", params={"limit": 2, **({"cursor": cursor} if cursor else {})}).json()
+        titles += [task["title"] for task in page["items"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert titles == ["urgent, sooner", "urgent, later", "urgent, undated", "high, dated", "low, undated"]
+    assert page["counts"]["todo"] == 5
+
+def test_priority_rank_follows_priority_changes(client, user, make_task):
+    low = _assigned(make_task, user)[0]
+    client.patch(f"/tasks/{low['id']}", json={"priority": "urgent", "due_date": "2026-10-15T00:00:00Z"})
+    page = client.get(f"/users/{user['id']}/tasks", params={"limit": 1}).json()
+    assert page["items"][0]["id"] == low["id"]
+
+def test_workload_order_is_read_off_the_index():
+    with engine.connect() as connection:
+        plan = connection.execute(text(
+            "EXPLAIN QUERY PLAN SELECT id FROM tasks WHERE assignee_id = 1 AND is_completed = 0 "
+            "AND (priority_rank, due_sort, id) > (0, '2026-01-01', 0) ORDER BY priority_rank, due_sort, id LIMIT 51"
+        )).all()
+    details = " ".join(row[-1] for row in plan)
+    assert "ix_tasks_assignee_priority_due" in details
+    assert "TEMP B-TREE" not in details